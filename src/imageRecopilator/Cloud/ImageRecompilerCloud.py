@@ -1,50 +1,82 @@
+import time
+T_INICIO = time.perf_counter()  # referencia del presupuesto de arranque
+
 import asyncio
 import json
 import aiohttp
-import aioboto3
-import time
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor
 import os
 import ssl
 import hashlib
 import signal
+import importlib
 import logging
 import traceback
-import subprocess
-import tempfile
 import io
+import sys
+import zlib
 from collections import defaultdict
-from botocore.exceptions import BotoCoreError, ClientError, NoCredentialsError
 from PIL import Image
 
+# Ejecución directa (run.sh / tmux): agrega src/ al path para los imports del paquete
+if not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from imageRecopilator.Cloud.actividad import DetectorActividad
+from imageRecopilator.Cloud.bitacora import BitacoraCapturas
+from imageRecopilator.Cloud.buffers import PoolBuffers, LectorMemoria
+from imageRecopilator.Cloud.calidad import ControladorCalidad
+from imageRecopilator.Cloud.carga import PoliticaCarga, NIVELES
+from imageRecopilator.Cloud.frescura import DetectorFrescura
+from imageRecopilator.Cloud.recompresion import MOTORES, jpegtran_disponible, optimizar_sin_perdida
+from imageRecopilator.Cloud.reloj import RelojSistema
+from imageRecopilator.Cloud.borrado import ServicioBorrado
+from imageRecopilator.Cloud.salud import RegistroSalud
+from imageRecopilator.Cloud.clientes_s3 import gestor_s3
+from imageRecopilator.Cloud.compactacion import compactar_dia, keys_borrables
+from imageRecopilator.Cloud.trabajos import ColaTrabajos, EjecutorTrabajos
+from imageRecopilator.Cloud.metadatos import IndiceDiario, metadatos_frame, filtrar_y_ordenar, clave_indice
+from imageRecopilator.Cloud.conteo import timestamp_desde_nombre
+from imageRecopilator.registro import TIPO_DIA, RegistroCamaras
+
+# Solo domingo / particiones (se importan al usarse, no al arrancar):
+# pipeline_domingo, codificador, listado, particiones.
+
 """
 SISTEMA COMPLETO: CAPTURA + PROCESAMIENTO DOMINICAL
 ====================================================
 
 FUNCIONAMIENTO:
 ---------------
-1. Loop principal infinito
-2. Lunes-Sábado: Captura imágenes cada 60s y sube a S3
-3. Domingos: Ejecuta job de procesamiento (timelapses)
-4. Vuelve al paso 1
+1. Captura continua: cada cámara captura cada 60s dentro de su horario
+   (lunes-sábado, y domingo si la planta tiene horario "domingo") y sube a S3
+2. Domingos: encola el procesamiento de la semana anterior (trabajos.py)
+3. Un worker en otro proceso, con nice/ionice, ejecuta la cola
+   (timelapses) sin detener ni frenar la captura
+
+Con PROCESAMIENTO_DOMINGO=0 (`flujoprt capture`) la semana no se encola:
+la procesa `flujoprt process` por cron (ver cli.py).
 
 OPTIMIZACIONES DOMINGO:
 -----------------------
 - Deduplicación temprana (antes de descargar)
 - Procesamiento por lotes (2 plantas en paralelo)
-- Descargas paralelas (5 a la vez)
+- Descargas paralelas con ventana acotada, una sola vez por frame
+  (pipeline compartido entre timelapse y conteo)
 - Borrado progresivo
-- FFmpeg optimizado (preset=fast, crf=28)
+- Perfiles de codificación (TIMELAPSE_PERFIL: rapido | tamano | archivo)
+
+ARRANQUE:
+---------
+- Importar el módulo no crea colas, pools, executor ni handlers de señal:
+  todo se arma en `inicializar()` al entrar a main().
+- Las dependencias del domingo (ffmpeg, pipeline, listado) y boto3 se
+  cargan al usarse; la captura arranca mientras se verifican las
+  credenciales AWS en paralelo.
+- Se registra el tiempo hasta el primer frame contra ARRANQUE_PRESUPUESTO.
 """
 
-# uvloop para mejor performance en Linux
-try:
-    import uvloop
-    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-except ImportError:
-    pass
-
 
 # =========================
 # Configuración
@@ -56,14 +88,46 @@ S3_BUCKET = os.getenv("S3_BUCKET", "flujo-prt-imagenes")
 S3_PREFIX = os.getenv("S3_PREFIX", "capturas")
 
 INTERVALO = int(os.getenv("INTERVALO", "60"))
-MARGEN_PREVIO = int(os.getenv("MARGEN_PREVIO", "1200"))  # 20 min
+INTERVALO_MAX = int(os.getenv("INTERVALO_MAX", "300"))  # tope del sondeo adaptativo
 
 TZ = os.getenv("TZ", "America/Santiago")
 JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "80"))
+CALIDAD_PRESUPUESTO_MB = float(os.getenv("CALIDAD_PRESUPUESTO_MB", "0"))  # MB/planta/día; 0 = calidad fija
+CALIDAD_MIN = int(os.getenv("CALIDAD_MIN", "40"))
+CALIDAD_MAX = int(os.getenv("CALIDAD_MAX", "90"))
+RECOMPRESION_MOTOR = os.getenv("RECOMPRESION_MOTOR", "pillow")  # pillow | jpegtran (sin pérdida)
 MAX_DESCARGAS_SIMULTANEAS = int(os.getenv("MAX_DESCARGAS", "10"))
+HILOS_RECOMPRESION = 2  # executor de recompresión y detectores
 QUEUE_SIZE = int(os.getenv("QUEUE_SIZE", "40"))
 NUM_UPLOADERS = int(os.getenv("NUM_UPLOADERS", "2"))
 METRICAS_INTERVALO = int(os.getenv("METRICAS_INTERVALO", "300"))  # 5 min
+TAMANO_SLOT = int(os.getenv("TAMANO_SLOT_KB", "1024")) * 1024
+ACTIVIDAD_MODO = os.getenv("ACTIVIDAD_MODO", "marcar")  # apagado | marcar | omitir
+FRESCURA_HABILITADA = os.getenv("FRESCURA_HABILITADA", "1") == "1"  # detección de imagen congelada
+CONTEO_HABILITADO = os.getenv("CONTEO_HABILITADO", "1") == "1"
+COMPACTACION_HABILITADA = os.getenv("COMPACTACION_HABILITADA", "1") == "1"
+INDICES_INTERVALO = int(os.getenv("INDICES_INTERVALO", "300"))  # volcado del índice lateral
+PROCESAMIENTO_DOMINGO = os.getenv("PROCESAMIENTO_DOMINGO", "1") == "1"  # 0: no encola la semana (cron aparte)
+
+# Cola de trabajos pesados (ver trabajos.py): la captura encola, un proceso aparte ejecuta
+TRABAJOS_DB = os.getenv("TRABAJOS_DB", os.path.expanduser("~/.flujoprt/trabajos.db"))
+TRABAJOS_EJECUTOR = os.getenv("TRABAJOS_EJECUTOR", "1") == "1"  # 0: los consume un `flujoprt work` externo
+TRABAJOS_NICE = int(os.getenv("TRABAJOS_NICE", "10"))
+TRABAJOS_IONICE = int(os.getenv("TRABAJOS_IONICE", "3"))         # 3 = idle, 2 = best-effort
+TRABAJOS_NOCTURNO = os.getenv("TRABAJOS_NOCTURNO", "0") == "1"  # render de cada día al cierre
+
+# Captura particionada (ver particiones.py)
+PARTICIONES = int(os.getenv("PARTICIONES", "0"))       # >0: este proceso lanza N particiones
+PARTICION_ID = os.getenv("PARTICION_ID")               # None = proceso único con todas las cámaras
+PARTICIONES_DB = os.getenv("PARTICIONES_DB", os.path.expanduser("~/flujoprt_particiones.db"))
+PARTICION_TTL = int(os.getenv("PARTICION_TTL", "90"))
+PARTICION_LATIDO = int(os.getenv("PARTICION_LATIDO", "20"))
+
+# Bitácora columnar de intentos de captura (ver bitacora.py); vacío la desactiva
+BITACORA_DIR = os.getenv("BITACORA_DIR", os.path.expanduser("~/.flujoprt/bitacora"))
+BITACORA_VOLCADO = int(os.getenv("BITACORA_VOLCADO", "60"))
+
+ARRANQUE_PRESUPUESTO = float(os.getenv("ARRANQUE_PRESUPUESTO", "10"))  # segundos hasta el primer frame
 
 os.environ["TZ"] = TZ
 
@@ -86,73 +150,71 @@ logger = logging.getLogger("flujo-prt")
 
 
 # =========================
-# Cámaras
+# Cámaras y horarios
 # =========================
 
-camaras = {
-    "Huechuraba": "10.57.6.222_Cam08",
-    "La Florida": "10.57.0.222_Cam03",
-    "La Pintana": "10.57.5.222_Cam09",
-    "Pudahuel": "10.57.4.222_Cam07",
-    "Quilicura": "10.57.2.222_Cam06",
-    "Recoleta": "10.57.7.222_Cam09",
-    "San Joaquin": "10.57.3.222_Cam07",
-    "Temuco": "10.57.32.222_Cam01",
-    "Villarica": "10.57.33.222_Cam04",
-    "Chillan": "10.57.12.70",
-    "Yungay": "10.57.20.70",
-    "Concepcion": "10.57.19.70",
-    "San Pedro de la Paz": "10.57.16.70",
-    "Yumbel": "10.57.17.70"
-}
+# Plantas, cámaras, horarios y denominadores en camaras.json (CAMARAS_CONFIG).
+# Los dicts se actualizan en el lugar al recargar el archivo.
+registro = RegistroCamaras()
+camaras = registro.camaras
+HORARIOS = registro.horarios
+DENOMINADORES = registro.denominadores
 
 
 # =========================
-# Horarios
+# Detección de actividad
 # =========================
 
-HORARIOS = {
-    "Huechuraba": {"semana": ("07:10", "16:50"), "sabado": ("07:10", "16:50")},
-    "La Florida": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "La Pintana": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "Pudahuel": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "Quilicura": {"semana": ("07:10", "16:50"), "sabado": ("07:10", "16:50")},
-    "Recoleta": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "San Joaquin": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "Temuco": {"semana": ("08:10", "18:20"), "sabado": ("08:10", "13:50")},
-    "Villarica": {"semana": ("07:10", "17:50"), "sabado": ("07:40", "13:50")},
-    "Chillan": {"semana": ("06:40", "17:20"), "sabado": ("07:10", "13:50")},
-    "Yungay": {"semana": ("07:40", "17:20"), "sabado": ("08:10", "13:50")},
-    "Concepcion": {"semana": ("07:40", "20:20"), "sabado": ("08:10", "16:50")},
-    "San Pedro de la Paz": {"semana": ("07:40", "17:20"), "sabado": ("08:10", "13:50")},
-    "Yumbel": {"semana": ("07:40", "17:20"), "sabado": ("08:10", "13:50")}
+# Overrides por planta sobre CONFIG_ACTIVIDAD_DEFAULT (modo, umbrales, etc.)
+ACTIVIDAD_POR_PLANTA = {
+    # "Concepcion": {"modo": "omitir", "umbral_area": 0.02},
 }
 
-DENOMINADORES = {
-    "Huechuraba": "HCH",
-    "La Florida": "LFL",
-    "La Pintana": "LPT",
-    "Pudahuel": "PUD",
-    "Quilicura": "QLC",
-    "Recoleta": "RCL",
-    "San Joaquin": "SJQ",
-    "Temuco": "TMU",
-    "Villarica": "VLL",
-    "Chillan": "CHL",
-    "Yungay": "YGY",
-    "Concepcion": "CCP",
-    "San Pedro de la Paz": "SPP",
-    "Yumbel": "YMB"
+# Overrides por planta sobre CONFIG_FRESCURA_DEFAULT (máscara del overlay, umbrales, ventana)
+FRESCURA_POR_PLANTA = {
+    # "Osorno": {"mascara": [(0.0, 0.0, 1.0, 0.1), (0.8, 0.9, 1.0, 1.0)]},
+}
+
+# Prioridad de cada planta ante la política de carga (default 1; 0 se descarta primero, 2 al último)
+PRIORIDAD_POR_PLANTA = {
+    # "Temuco": 2,
+}
+
+# Overrides por planta sobre CONFIG_SALUD_DEFAULT (intentos, backoff, intervalos)
+SALUD_POR_PLANTA = {
+    # "Yumbel": {"intervalo_max": 600},
+}
+
+# Región de interés (polígono en fracciones 0-1) para el conteo dominical
+ROI_POR_PLANTA = {
+    # "Temuco": {"roi": [(0.1, 0.4), (0.9, 0.4), (0.9, 1.0), (0.1, 1.0)]},
+}
+
+# Motor de recompresión por planta, sobre RECOMPRESION_MOTOR (ver recompresion.py)
+RECOMPRESION_POR_PLANTA = {
+    # "Temuco": "jpegtran",
+}
+
+# Presupuesto de almacenamiento por planta (MB/día), sobre CALIDAD_PRESUPUESTO_MB
+PRESUPUESTO_POR_PLANTA = {
+    # "Concepcion": 250,
 }
 
 
 # =========================
-# SSL
+# Reloj
 # =========================
 
-ssl_context = ssl.create_default_context()
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE
+# Toda consulta de hora de la captura pasa por aquí (ver reloj.py): la
+# simulación lo reemplaza por un RelojVirtual antes de inicializar().
+reloj = RelojSistema()
+
+
+def configurar_reloj(nuevo):
+    """Reemplaza el reloj del proceso. Retorna el anterior."""
+    global reloj
+    anterior, reloj = reloj, nuevo
+    return anterior
 
 
 # =========================
@@ -161,30 +223,22 @@ ssl_context.verify_mode = ssl.CERT_NONE
 
 RUNNING = True
 
-def shutdown_handler(signum, frame):
+def shutdown_handler(signum=None, frame=None):
     global RUNNING
     logger.warning("="*60)
     logger.warning("SEÑAL DE APAGADO RECIBIDA - Cerrando limpiamente...")
     logger.warning("="*60)
     RUNNING = False
 
-signal.signal(signal.SIGTERM, shutdown_handler)
-signal.signal(signal.SIGINT, shutdown_handler)
-
-
-# =========================
-# Semáforo y Cola
-# =========================
-
-SEM_DESCARGAS = asyncio.Semaphore(MAX_DESCARGAS_SIMULTANEAS)
-cola_subida = asyncio.Queue(maxsize=QUEUE_SIZE)
-
-
-# =========================
-# ThreadPool para compresión
-# =========================
 
-executor = ThreadPoolExecutor(max_workers=2)
+def instalar_senales():
+    """SIGTERM/SIGINT -> apagado limpio. Se instala en main(), no al importar."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, shutdown_handler, sig)
+        except NotImplementedError:
+            signal.signal(sig, shutdown_handler)      # Windows
 
 
 # =========================
@@ -196,11 +250,14 @@ class Metricas:
         self.imagenes_capturadas = 0
         self.imagenes_subidas = 0
         self.imagenes_duplicadas = 0
+        self.imagenes_sin_actividad = 0
+        self.imagenes_congeladas = 0
         self.errores_descarga = 0
         self.errores_s3 = 0
         self.bytes_comprimidos = 0
         self.bytes_originales = 0
-        self.ultima_impresion = time.time()
+        self.ultima_impresion = reloj.time()
+        self.acumulado = defaultdict(int)
         self.lock = asyncio.Lock()
     
     async def registrar_captura(self):
@@ -217,6 +274,14 @@ class Metricas:
         async with self.lock:
             self.imagenes_duplicadas += 1
     
+    async def registrar_sin_actividad(self):
+        async with self.lock:
+            self.imagenes_sin_actividad += 1
+    
+    async def registrar_congelada(self):
+        async with self.lock:
+            self.imagenes_congeladas += 1
+    
     async def registrar_error_descarga(self):
         async with self.lock:
             self.errores_descarga += 1
@@ -225,8 +290,28 @@ class Metricas:
         async with self.lock:
             self.errores_s3 += 1
     
+    def ventana(self):
+        return {
+            "imagenes_capturadas": self.imagenes_capturadas,
+            "imagenes_subidas": self.imagenes_subidas,
+            "imagenes_duplicadas": self.imagenes_duplicadas,
+            "imagenes_sin_actividad": self.imagenes_sin_actividad,
+            "imagenes_congeladas": self.imagenes_congeladas,
+            "errores_descarga": self.errores_descarga,
+            "errores_s3": self.errores_s3,
+            "bytes_comprimidos": self.bytes_comprimidos,
+            "bytes_originales": self.bytes_originales,
+        }
+    
+    def totales(self):
+        """Contadores desde el arranque del proceso (para agregar entre particiones)"""
+        totales = dict(self.acumulado)
+        for nombre, valor in self.ventana().items():
+            totales[nombre] = totales.get(nombre, 0) + valor
+        return totales
+    
     async def imprimir_si_toca(self):
-        ahora = time.time()
+        ahora = reloj.time()
         async with self.lock:
             if ahora - self.ultima_impresion >= METRICAS_INTERVALO:
                 ahorro_pct = 0
@@ -235,22 +320,142 @@ class Metricas:
                 
                 logger.info("="*60)
                 logger.info(f"MÉTRICAS ({METRICAS_INTERVALO/60:.0f} min):")
-                logger.info(f"  Capturadas: {self.imagenes_capturadas} | Subidas: {self.imagenes_subidas} | Duplicadas: {self.imagenes_duplicadas}")
+                logger.info(f"  Capturadas: {self.imagenes_capturadas} | Subidas: {self.imagenes_subidas} | Duplicadas: {self.imagenes_duplicadas} | Sin actividad: {self.imagenes_sin_actividad} | Congeladas: {self.imagenes_congeladas}")
                 logger.info(f"  Errores: Descarga={self.errores_descarga} S3={self.errores_s3}")
                 logger.info(f"  Compresión: {self.bytes_originales/1024/1024:.1f}MB -> {self.bytes_comprimidos/1024/1024:.1f}MB (ahorro {ahorro_pct:.1f}%)")
-                logger.info(f"  Cola: {cola_subida.qsize()}/{QUEUE_SIZE}")
+                logger.info(f"  Cola: {cola_subida.qsize()}/{QUEUE_SIZE} | Carga: {NIVELES[politica_carga.nivel]}")
+                descartes = politica_carga.resumen()
+                if descartes:
+                    detalle = ", ".join(f"{p}={sum(m.values())}" for p, m in descartes.items())
+                    logger.info(f"  Descartados por carga (acumulado): {detalle}")
+                no_sanas = registro_salud.no_sanas()
+                if no_sanas:
+                    estados = ", ".join(f"{p}={s.estado}({s.segundos_hasta_sondeo():.0f}s)" for p, s in no_sanas.items())
+                    logger.info(f"  Cámaras no sanas: {estados}")
+                congeladas = detector_frescura.resumen()
+                if congeladas:
+                    logger.info(f"  Imagen congelada: {', '.join(f'{p} ({n} frames)' for p, n in congeladas.items())}")
+                logger.info(f"  Buffers: entrada {pool_entrada.en_uso()}/{pool_entrada.total} | salida {pool_salida.en_uso()}/{pool_salida.total} | desbordes {pool_entrada.desbordes + pool_salida.desbordes}")
                 logger.info("="*60)
                 
+                for nombre, valor in self.ventana().items():
+                    self.acumulado[nombre] += valor
                 self.imagenes_capturadas = 0
                 self.imagenes_subidas = 0
                 self.imagenes_duplicadas = 0
+                self.imagenes_sin_actividad = 0
+                self.imagenes_congeladas = 0
                 self.errores_descarga = 0
                 self.errores_s3 = 0
                 self.bytes_comprimidos = 0
                 self.bytes_originales = 0
                 self.ultima_impresion = ahora
 
-metricas = Metricas()
+# =========================
+# Estado del proceso
+# =========================
+
+# Se crean en inicializar(): importar el módulo no reserva buffers ni hilos
+ssl_context = None
+SEM_DESCARGAS = None
+cola_subida = None
+pool_entrada = None
+pool_salida = None
+executor = None
+metricas = None
+registro_salud = None
+detector_actividad = None
+detector_frescura = None
+politica_carga = None
+controlador_calidad = None
+indice_diario = None
+servicio_borrado = None
+cola_trabajos = None
+coordinador = None
+bitacora = None
+
+# Hitos del arranque en segundos desde T_INICIO
+arranque = {"importacion": None, "inicializacion": None, "primer_frame": None}
+
+
+def inicializar(captura=True):
+    """
+    Crea executor y servicios del proceso y, con `captura`, la cola de
+    subida y los pools de buffers (los workers de trabajos no los usan).
+    Idempotente.
+    """
+    global ssl_context, SEM_DESCARGAS, cola_subida, pool_entrada, pool_salida, executor, politica_carga
+    global metricas, registro_salud, detector_actividad, detector_frescura, controlador_calidad
+    global indice_diario, servicio_borrado, cola_trabajos, coordinador, bitacora
+    
+    if captura and cola_subida is None:
+        SEM_DESCARGAS = asyncio.Semaphore(MAX_DESCARGAS_SIMULTANEAS)
+        cola_subida = asyncio.Queue(maxsize=QUEUE_SIZE)
+        politica_carga = PoliticaCarga(QUEUE_SIZE, PRIORIDAD_POR_PLANTA)
+        if BITACORA_DIR:
+            bitacora = BitacoraCapturas(BITACORA_DIR, sufijo=PARTICION_ID, reloj=reloj.time)
+        
+        # Entrada: uno por descarga en vuelo + uno por recompresión en curso (el slot se
+        # suelta al terminar de recomprimir, fuera del semáforo). Salida: cola + uploaders + compresiones
+        pool_entrada = PoolBuffers(MAX_DESCARGAS_SIMULTANEAS + HILOS_RECOMPRESION, TAMANO_SLOT)
+        pool_salida = PoolBuffers(QUEUE_SIZE + NUM_UPLOADERS + MAX_DESCARGAS_SIMULTANEAS, TAMANO_SLOT)
+    
+    if executor is not None:
+        return
+    
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    
+    # ThreadPool para compresión
+    executor = ThreadPoolExecutor(max_workers=HILOS_RECOMPRESION)
+    
+    metricas = Metricas()
+    
+    registro_salud = RegistroSalud(
+        config_por_planta=SALUD_POR_PLANTA,
+        config_default={"intervalo_min": INTERVALO, "intervalo_max": max(INTERVALO, INTERVALO_MAX)},
+        reloj=reloj.monotonic
+    )
+    
+    detector_actividad = DetectorActividad(
+        config_por_planta=ACTIVIDAD_POR_PLANTA,
+        config_default={"modo": ACTIVIDAD_MODO}
+    )
+    
+    detector_frescura = DetectorFrescura(
+        config_por_planta=FRESCURA_POR_PLANTA,
+        config_default={"habilitado": FRESCURA_HABILITADA}
+    )
+    
+    controlador_calidad = ControladorCalidad(
+        CALIDAD_PRESUPUESTO_MB, PRESUPUESTO_POR_PLANTA, horas=registro.horas, intervalo=INTERVALO,
+        calidad_fija=JPEG_QUALITY, calidad_min=CALIDAD_MIN, calidad_max=CALIDAD_MAX, reloj=reloj.ahora
+    )
+    
+    indice_diario = IndiceDiario(S3_BUCKET)
+    servicio_borrado = ServicioBorrado(S3_BUCKET)
+    cola_trabajos = ColaTrabajos(TRABAJOS_DB, reloj=reloj.time)
+    
+    if PARTICION_ID:
+        from imageRecopilator.Cloud.particiones import CoordinadorSQLite
+        coordinador = CoordinadorSQLite(PARTICIONES_DB, PARTICION_ID, PARTICION_TTL)
+    
+    arranque["inicializacion"] = time.perf_counter() - T_INICIO
+
+
+def marcar_primer_frame(planta):
+    """Cierra la medición de arranque en frío con el primer frame encolado"""
+    if arranque["primer_frame"] is not None:
+        return
+    arranque["primer_frame"] = segundos = time.perf_counter() - T_INICIO
+    detalle = (f"importación {(arranque['importacion'] or 0) * 1000:.0f}ms, "
+               f"inicialización {(arranque['inicializacion'] or 0) * 1000:.0f}ms")
+    if segundos > ARRANQUE_PRESUPUESTO:
+        logger.warning(f"ARRANQUE: primer frame ({planta}) a los {segundos:.1f}s, "
+                       f"sobre el presupuesto de {ARRANQUE_PRESUPUESTO:g}s ({detalle})")
+    else:
+        logger.info(f"ARRANQUE: primer frame ({planta}) a los {segundos:.1f}s ({detalle})")
 
 
 # =========================
@@ -258,54 +463,36 @@ metricas = Metricas()
 # =========================
 
 def es_domingo():
-    return datetime.now().weekday() == 6
+    return reloj.ahora().weekday() == 6
 
 
 def dentro_horario(planta):
-    ahora = datetime.now()
+    ahora = reloj.ahora()
     dia = ahora.weekday()
 
-    if dia == 6:
-        return False
-
-    tipo = "sabado" if dia == 5 else "semana"
-    inicio, fin = HORARIOS[planta][tipo]
-
-    h_ini = datetime.strptime(inicio, "%H:%M").time()
-    h_fin = datetime.strptime(fin, "%H:%M").time()
+    tipo = TIPO_DIA[dia]
+    if tipo not in registro.horas[planta]:
+        return False                    # domingo: solo plantas con horario "domingo"
+    h_ini, h_fin = registro.horas[planta][tipo]
 
     return h_ini <= ahora.time() <= h_fin
 
 
-def segundos_hasta_apertura(planta):
-    ahora = datetime.now()
-    dia = ahora.weekday()
+def semana_anterior(ahora=None):
+    """(año, semana) ISO del lunes-sábado pasado (el domingo, la que acaba de cerrar)"""
+    ahora = ahora or reloj.ahora()
+    sabado = ahora - timedelta(days=(ahora.weekday() - 5) % 7 or 7)
+    return sabado.isocalendar()[:2]
 
-    if dia == 6:
-        return None
 
-    tipo = "sabado" if dia == 5 else "semana"
-    inicio, _ = HORARIOS[planta][tipo]
-
-    hora_inicio = datetime.strptime(inicio, "%H:%M").time()
-    apertura = datetime.combine(ahora.date(), hora_inicio)
-
-    if ahora.time() < hora_inicio:
-        return int((apertura - ahora).total_seconds())
-    else:
-        dia_siguiente = (dia + 1) % 7
-        
-        if dia_siguiente == 6:
-            return None
-            
-        tipo_siguiente = "sabado" if dia_siguiente == 5 else "semana"
-        inicio_siguiente, _ = HORARIOS[planta][tipo_siguiente]
-        
-        hora_inicio_siguiente = datetime.strptime(inicio_siguiente, "%H:%M").time()
-        apertura_siguiente = datetime.combine(ahora.date(), hora_inicio_siguiente) + timedelta(days=1)
-        
-        segundos = int((apertura_siguiente - ahora).total_seconds())
-        return segundos
+def fechas_semana(año, semana):
+    """
+    Días que procesa el trabajo de la semana: el domingo previo (capturas
+    con horario "domingo") y lunes..sábado. Cada domingo cae en exactamente
+    un conjunto, así sus frames también se procesan y se borran.
+    """
+    lunes = datetime.fromisocalendar(año, semana, 1)
+    return [lunes + timedelta(days=d) for d in range(-1, 6)]
 
 
 def todas_fuera_de_horario():
@@ -315,79 +502,6 @@ def todas_fuera_de_horario():
     return True
 
 
-def obtener_tiempos_restantes():
-    tiempos = {}
-    for planta in camaras.keys():
-        if es_domingo():
-            tiempos[planta] = None
-        elif dentro_horario(planta):
-            tiempos[planta] = 0
-        else:
-            tiempos[planta] = segundos_hasta_apertura(planta)
-    return tiempos
-
-
-def obtener_menor_tiempo_espera():
-    tiempos = obtener_tiempos_restantes()
-    tiempos_validos = [t for t in tiempos.values() if t is not None and t > 0]
-    
-    if not tiempos_validos:
-        return None
-    
-    return min(tiempos_validos)
-
-
-async def esperar_hasta_apertura():
-    """
-    Suspensión COMPARTIDA - todas las plantas esperan juntas.
-    """
-    while RUNNING:
-        if es_domingo():
-            ahora = datetime.now()
-            lunes = ahora + timedelta(days=1)
-            while lunes.weekday() != 0:
-                lunes += timedelta(days=1)
-            
-            primer_hora = min(HORARIOS[p]["semana"][0] for p in camaras.keys())
-            hora_apertura = datetime.strptime(primer_hora, "%H:%M").time()
-            apertura_lunes = datetime.combine(lunes.date(), hora_apertura)
-            
-            despertar = apertura_lunes - timedelta(seconds=MARGEN_PREVIO)
-            segundos = int((despertar - ahora).total_seconds())
-            
-            horas = segundos // 3600
-            minutos = (segundos % 3600) // 60
-            logger.info(f"Domingo. Suspendiendo {horas}h {minutos}min (hasta 20 min antes de apertura del lunes)...")
-            
-            # Sleep con checkpoints cada minuto
-            for _ in range(int(segundos / 60)):
-                if not RUNNING:
-                    return
-                await asyncio.sleep(60)
-            continue
-        
-        if todas_fuera_de_horario():
-            menor = obtener_menor_tiempo_espera()
-            if menor:
-                espera_real = max(0, menor - MARGEN_PREVIO)
-                minutos = int(espera_real / 60)
-                logger.info(f"Todas fuera de horario. Suspendiendo {minutos} min (hasta 20 min antes de apertura)...")
-                
-                # Sleep con checkpoints cada minuto
-                for _ in range(int(espera_real / 60)):
-                    if not RUNNING:
-                        return
-                    await asyncio.sleep(60)
-            else:
-                logger.info("Sin aperturas inmediatas. Verificando en 1 hora...")
-                for _ in range(60):
-                    if not RUNNING:
-                        return
-                    await asyncio.sleep(60)
-        else:
-            break
-
-
 # =========================
 # Utilidades de procesamiento
 # =========================
@@ -396,23 +510,62 @@ def hash_imagen(data: bytes) -> str:
     return hashlib.md5(data, usedforsecurity=False).hexdigest()
 
 
-def recomprimir_jpeg_sync(data: bytes) -> bytes:
+def recomprimir_jpeg_sync(data, destino=None, planta=None):
+    """
+    Recomprime sin EXIF. Con `destino` (SlotBuffer) escribe en el slot y
+    retorna su memoryview; sin destino retorna bytes. Con `planta`, la
+    calidad la decide el controlador según el presupuesto de la planta.
+    Las plantas con motor `jpegtran` se optimizan sin decodificar.
+    """
     try:
-        img = Image.open(io.BytesIO(data))
+        if RECOMPRESION_POR_PLANTA.get(planta, RECOMPRESION_MOTOR) == "jpegtran":
+            resultado = optimizar_sin_perdida(data, destino)
+            controlador_calidad.registrar(planta, len(resultado), None)
+            return resultado
+        
+        img = Image.open(LectorMemoria(data))
         if 'exif' in img.info:
             img.info.pop('exif')
         
-        buffer = io.BytesIO()
-        img.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
-        return buffer.getvalue()
+        calidad = controlador_calidad.calidad(planta, data)
+        if planta and politica_carga and politica_carga.reduccion_calidad():
+            # Cola bajo presión: frames más livianos para que los uploaders la vacíen
+            calidad = max(min(calidad, CALIDAD_MIN), calidad - politica_carga.reduccion_calidad())
+        buffer = destino if destino is not None else io.BytesIO()
+        img.save(buffer, format='JPEG', quality=calidad, optimize=True)
+        resultado = buffer.vista() if destino is not None else buffer.getvalue()
+        controlador_calidad.registrar(planta, len(resultado), calidad)
+        return resultado
     except Exception as e:
         logger.error(f"Error recompresión: {e}")
-        return data
+        # Copia: el buffer de entrada vuelve al pool al terminar la captura
+        return bytes(data)
+
+
+async def recomprimir_jpeg(data, destino=None, planta=None):
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, recomprimir_jpeg_sync, data, destino, planta)
+
+
+async def evaluar_actividad(planta: str, data: bytes):
+    """Retorna (subir, puntaje) según el detector de actividad de la planta"""
+    if detector_actividad.modo(planta) == "apagado":
+        return True, None
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, detector_actividad.evaluar, planta, data)
+
+
+def frame_activo(planta: str, puntaje) -> bool:
+    """Sin detector (puntaje None) todo frame cuenta como activo"""
+    return puntaje is None or puntaje >= detector_actividad.config(planta)["umbral_area"]
 
 
-async def recomprimir_jpeg(data: bytes) -> bytes:
+async def evaluar_frescura(planta: str, data: bytes) -> bool:
+    """True si el frame repite la imagen congelada de la planta"""
+    if not FRESCURA_HABILITADA:
+        return False
     loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(executor, recomprimir_jpeg_sync, data)
+    return await loop.run_in_executor(executor, detector_frescura.evaluar, planta, data)
 
 
 def generar_s3_key(planta: str, fecha_str: str) -> str:
@@ -437,15 +590,17 @@ def generar_s3_key(planta: str, fecha_str: str) -> str:
 async def verificar_credenciales_aws():
     logger.info("Verificando credenciales AWS...")
     
-    session = aioboto3.Session()
+    # boto3 tarda en importarse: en un hilo, para no frenar las capturas ya en curso
+    await asyncio.to_thread(importlib.import_module, "aioboto3")
+    from botocore.exceptions import NoCredentialsError
     
     try:
-        async with session.client('sts') as sts:
-            identity = await sts.get_caller_identity()
-            logger.info(f"✓ Credenciales AWS válidas")
-            logger.info(f"  Account: {identity['Account']}")
-            logger.info(f"  ARN: {identity['Arn']}")
-            return True
+        sts = await gestor_s3().cliente('sts')
+        identity = await sts.get_caller_identity()
+        logger.info(f"✓ Credenciales AWS válidas")
+        logger.info(f"  Account: {identity['Account']}")
+        logger.info(f"  ARN: {identity['Arn']}")
+        return True
     except NoCredentialsError:
         logger.critical("="*60)
         logger.critical("ERROR: NO SE ENCONTRARON CREDENCIALES AWS")
@@ -456,41 +611,76 @@ async def verificar_credenciales_aws():
         return False
 
 
+async def verificar_aws_en_paralelo():
+    """
+    Corre junto a las primeras capturas (los frames esperan en la cola).
+    Sin credenciales válidas detiene el proceso como antes.
+    """
+    global RUNNING
+    try:
+        ok = await verificar_credenciales_aws()
+        if ok:
+            await gestor_s3().cliente("s3")           # precalienta el pool de los uploaders
+    except Exception as e:
+        logger.critical(f"ERROR AL PREPARAR CLIENTES AWS: {e}")
+        ok = False
+    if not ok:
+        logger.critical("ABORTANDO: Configura credenciales AWS primero")
+        RUNNING = False
+    return ok
+
+
 # =========================
 # Worker S3
 # =========================
 
 async def worker_subida_s3(worker_id: int):
-    session = aioboto3.Session()
-    
+    from botocore.exceptions import BotoCoreError, ClientError
     logger.info(f"Worker S3 #{worker_id} iniciado")
     
-    async with session.client('s3') as s3:
+    async with gestor_s3().s3() as s3:
         while RUNNING or not cola_subida.empty():
             try:
                 item = await asyncio.wait_for(cola_subida.get(), timeout=5.0)
                 
-                planta, fecha_str, data_comprimida, bytes_originales = item
+                # Items: (planta, fecha, data, bytes_originales[, info])
+                planta, fecha_str, data_comprimida, bytes_originales, *extra = item
+                info = extra[0] if extra else {}
                 
                 key = generar_s3_key(planta, fecha_str)
                 
+                # Los frames en slots del pool se suben leyendo la misma memoria
+                if isinstance(data_comprimida, memoryview):
+                    body = LectorMemoria(data_comprimida)
+                else:
+                    body = data_comprimida
+                
                 try:
                     await s3.put_object(
                         Bucket=S3_BUCKET,
                         Key=key,
-                        Body=data_comprimida,
+                        Body=body,
+                        ContentLength=len(data_comprimida),
                         ContentType="image/jpeg",
-                        StorageClass="INTELLIGENT_TIERING"
+                        StorageClass="INTELLIGENT_TIERING",
+                        Metadata=info.get("metadata", {})
                     )
                     
                     await metricas.registrar_subida(bytes_originales, len(data_comprimida))
+                    if "intento" in info:
+                        anotar_intento(planta, info["intento"], "subida")
+                    if "md5" in info.get("metadata", {}):
+                        indice_diario.agregar(datetime.strptime(fecha_str, "%Y%m%d_%H%M%S"), planta, key, info["metadata"])
                     logger.debug(f"[W{worker_id}] ✓ {planta} → s3://{S3_BUCKET}/{key}")
                     
                 except (BotoCoreError, ClientError) as e:
                     await metricas.registrar_error_s3()
+                    if "intento" in info:
+                        anotar_intento(planta, info["intento"], "error_s3")
                     logger.error(f"[W{worker_id}] S3 {planta}: {e}")
                 
                 finally:
+                    pool_salida.liberar(info.get("slot"))
                     cola_subida.task_done()
                     
             except asyncio.TimeoutError:
@@ -504,16 +694,278 @@ async def worker_subida_s3(worker_id: int):
     logger.info(f"Worker S3 #{worker_id} finalizado")
 
 
+# =========================
+# Bitácora de capturas
+# =========================
+
+def anotar_captura(planta, ts, resultado, estado=0, latencia=0.0, bytes_=0):
+    """Una fila por intento en la bitácora columnar (no-op si está desactivada)"""
+    if bitacora is not None:
+        bitacora.registrar(planta, ts, resultado, estado, latencia * 1000, bytes_)
+
+
+def anotar_intento(planta, intento, resultado):
+    """`intento` = (ts, estado, latencia, bytes) de una descarga exitosa"""
+    ts, estado, latencia, bytes_ = intento
+    anotar_captura(planta, ts, resultado, estado, latencia, bytes_)
+
+
+async def volcar_bitacora():
+    if bitacora is None:
+        return
+    try:
+        await asyncio.to_thread(bitacora.volcar)
+        await asyncio.to_thread(bitacora.rotar)
+    except Exception as e:
+        logger.error(f"Volcado de bitácora falló: {e}")
+
+
+async def tarea_bitacora():
+    while RUNNING:
+        await asyncio.sleep(BITACORA_VOLCADO)
+        await volcar_bitacora()
+
+
+# =========================
+# Índice lateral de metadatos
+# =========================
+
+async def volcar_indices():
+    try:
+        async with gestor_s3().s3() as s3:
+            escritos = await indice_diario.volcar(s3)
+        if escritos:
+            logger.debug(f"Índices laterales actualizados: {escritos}")
+    except Exception as e:
+        logger.error(f"Volcado de índices falló: {e}")
+    indice_diario.descartar_anteriores(reloj.ahora())
+
+
+async def tarea_indices():
+    while RUNNING:
+        await asyncio.sleep(INDICES_INTERVALO)
+        await volcar_indices()
+
+
+# =========================
+# Compactación nocturna
+# =========================
+
+def dias_por_compactar(ahora, compactados):
+    """
+    Días lunes..hoy de la semana en curso aún no compactados (hoy solo tras
+    el último cierre). El domingo solo se compacta a sí mismo y solo si
+    alguna planta tiene horario "domingo": abre el conjunto de la semana
+    siguiente (ver fechas_semana).
+    """
+    tipo = TIPO_DIA[ahora.weekday()]
+    cierres = [HORARIOS[p][tipo][1] for p in camaras.keys() if tipo in HORARIOS[p]]
+    if not cierres:
+        return []
+    ultimo_cierre = max(cierres)
+    
+    dias = []
+    desde = 0 if ahora.weekday() == 6 else ahora.weekday()
+    for offset in range(desde, -1, -1):
+        dia = (ahora - timedelta(days=offset)).replace(hour=0, minute=0, second=0, microsecond=0)
+        if dia.date() in compactados:
+            continue
+        if offset == 0 and ahora.strftime("%H:%M") <= ultimo_cierre:
+            continue
+        dias.append(dia)
+    return dias
+
+
+async def tarea_compactacion():
+    """
+    Empaqueta cada planta-día en un shard durante las horas sin captura.
+    """
+    compactados = set()
+    
+    while RUNNING:
+        if todas_fuera_de_horario() and await es_lider():
+            dias = dias_por_compactar(reloj.ahora(), compactados)
+            if dias:
+                # Frames de hoy aún en cola deben subir antes de empaquetar
+                try:
+                    await asyncio.wait_for(cola_subida.join(), timeout=300)
+                except asyncio.TimeoutError:
+                    logger.warning("Compactación: cola de subida sin drenar, se reintentará")
+                    dias = []
+            
+            for dia in dias:
+                try:
+                    async with gestor_s3().s3() as s3:
+                        total = await compactar_dia(s3, S3_BUCKET, S3_PREFIX, dia)
+                    compactados.add(dia.date())
+                    logger.info(f"Compactación {dia.date()}: {total} frames empaquetados")
+                except Exception as e:
+                    logger.error(f"Compactación {dia.date()} falló: {e}")
+        
+        for _ in range(10):
+            if not RUNNING:
+                return
+            await asyncio.sleep(60)
+
+
+# =========================
+# Trabajos en segundo plano
+# =========================
+
+async def programar_trabajos(ahora=None):
+    """
+    Encola (una vez por clave) la semana anterior los domingos y, con
+    TRABAJOS_NOCTURNO, el render de cada día ya cerrado. Solo el líder.
+    """
+    if not await es_lider():
+        return
+    ahora = ahora or reloj.ahora()
+    
+    nuevos = []
+    if PROCESAMIENTO_DOMINGO and ahora.weekday() == 6:
+        año, semana = semana_anterior(ahora)
+        nuevos.append(("semana", {"año": año, "semana": semana}, f"semana:{año}-W{semana:02d}"))
+    if TRABAJOS_NOCTURNO:
+        for dia in dias_por_compactar(ahora, set()):
+            fin = dia + timedelta(days=1, seconds=-1)
+            parametros = {"plantas": sorted(camaras), "desde": dia.isoformat(), "hasta": fin.isoformat()}
+            nuevos.append(("render", parametros, f"render:{dia.date()}"))
+    
+    for tipo, parametros, clave in nuevos:
+        await asyncio.to_thread(cola_trabajos.encolar, tipo, parametros, clave)
+
+
+def comando_worker():
+    """`flujoprt work` con el mismo intérprete y src/ en el path (funciona sin instalar)"""
+    src = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")])))
+    comando = [sys.executable, "-m", "imageRecopilator.cli", "work", "--hasta-vaciar",
+               "--nice", str(TRABAJOS_NICE), "--ionice", str(TRABAJOS_IONICE)]
+    return comando, env
+
+
+async def tarea_ejecutor_trabajos():
+    """
+    Lanza un worker de trabajos (proceso aparte, nice/ionice) cuando la cola
+    tiene algo disponible; el worker termina solo al vaciarla. La captura
+    nunca ejecuta ffmpeg ni listados de la semana en su event loop.
+    """
+    proceso = None
+    try:
+        while RUNNING:
+            if proceso is not None and proceso.returncode is not None:
+                if proceso.returncode != 0:
+                    logger.warning(f"Worker de trabajos terminó con código {proceso.returncode}")
+                proceso = None
+            
+            # Como el encolado, solo el líder: cada partición tiene su propia cola SQLite
+            if proceso is None and await es_lider() and await asyncio.to_thread(cola_trabajos.pendientes):
+                comando, env = comando_worker()
+                proceso = await asyncio.create_subprocess_exec(*comando, env=env)
+                logger.info(f"Worker de trabajos iniciado (PID {proceso.pid}, nice {TRABAJOS_NICE}, ionice {TRABAJOS_IONICE})")
+            
+            await asyncio.sleep(60)
+    finally:
+        # El worker libera su trabajo al recibir SIGTERM; si no alcanza, el lease vence y se retoma
+        if proceso is not None and proceso.returncode is None:
+            proceso.terminate()
+            try:
+                await asyncio.wait_for(proceso.wait(), timeout=30)
+            except asyncio.TimeoutError:
+                proceso.kill()
+
+
+# =========================
+# Particiones
+# =========================
+
+async def es_lider():
+    """Sin particionar siempre es líder; particionado, solo el worker vivo de menor id"""
+    if coordinador is None:
+        return True
+    return await asyncio.to_thread(coordinador.es_lider)
+
+
+async def plantas_asignadas():
+    if coordinador is None:
+        return set(camaras)
+    return await asyncio.to_thread(coordinador.asignacion, list(camaras))
+
+
+async def reconciliar_capturas(session, tareas, deseadas):
+    """
+    Ajusta las tareas de captura (planta -> task) a las plantas deseadas:
+    cancela las que ya no corresponden y lanza las nuevas o caídas.
+    """
+    retiradas = [p for p in tareas if p not in deseadas]
+    for planta in retiradas:
+        tareas.pop(planta).cancel()
+    
+    nuevas = [p for p in deseadas if p not in tareas or tareas[p].done()]
+    for planta in nuevas:
+        tareas[planta] = asyncio.create_task(capturar_camara(session, planta, camaras[planta]))
+    
+    if retiradas or nuevas:
+        logger.info(f"Capturas reasignadas: +{sorted(nuevas)} -{sorted(retiradas)} ({len(tareas)} activas)")
+    return nuevas, retiradas
+
+
+async def aplicar_cambios_registro(session, tareas):
+    """Recarga camaras.json si cambió y ajusta solo las capturas afectadas (la cola sigue intacta)"""
+    cambios = registro.revisar()
+    if cambios is None:
+        return None
+    
+    # Antes de cualquier await: ninguna tarea debe ver una planta ya quitada
+    for planta in cambios["quitadas"] | cambios["modificadas"]:
+        tarea = tareas.pop(planta, None)
+        if tarea:
+            tarea.cancel()
+        # Otra cámara (o ninguna): el fondo y la ventana de frescura de la anterior no sirven
+        detector_actividad.reiniciar(planta)
+        detector_frescura.reiniciar(planta)
+    
+    await reconciliar_capturas(session, tareas, await plantas_asignadas())
+    return cambios
+
+
+async def tarea_latido():
+    """Renueva el lease y publica métricas durante toda la vida del proceso (también domingos)"""
+    ultima_agregacion = reloj.time()
+    while RUNNING:
+        try:
+            await asyncio.to_thread(coordinador.latido)
+            datos = metricas.totales()
+            datos["cola"] = cola_subida.qsize()
+            datos["frames_descartados"] = politica_carga.total_descartados()
+            await asyncio.to_thread(coordinador.publicar_metricas, datos)
+            
+            if reloj.time() - ultima_agregacion >= METRICAS_INTERVALO and await es_lider():
+                total = await asyncio.to_thread(coordinador.metricas_agregadas)
+                logger.info(f"CLUSTER ({total['workers']} workers): Capturadas {total.get('imagenes_capturadas', 0)} | "
+                            f"Subidas {total.get('imagenes_subidas', 0)} | Errores descarga {total.get('errores_descarga', 0)} | "
+                            f"Errores S3 {total.get('errores_s3', 0)} | Cola {total.get('cola', 0)}")
+                ultima_agregacion = reloj.time()
+        except Exception as e:
+            logger.error(f"Latido de partición {PARTICION_ID} falló: {e}")
+        await asyncio.sleep(PARTICION_LATIDO)
+
+
 # =========================
 # Captura
 # =========================
 
 async def capturar_camara(session, planta, cam_id):
     """
-    Captura con ciclo independiente de 60 segundos.
+    Captura con ciclo independiente por cámara.
+    El circuit breaker de `registro_salud` evita gastar slots del semáforo
+    en cámaras caídas y el intervalo se adapta a la actividad observada
+    (y se alarga mientras la imagen está congelada, ver frescura.py).
+    El semáforo de descargas cubre solo la petición HTTP; con la cola de
+    subida bajo presión manda `politica_carga` (carga.py).
     """
     ultimo_hash = None
-    errores_consecutivos = 0
+    salud = registro_salud.de(planta)
 
     logger.info(f"{planta} - Tarea iniciada")
 
@@ -528,70 +980,127 @@ async def capturar_camara(session, planta, cam_id):
                 break
             continue
 
-        pitime = int(time.time())
-        fecha_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Circuito abierto: no se toca el semáforo hasta el próximo sondeo
+        if not salud.permite_intento():
+            try:
+                await asyncio.sleep(min(salud.segundos_hasta_sondeo(), INTERVALO))
+            except asyncio.CancelledError:
+                break
+            continue
+
+        pitime = int(reloj.time())
+        ahora = reloj.ahora()
+        fecha_str = ahora.strftime("%Y%m%d_%H%M%S")
         url = f"{BASE_URL}/{cam_id}/imagen.jpg"
 
         exito = False
-
-        for intento in range(5):
+        hubo_cambio = False
+        puntaje = None
+        intentos = salud.intentos_permitidos()
+        timeout_peticion = salud.timeout()
+        peticion = {"params": {"pitime": pitime}}
+        if timeout_peticion:
+            peticion["timeout"] = aiohttp.ClientTimeout(total=timeout_peticion)
+
+        for intento in range(intentos):
+            # La espera entre intentos ocurre fuera del semáforo
+            if intento > 0:
+                await asyncio.sleep(salud.config["espera_reintento"])
+
+            ts_intento = reloj.time()
+            slot_entrada = await pool_entrada.tomar()
+            slot_salida = None
+            encolado = False
             try:
-                async with SEM_DESCARGAS:
-                    async with session.get(url, params={"pitime": pitime}) as resp:
-                        if resp.status != 200:
-                            logger.warning(f"{planta} - Intento {intento + 1}/5 HTTP {resp.status}")
-                            await asyncio.sleep(2.5)
-                            continue
-                        
-                        data_original = await resp.read()
-                        bytes_originales = len(data_original)
-                        await metricas.registrar_captura()
-                        
-                        data_comprimida = await recomprimir_jpeg(data_original)
-                        h = hash_imagen(data_comprimida)
-
-                        if h != ultimo_hash:
-                            try:
-                                await asyncio.wait_for(
-                                    cola_subida.put((planta, fecha_str, data_comprimida, bytes_originales)),
-                                    timeout=5.0
-                                )
-                                ultimo_hash = h
-                                logger.info(f"{planta} - Imagen guardada: {DENOMINADORES[planta]}_{fecha_str}.jpg")
-                            except asyncio.TimeoutError:
-                                logger.warning(f"{planta} cola llena")
-                        else:
-                            await metricas.registrar_duplicada()
-                        
-                        exito = True
-                        errores_consecutivos = 0
-                        break
+                # El cupo de descarga cubre solo la petición HTTP: recompresión,
+                # detectores y cola van fuera para no frenar a las demás cámaras
+                try:
+                    async with SEM_DESCARGAS:
+                        inicio_peticion = time.perf_counter()
+                        async with session.get(url, **peticion) as resp:
+                            if resp.status != 200:
+                                anotar_captura(planta, ts_intento, "error_http", resp.status, time.perf_counter() - inicio_peticion)
+                                logger.warning(f"{planta} - Intento {intento + 1}/{intentos} HTTP {resp.status}")
+                                continue
+                            bytes_originales = await slot_entrada.leer_respuesta(resp)
+                            intento_ok = (ts_intento, 200, time.perf_counter() - inicio_peticion, bytes_originales)
+                    
+                    await metricas.registrar_captura()
+                    politica_carga.actualizar(cola_subida.qsize())
+                    slot_salida = await pool_salida.tomar()
+                    data_comprimida = await recomprimir_jpeg(slot_entrada.vista(), slot_salida, planta)
+                finally:
+                    pool_entrada.liberar(slot_entrada)
+                
+                h = hash_imagen(data_comprimida)
+
+                if h == ultimo_hash:
+                    await metricas.registrar_duplicada()
+                    anotar_intento(planta, intento_ok, "duplicada")
+                    salud.marcar_congelada(detector_frescura.repetir(planta))
+                elif await evaluar_frescura(planta, data_comprimida):
+                    # Feed congelado con overlay re-dibujado: no se sube y se sondea menos
+                    salud.marcar_congelada(True)
+                    await metricas.registrar_congelada()
+                    anotar_intento(planta, intento_ok, "congelada")
+                else:
+                    salud.marcar_congelada(False)
+                    hubo_cambio = True
+                    subir, puntaje = await evaluar_actividad(planta, data_comprimida)
+
+                    if not subir:
+                        await metricas.registrar_sin_actividad()
+                        anotar_intento(planta, intento_ok, "sin_actividad")
+                        logger.debug(f"{planta} - Sin actividad ({puntaje:.4f}), frame omitido")
+                    elif politica_carga.descartar(planta, frame_activo(planta, puntaje)):
+                        # Bajo presión se descartan primero los frames de menor prioridad
+                        politica_carga.registrar_descarte(planta, "prioridad")
+                        anotar_intento(planta, intento_ok, "descartada")
+                    else:
+                        info = {"metadata": metadatos_frame(data_comprimida, pitime, h), "slot": slot_salida,
+                                "intento": intento_ok}  # el uploader anota el resultado
+                        if puntaje is not None:
+                            info["metadata"]["actividad"] = f"{puntaje:.4f}"
+                        try:
+                            await asyncio.wait_for(
+                                cola_subida.put((planta, fecha_str, data_comprimida, bytes_originales, info)),
+                                timeout=politica_carga.espera_cola()
+                            )
+                            encolado = True
+                            ultimo_hash = h
+                            marcar_primer_frame(planta)
+                            logger.info(f"{planta} - Imagen guardada: {DENOMINADORES[planta]}_{fecha_str}.jpg")
+                        except asyncio.TimeoutError:
+                            politica_carga.registrar_descarte(planta, "cola_llena")
+                            anotar_intento(planta, intento_ok, "cola_llena")
+                            logger.warning(f"{planta} cola llena, frame descartado")
+                
+                exito = True
+                break
 
             except asyncio.TimeoutError:
-                logger.warning(f"{planta} - Intento {intento + 1}/5 timeout")
-                await asyncio.sleep(2.5)
+                anotar_captura(planta, ts_intento, "timeout", latencia=reloj.time() - ts_intento)
+                logger.warning(f"{planta} - Intento {intento + 1}/{intentos} timeout")
             except asyncio.CancelledError:
                 raise # Re-lanzar para salir del loop
             except Exception as e:
-                logger.warning(f"{planta} - Intento {intento + 1}/5 error: {e}")
-                await asyncio.sleep(2.5)
-
-        if not exito:
-            errores_consecutivos += 1
+                anotar_captura(planta, ts_intento, "error", latencia=reloj.time() - ts_intento)
+                logger.warning(f"{planta} - Intento {intento + 1}/{intentos} error: {e}")
+            finally:
+                # Si no quedó en la cola, el slot de salida vuelve al pool aquí
+                if not encolado:
+                    pool_salida.liberar(slot_salida)
+
+        if exito:
+            salud.registrar_exito(cambio=hubo_cambio, actividad=puntaje, hora=ahora.hour)
+        else:
+            salud.registrar_fallo()
             await metricas.registrar_error_descarga()
-            logger.error(f"{planta} no respondió después de 5 intentos")
-            
-            if errores_consecutivos >= 10:
-                logger.critical(f"{planta} - 10 errores consecutivos, pausa de 10 min")
-                for _ in range(10):
-                    if not RUNNING:
-                        break
-                    await asyncio.sleep(60)
-                errores_consecutivos = 0
-
-        jitter = hash(planta) % 5
+            logger.error(f"{planta} no respondió después de {intentos} intentos")
+
+        jitter = zlib.crc32(planta.encode()) % 5   # estable entre ejecuciones (hash() de str no lo es)
         try:
-            await asyncio.sleep(INTERVALO + jitter)
+            await asyncio.sleep(salud.intervalo(ahora.hour) * politica_carga.factor_intervalo() + jitter)
         except asyncio.CancelledError:
             break
         
@@ -606,267 +1115,222 @@ async def capturar_camara(session, planta, cam_id):
 
 class SundayWorker:
     def __init__(self):
-        self.session = aioboto3.Session()
+        from imageRecopilator.Cloud.codificador import perfil_desde_entorno
+        
         self.procesado_semana = None  # Evita reprocesar la misma semana
+        self.semana = None            # (año, semana) en proceso
+        self.perfil = perfil_desde_entorno()  # valida TIMELAPSE_* al arrancar, no el domingo
+        self.pipeline = None
+    
+    def preparar_pipeline(self):
+        """Cada frame se descarga una vez y se entrega a todas las etapas (se arma al primer uso)"""
+        if self.pipeline is None:
+            from imageRecopilator.Cloud.cache_frames import cache_compartido
+            from imageRecopilator.Cloud.pipeline_domingo import PipelineDomingo, EtapaTimelapse, EtapaConteo
+            
+            self.pipeline = PipelineDomingo(S3_BUCKET, cache=cache_compartido())
+            self.pipeline.registrar(lambda: EtapaTimelapse(S3_BUCKET, perfil=self.perfil))
+            if CONTEO_HABILITADO:
+                self.pipeline.registrar(
+                    lambda: EtapaConteo(S3_BUCKET, config_por_planta=ROI_POR_PLANTA, horarios=HORARIOS)
+                )
+        return self.pipeline
     
     def obtener_semana_anterior(self):
         """Retorna (año, semana) del lunes-sábado pasado"""
-        hoy = datetime.now()
-        inicio_semana_anterior = hoy - timedelta(days=hoy.weekday() + 1)
-        return inicio_semana_anterior.isocalendar()[:2]
-    
-    async def identificar_conjuntos(self, semana):
-        """Lista imágenes Y deduplica en memoria usando ETag"""
-        año, num_semana = semana
-        inicio = datetime.strptime(f"{año}-W{num_semana:02d}-1", "%Y-W%W-%w")
-        
-        conjuntos = defaultdict(list)
-        etags_globales = {}
-        duplicados_identificados = []
-        
-        async with self.session.client('s3') as s3:
-            for dia_offset in range(6):
-                fecha = inicio + timedelta(days=dia_offset)
-                prefix = f"{S3_PREFIX}/{fecha.year}/{fecha.month:02d}/{fecha.day:02d}/"
-                
-                paginator = s3.get_paginator('list_objects_v2')
-                async for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=prefix):
-                    if 'Contents' not in page:
-                        continue
-                    
-                    for obj in page['Contents']:
-                        if obj['Key'].endswith('.jpg'):
-                            parts = obj['Key'].split('/')
-                            planta = parts[4] if len(parts) > 4 else 'unknown'
-                            etag = obj['ETag'].strip('"')
-                            
-                            etag_key = f"{planta}:{etag}"
-                            if etag_key in etags_globales:
-                                duplicados_identificados.append(obj['Key'])
-                                continue
-                            
-                            etags_globales[etag_key] = obj['Key']
-                            dia_key = f"{fecha.date()}"
-                            
-                            conjuntos[(planta, dia_key)].append({
-                                'key': obj['Key'],
-                                'etag': etag,
-                                'size': obj['Size']
-                            })
-        
-        logger.info(f"Identificados {len(conjuntos)} conjuntos planta/día")
-        logger.info(f"Duplicados: {len(duplicados_identificados)} (no se descargarán)")
+        return semana_anterior()
+    
+    async def conjuntos_por_planta(self, semana):
+        """Lista la semana en paralelo y entrega (planta, imagenes) a medida que cada planta queda lista"""
+        fechas = fechas_semana(*semana)
         
-        if duplicados_identificados:
-            await self.borrar_keys(duplicados_identificados)
+        from imageRecopilator.Cloud.listado import ListadorSemana, deduplicar
         
-        return conjuntos
+        async with gestor_s3().s3() as s3:
+            listador = ListadorSemana(s3, S3_BUCKET, S3_PREFIX, fechas)
+            plantas = total_duplicados = 0
+            
+            async for planta, dias in listador.plantas():
+                imagenes, duplicados = deduplicar(dias)
+                plantas += 1
+                total_duplicados += len(duplicados)
+                if duplicados:
+                    self.borrar_keys(duplicados, f"(duplicados {planta})")
+                yield planta, imagenes
+            
+            logger.info(f"Listadas {plantas} plantas ({listador.paginas} páginas)")
+            logger.info(f"Duplicados: {total_duplicados} (no se descargaron)")
     
     async def generar_timelapses(self, conjuntos):
-        """Genera timelapses de a 2 plantas en paralelo"""
-        por_planta = defaultdict(list)
-        
-        for (planta, dia), imagenes in conjuntos.items():
-            por_planta[planta].extend(imagenes)
+        """
+        Genera timelapses de a 2 plantas en paralelo, a medida que llegan del
+        listado. Una planta que falla no corta a las demás; retorna las fallidas.
+        """
+        cupos = asyncio.Semaphore(2)
+        tareas = {}
         
-        plantas = list(por_planta.items())
+        async def procesar(planta, imagenes):
+            async with cupos:
+                if RUNNING:
+                    await self.procesar_planta_timelapse(planta, imagenes)
         
-        for i in range(0, len(plantas), 2):
+        async for planta, imagenes in conjuntos:
             if not RUNNING:
                 break
-            
-            batch = plantas[i:i+2]
-            tasks = [
-                self.procesar_planta_timelapse(planta, imagenes)
-                for planta, imagenes in batch
-            ]
-            await asyncio.gather(*tasks)
-            await asyncio.sleep(5)
+            tareas[planta] = asyncio.create_task(procesar(planta, imagenes))
+        
+        resultados = await asyncio.gather(*tareas.values(), return_exceptions=True)
+        fallidas = []
+        for planta, resultado in zip(tareas, resultados):
+            if isinstance(resultado, BaseException):
+                logger.error(f"  [ERROR] {planta}: {resultado!r}")
+                fallidas.append(planta)
+        return fallidas
 
     async def procesar_planta_timelapse(self, planta, imagenes):
         """Procesa una planta individual"""
         if not imagenes:
             return
         
-        imagenes_sorted = sorted(imagenes, key=lambda x: x['key'])
+        # Validación y orden solo con metadatos: lo descartado nunca se descarga
+        imagenes_sorted, descartadas = filtrar_y_ordenar(imagenes)
+        if descartadas:
+            logger.warning(f"  {planta}: {len(descartadas)} frames con resolución inconsistente, no se descargan")
         
         input_hash = hashlib.md5(
             '|'.join([img['key'] for img in imagenes_sorted]).encode()
         ).hexdigest()
         
-        año, semana = self.obtener_semana_anterior()
+        año, semana = self.semana
         manifest_key = f"timelapses/{año}/semana_{semana:02d}/{planta}.manifest"
         
-        async with self.session.client('s3') as s3:
+        async with gestor_s3().s3() as s3:
             try:
                 obj = await s3.get_object(Bucket=S3_BUCKET, Key=manifest_key)
                 manifest = json.loads(await obj['Body'].read())
                 
                 if manifest.get('input_hash') == input_hash:
                     logger.info(f"[SKIP] {planta} - timelapse ya existe")
-                    keys_borrar = [img['key'] for img in imagenes_sorted]
-                    await self.borrar_keys(keys_borrar)
+                    todas = imagenes_sorted + descartadas
+                    keys_borrar = keys_borrables(todas, [img['key'] for img in todas])
+                    self.borrar_keys(keys_borrar + self.keys_indices(planta, año, semana), f"(skip {planta})")
                     return
             except:
                 pass
         
         logger.info(f"[GENERANDO] {planta} - {len(imagenes_sorted)} frames")
         
-        video_key = await self.crear_timelapse(planta, imagenes_sorted, año, semana)
+        video_key = await self.crear_timelapse(planta, imagenes_sorted, año, semana, descartadas)
+        if not video_key:
+            # Sin video los frames se conservan; la semana queda fallida para reintentarse
+            raise RuntimeError(f"timelapse de {planta} sin generar")
         
-        if video_key:
-            async with self.session.client('s3') as s3:
-                manifest = {
-                    'input_hash': input_hash,
-                    'num_frames': len(imagenes_sorted),
-                    'video_key': video_key,
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                await s3.put_object(
-                    Bucket=S3_BUCKET,
-                    Key=manifest_key,
-                    Body=json.dumps(manifest, indent=2)
-                )
+        async with gestor_s3().s3() as s3:
+            manifest = {
+                'input_hash': input_hash,
+                'num_frames': len(imagenes_sorted),
+                'video_key': video_key,
+                'timestamp': reloj.ahora().isoformat()
+            }
             
-            logger.info(f"  → {planta} completado: s3://{S3_BUCKET}/{video_key}")
-
-    async def crear_timelapse(self, planta, imagenes, año, semana):
-        """Descarga con paralelismo, descomprime a quality=100 y genera video"""
+            await s3.put_object(
+                Bucket=S3_BUCKET,
+                Key=manifest_key,
+                Body=json.dumps(manifest, indent=2)
+            )
         
-        # Calcular rango de fechas
-        inicio = datetime.strptime(f"{año}-W{semana:02d}-1", "%Y-W%W-%w")
-        fin = inicio + timedelta(days=5)  # sábado
+        logger.info(f"  → {planta} completado: s3://{S3_BUCKET}/{video_key}")
+
+    def keys_indices(self, planta, año, semana, imagenes=(), confirmadas=None):
+        """
+        Índices laterales de la planta en los días de la semana (domingo
+        previo..sábado). Con `confirmadas`, solo los días cuyos frames se
+        confirmaron todos: lo que queda en S3 conserva su metadata para el
+        filtro de resoluciones de la próxima ejecución.
+        """
+        fechas = fechas_semana(año, semana)
+        if confirmadas is not None:
+            confirmadas = set(confirmadas)
+            con_pendientes = set()
+            for img in imagenes:
+                if img['key'] in confirmadas:
+                    continue
+                ts = timestamp_desde_nombre(img['key'])
+                if ts is None:
+                    return []           # día desconocido: se conservan todos
+                con_pendientes.add(datetime.fromtimestamp(ts).date())
+            fechas = [fecha for fecha in fechas if fecha.date() not in con_pendientes]
+        return [clave_indice(fecha, planta) for fecha in fechas]
+
+    async def crear_timelapse(self, planta, imagenes, año, semana, descartadas=()):
+        """Descarga cada frame una vez y lo reparte a las etapas (timelapse, conteo)"""
+        
+        # Rango de fechas: el mismo conjunto de días que se listó (domingo previo..sábado)
+        fechas = fechas_semana(año, semana)
+        inicio, fin = fechas[0], fechas[-1]
         nombre_rango = f"{inicio.day:02d}_{inicio.month:02d}-{fin.day:02d}_{fin.month:02d}"
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            resolucion_ref = None
-            frames_validos = []
-            keys_descargadas = []
-            
-            config = aioboto3.session.Config(
-                max_pool_connections=50,
-                retries={'max_attempts': 3, 'mode': 'adaptive'}
-            )
-            
-            async with self.session.client('s3', config=config) as s3:
-                sem = asyncio.Semaphore(5)
-                
-                async def descargar_y_validar(img_info):
-                    async with sem:
-                        obj = await s3.get_object(Bucket=S3_BUCKET, Key=img_info['key'])
-                        data = await obj['Body'].read()
-                        return data, img_info['key']
-                
-                tasks = [descargar_y_validar(img) for img in imagenes]
-                resultados = await asyncio.gather(*tasks)
-                
-                for data, key in resultados:
-                    keys_descargadas.append(key)
-                    
-                    try:
-                        img = Image.open(io.BytesIO(data))
-                        resolucion = img.size
-                        
-                        if resolucion_ref is None:
-                            resolucion_ref = resolucion
-                        elif resolucion != resolucion_ref:
-                            logger.warning(f"  [WARN] Resolución inconsistente: {key}")
-                            continue
-                        
-                        # DESCOMPRIMIR a quality=100
-                        img = img.convert("RGB")
-                        frame_path = f"{tmpdir}/{len(frames_validos):06d}.jpg"
-                        img.save(
-                            frame_path,
-                            format="JPEG",
-                            quality=100,
-                            optimize=False,
-                            subsampling=0
-                        )
-                        
-                        frames_validos.append(frame_path)
-                        
-                    except Exception as e:
-                        logger.error(f"  [ERROR] Procesando {key}: {e}")
-                        continue
-                    
-                    if len(frames_validos) % 100 == 0 and len(frames_validos) > 0:
-                        logger.info(f"  Procesados {len(frames_validos)} frames...")
-            
-            if len(frames_validos) < 10:
-                logger.error(f"  [ERROR] Solo {len(frames_validos)} frames válidos, abortando")
-                return None
-            
-            logger.info(f"  Total frames válidos: {len(frames_validos)}")
-            logger.info(f"  Generando video con ffmpeg...")
-            
-            video_path = f"{tmpdir}/timelapse.mp4"
-            result = subprocess.run([
-                'ffmpeg', '-y',
-                '-framerate', '30',
-                '-pattern_type', 'glob',
-                '-i', f'{tmpdir}/*.jpg',
-                '-c:v', 'libx264',
-                '-preset', 'fast',
-                '-crf', '28',
-                '-pix_fmt', 'yuv420p',
-                video_path
-            ], capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.error(f"  [ERROR] ffmpeg falló: {result.stderr}")
-                return None
-            
-            # Nombre con rango de fechas
-            video_key = f"timelapses/{año}/semana_{semana:02d}/{planta}_{nombre_rango}.mp4"
-            async with self.session.client('s3') as s3:
-                with open(video_path, 'rb') as f:
-                    await s3.upload_fileobj(f, S3_BUCKET, video_key)
-            
-            logger.info(f"  Video generado, borrando {len(keys_descargadas)} imágenes...")
-            await self.borrar_keys(keys_descargadas)
+        # Nombre con rango de fechas
+        video_key = f"timelapses/{año}/semana_{semana:02d}/{planta}_{nombre_rango}.{self.perfil['ext']}"
+        contexto = {'año': año, 'semana': semana, 'video_key': video_key}
+        
+        async with gestor_s3().s3() as s3:
+            keys_confirmadas = await self.preparar_pipeline().procesar(s3, planta, imagenes, contexto)
+        
+        if not contexto.get('video_subido'):
+            return None
+        
+        # Los descartados por metadatos se borran junto con los procesados, como antes
+        todas = imagenes + list(descartadas)
+        confirmadas = keys_confirmadas + [img['key'] for img in descartadas]
+        keys_borrar = keys_borrables(todas, confirmadas)
+        keys_borrar += self.keys_indices(planta, año, semana, todas, confirmadas)
+        logger.info(f"  Video generado, {len(keys_borrar)} objetos a la cola de borrado")
+        self.borrar_keys(keys_borrar, f"(timelapse {planta})")
 
         return video_key
 
-    async def borrar_keys(self, keys):
-        """Borra keys en batches de 1000"""
-        if not keys:
-            return
-        
-        async with self.session.client('s3') as s3:
-            total = 0
-            for i in range(0, len(keys), 1000):
-                batch = [{'Key': k} for k in keys[i:i+1000]]
-                await s3.delete_objects(
-                    Bucket=S3_BUCKET,
-                    Delete={'Objects': batch, 'Quiet': True}
-                )
-                total += len(batch)
-            
-            logger.info(f"  Borradas {total} imágenes de S3")
+    def borrar_keys(self, keys, origen=""):
+        """Encola el borrado en el servicio de segundo plano (no bloquea la planta)"""
+        if keys:
+            servicio_borrado.encolar(keys, origen)
     
-    async def ejecutar(self):
-        """Ejecuta el procesamiento dominical"""
-        semana_actual = self.obtener_semana_anterior()
+    async def ejecutar(self, semana=None):
+        """Ejecuta el procesamiento dominical (por defecto, de la semana anterior)"""
+        semana_actual = tuple(semana) if semana else self.obtener_semana_anterior()
         
         # Evitar reprocesar la misma semana múltiples veces
         if self.procesado_semana == semana_actual:
             logger.info("Semana ya procesada, esperando próximo domingo...")
             return
         
-        año, num_semana = semana_actual
+        año, num_semana = self.semana = semana_actual
         
         logger.info("="*60)
         logger.info("INICIO PROCESAMIENTO DOMINICAL")
         logger.info(f"Procesando semana {año}-W{num_semana:02d}")
         logger.info("="*60)
         
-        conjuntos = await self.identificar_conjuntos(semana_actual)
-        await self.generar_timelapses(conjuntos)
+        fallidas = await self.generar_timelapses(self.conjuntos_por_planta(semana_actual))
+        
+        # Los videos ya están arriba; el borrado de frames termina en segundo plano
+        if await servicio_borrado.drenar(timeout=1800):
+            logger.info(f"Borrado completo: {servicio_borrado.borradas} objetos ({servicio_borrado.modo})")
+        else:
+            logger.warning(f"Borrado en curso: {len(servicio_borrado.pendientes)} keys pendientes")
+        if servicio_borrado.fallidas:
+            logger.error(f"Borrado: {servicio_borrado.fallidas} keys fallidas, se reintentan al próximo inicio")
         
+        if fallidas:
+            # El trabajo falla y se reintenta: las plantas ya hechas se saltan por su manifest
+            raise RuntimeError(f"Semana {año}-W{num_semana:02d} incompleta: {', '.join(fallidas)}")
         self.procesado_semana = semana_actual
         
+        if self.pipeline and self.pipeline.cache:
+            c = self.pipeline.cache.resumen()
+            logger.info(f"Cache de frames: {c['aciertos']} aciertos, {c['fallos']} fallos ({c['tasa_aciertos']:.0%}), "
+                        f"{c['bytes_servidos'] / 1024 / 1024:.0f}MB sin descargar, {c['expulsados']} segmentos expulsados")
+        
         logger.info("="*60)
         logger.info("FIN PROCESAMIENTO DOMINICAL")
         logger.info("="*60)
@@ -876,121 +1340,214 @@ class SundayWorker:
 # Main
 # =========================
 
-async def main():
-    if not await verificar_credenciales_aws():
-        logger.critical("ABORTANDO: Configura credenciales AWS primero")
+async def main(sesion=None):
+    """
+    Captura hasta RUNNING = False. `sesion` reemplaza la sesión aiohttp
+    (cámaras locales de la simulación, ver simulacion.py).
+    """
+    motores_invalidos = {RECOMPRESION_MOTOR, *RECOMPRESION_POR_PLANTA.values()} - set(MOTORES)
+    if motores_invalidos:
+        logger.critical(f"ABORTANDO: motor de recompresión inválido {sorted(motores_invalidos)} (opciones: {', '.join(MOTORES)})")
         return
     
-    timeout = aiohttp.ClientTimeout(
-        total=20,
-        sock_connect=5,
-        sock_read=15
-    )
+    inicializar()
+    instalar_senales()
     
-    connector = aiohttp.TCPConnector(
-        ssl=ssl_context,
-        limit=50,
-        limit_per_host=5,
-        ttl_dns_cache=300
-    )
+    # La captura no espera a AWS: los frames quedan en cola hasta que los uploaders tengan cliente
+    verificacion = asyncio.create_task(verificar_aws_en_paralelo())
+    
+    if sesion is None:
+        timeout = aiohttp.ClientTimeout(
+            total=20,
+            sock_connect=5,
+            sock_read=15
+        )
+        
+        connector = aiohttp.TCPConnector(
+            ssl=ssl_context,
+            limit=50,
+            limit_per_host=5,
+            ttl_dns_cache=300
+        )
+        
+        sesion = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout
+        )
 
     logger.info("="*60)
     logger.info("INICIANDO SISTEMA CAPTURA + PROCESAMIENTO CCTV")
     logger.info(f"Event Loop: {'uvloop' if 'uvloop' in str(asyncio.get_event_loop_policy()) else 'asyncio'}")
     logger.info(f"Cámaras: {len(camaras)} | Intervalo: {INTERVALO}s")
-    logger.info(f"JPEG Quality: {JPEG_QUALITY} | Workers S3: {NUM_UPLOADERS}")
+    if CALIDAD_PRESUPUESTO_MB or PRESUPUESTO_POR_PLANTA:
+        logger.info(f"JPEG Quality: adaptativa {CALIDAD_MIN}-{CALIDAD_MAX}, {CALIDAD_PRESUPUESTO_MB:g}MB/planta/día | Workers S3: {NUM_UPLOADERS}")
+    else:
+        logger.info(f"JPEG Quality: {JPEG_QUALITY} | Workers S3: {NUM_UPLOADERS}")
     logger.info(f"S3: s3://{S3_BUCKET}/{S3_PREFIX}")
+    if "jpegtran" in {RECOMPRESION_MOTOR, *RECOMPRESION_POR_PLANTA.values()} and not jpegtran_disponible():
+        logger.warning("jpegtran no está en el PATH: las plantas sin pérdida solo quitarán metadatos")
+    if coordinador:
+        logger.info(f"Partición: {PARTICION_ID} | Coordinación: {PARTICIONES_DB}")
+    logger.info(f"Trabajos: {TRABAJOS_DB} | Semana: {'se encola' if PROCESAMIENTO_DOMINGO else 'externa'} | "
+                f"Worker: {f'automático (nice {TRABAJOS_NICE})' if TRABAJOS_EJECUTOR else 'externo'}")
     logger.info("="*60)
 
-    sunday_worker = SundayWorker()
+    latido = None
+    if coordinador:
+        await asyncio.to_thread(coordinador.latido)
+        latido = asyncio.create_task(tarea_latido())
 
-    async with aiohttp.ClientSession(
-        connector=connector,
-        timeout=timeout
-    ) as session:
+    async with sesion as session:
+        
+        # La captura corre sin cortes, domingos incluidos: cada cámara duerme
+        # fuera de su horario y el procesamiento pesado va a la cola de trabajos.
+        registro.revisar()
+        
+        # Lanzar workers S3
+        workers_s3 = [
+            asyncio.create_task(worker_subida_s3(i))
+            for i in range(NUM_UPLOADERS)
+        ]
         
-        # BUCLE PRINCIPAL INFINITO (IMPERATIVO: NO BREAK)
+        # Lanzar capturas en paralelo (solo las plantas asignadas a esta partición)
+        tareas_camaras = {}
+        await reconciliar_capturas(session, tareas_camaras, await plantas_asignadas())
+        
+        tasks_captura = [asyncio.create_task(tarea_indices()), asyncio.create_task(tarea_bitacora())]
+        if COMPACTACION_HABILITADA:
+            tasks_captura.append(asyncio.create_task(tarea_compactacion()))
+        
+        ejecutor = None
+        if TRABAJOS_EJECUTOR:
+            ejecutor = asyncio.create_task(tarea_ejecutor_trabajos())
+        
+        # MONITOREO: hasta recibir señal de apagado (RUNNING = False).
+        # Particionado: rebalancea cuando entra o muere un worker.
+        # Cambios en camaras.json se aplican en caliente.
         while RUNNING:
-            # 1. ¿Es Domingo? Ejecutar procesamiento y esperar
-            if es_domingo():
-                logger.info("DOMINGO DETECTADO - Iniciando procesamiento de semana anterior...")
-                await sunday_worker.ejecutar()
-                
-                # Suspender hasta el lunes para evitar re-entradas rápidas
-                await esperar_hasta_apertura()
-                # Al volver del await, el bucle reinicia y verificará de nuevo condiciones
-                continue
-            
-            # 2. Lunes-Sábado: Configuración de tareas de captura
-            await esperar_hasta_apertura()
-            
-            if not RUNNING:
-                # Si durante la espera se recibió señal de apagado, el while principal lo detectará
-                continue
-            
-            logger.info("Iniciando ciclo semanal de capturas...")
-            
-            # Lanzar workers S3
-            workers_s3 = [
-                asyncio.create_task(worker_subida_s3(i))
-                for i in range(NUM_UPLOADERS)
-            ]
-            
-            # Lanzar capturas en paralelo
-            tasks_captura = [
-                asyncio.create_task(capturar_camara(session, planta, cam_id))
-                for planta, cam_id in camaras.items()
-            ]
-            
-            # 3. MONITOREO DEL CICLO SEMANAL
-            # Esperar hasta que termine el día (sábado a las 23:59 o se detecte domingo)
-            # O se reciba señal de apagado (RUNNING = False)
-            while RUNNING and not es_domingo():
-                await asyncio.sleep(60)
-            
-            # 4. LIMPIEZA DE TRANSICIÓN (Llegó Domingo o Apagado)
-            logger.info("Transición detectada (Domingo o Shutdown) - Deteniendo tareas...")
-
-            # Cancelar tareas de captura primero (para dejar de meter items a la cola)
-            for task in tasks_captura:
-                task.cancel()
-            
-            # Esperar confirmación de cancelación de capturas
-            await asyncio.gather(*tasks_captura, return_exceptions=True)
+            try:
+                if await aplicar_cambios_registro(session, tareas_camaras) is None and coordinador:
+                    await reconciliar_capturas(session, tareas_camaras, await plantas_asignadas())
+            except Exception as e:
+                logger.error(f"Reasignación de capturas falló: {e}")
             
-            # Opcional: Intentar vaciar la cola antes de matar a los workers S3
-            if not cola_subida.empty():
-                logger.info("Drenando cola de subida antes de cancelar workers...")
-                # Dar un tiempo razonable para vaciar, si no, cancelar
+            if verificacion.done() and verificacion.result():
                 try:
-                    # Esperamos hasta que la cola esté vacía (task_done llamado por workers)
-                    # Ojo: si los workers mueren antes, esto se cuelga, pero aquí siguen vivos.
-                    await asyncio.wait_for(cola_subida.join(), timeout=300)
-                except asyncio.TimeoutError:
-                    logger.warning("Timeout drenando cola - procediendo a cancelación forzada")
-
-            # Cancelar workers S3
-            for task in workers_s3:
-                task.cancel()
-            
-            await asyncio.gather(*workers_s3, return_exceptions=True)
+                    await programar_trabajos()
+                except Exception as e:
+                    logger.error(f"No se pudieron encolar trabajos: {e}")
             
-            logger.info("Ciclo de captura detenido. Reiniciando bucle principal...")
-            # Aquí termina el while, vuelve al inicio. Si es Domingo, entra al if es_domingo().
+            await asyncio.sleep(PARTICION_LATIDO if coordinador else 60)
         
-        # Fuera del while RUNNING (Solo ocurre en apagado total)
+        tasks_captura.extend(tareas_camaras.values())
+        
+        # LIMPIEZA (Apagado)
+        logger.info("Apagado - Deteniendo tareas...")
+
+        # Cancelar tareas de captura primero (para dejar de meter items a la cola)
+        for task in tasks_captura:
+            task.cancel()
+        
+        # Esperar confirmación de cancelación de capturas
+        await asyncio.gather(*tasks_captura, return_exceptions=True)
+        
+        # Intentar vaciar la cola antes de matar a los workers S3
         logger.info("Esperando que la cola se vacíe (cleanup final)...")
         if not cola_subida.empty():
-             try:
-                 await asyncio.wait_for(cola_subida.join(), timeout=60)
-             except Exception:
-                 pass
+            try:
+                await asyncio.wait_for(cola_subida.join(), timeout=60)
+            except asyncio.TimeoutError:
+                logger.warning("Timeout drenando cola - procediendo a cancelación forzada")
+
+        # Cancelar workers S3 y el supervisor de trabajos
+        for task in workers_s3 + ([ejecutor] if ejecutor else []):
+            task.cancel()
+        
+        await asyncio.gather(*workers_s3, *([ejecutor] if ejecutor else []), return_exceptions=True)
+        await volcar_indices()
+        await volcar_bitacora()
         logger.info("Cola vacía - cierre completo")
+    
+    if latido:
+        latido.cancel()
+        await asyncio.gather(latido, return_exceptions=True)
+        await asyncio.to_thread(coordinador.retirar)
+    
+    await gestor_s3().cerrar()
 
 
-if __name__ == "__main__":
+async def trabajo_semana(año, semana):
+    await SundayWorker().ejecutar((año, semana))
+
+
+async def trabajo_render(plantas, desde, hasta, **opciones):
+    from imageRecopilator.Cloud.cache_frames import cache_compartido
+    from imageRecopilator.Cloud.render import render
+    await render(plantas, datetime.fromisoformat(desde), datetime.fromisoformat(hasta),
+                 cache_frames=cache_compartido(), reloj=reloj.ahora, **opciones)
+
+
+MANEJADORES_TRABAJOS = {"semana": trabajo_semana, "render": trabajo_render}
+
+
+async def preparar_proceso_pesado():
+    """Estado común de `process` y `work`: sin buffers de captura, con borrado en segundo plano"""
+    inicializar(captura=False)
+    instalar_senales()
+    
+    if not await verificar_aws_en_paralelo():
+        await gestor_s3().cerrar()
+        return False
+    
+    servicio_borrado.iniciar()
+    return True
+
+
+async def cerrar_proceso_pesado():
+    await servicio_borrado.detener(timeout=120)
+    await gestor_s3().cerrar()
+
+
+async def procesar_semana(semana=None):
+    """
+    Procesamiento dominical en primer plano (`flujoprt process`), sin
+    pasar por la cola: para cron o para reprocesar a mano.
+    """
+    if not await preparar_proceso_pesado():
+        return False
     try:
-        asyncio.run(main())
+        await SundayWorker().ejecutar(semana)
+    except RuntimeError as e:
+        logger.error(f"{e}")
+        return False
+    finally:
+        await cerrar_proceso_pesado()
+    return True
+
+
+async def trabajar(hasta_vaciar=False):
+    """Worker de la cola de trabajos (`flujoprt work`), en su propio proceso de baja prioridad"""
+    if not await preparar_proceso_pesado():
+        return False
+    ejecutor = EjecutorTrabajos(cola_trabajos, MANEJADORES_TRABAJOS)
+    try:
+        await ejecutor.correr(continuar=lambda: RUNNING, hasta_vaciar=hasta_vaciar)
+    finally:
+        await cerrar_proceso_pesado()
+    return ejecutor.fallidos == 0
+
+
+def correr(corrutina):
+    """asyncio.run con uvloop (si está), manejo de errores y cierre del executor"""
+    # uvloop para mejor performance en Linux
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
+    try:
+        return asyncio.run(corrutina)
     except KeyboardInterrupt:
         logger.warning("="*60)
         logger.warning("CTRL+C DETECTADO - Apagado iniciado")
@@ -999,7 +1556,26 @@ if __name__ == "__main__":
         logger.critical(f"Error fatal: {e}")
         logger.critical(f"{traceback.format_exc()}")
     finally:
-        executor.shutdown(wait=True)
+        if executor:
+            executor.shutdown(wait=True)
         logger.info("="*60)
         logger.info("PROCESO FINALIZADO COMPLETAMENTE")
-        logger.info("="*60)
\ No newline at end of file
+        logger.info("="*60)
+
+
+def capturar():
+    """Punto de entrada de la captura: supervisa particiones o corre main()"""
+    if PARTICIONES > 0 and not PARTICION_ID:
+        from imageRecopilator.Cloud.particiones import lanzar_particiones
+        signal.signal(signal.SIGTERM, shutdown_handler)
+        signal.signal(signal.SIGINT, shutdown_handler)
+        lanzar_particiones(PARTICIONES, os.path.abspath(__file__), PARTICIONES_DB, continuar=lambda: RUNNING)
+        return
+    correr(main())
+
+
+arranque["importacion"] = time.perf_counter() - T_INICIO
+
+
+if __name__ == "__main__":
+    capturar()
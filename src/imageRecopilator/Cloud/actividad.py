@@ -0,0 +1,131 @@
+import logging
+
+import numpy as np
+from PIL import Image
+
+from imageRecopilator.Cloud.buffers import LectorMemoria
+
+"""
+DETECTOR DE ACTIVIDAD VEHICULAR
+===============================
+
+Sustracción de fondo sobre frames reducidos en escala de grises (solo CPU).
+
+- Decodificación JPEG en modo draft (escala 1/8) para no decodificar a
+  resolución completa.
+- Fondo por planta como promedio móvil exponencial (float32).
+- Un frame es "activo" si la fracción de píxeles que difieren del fondo
+  supera el umbral de área configurado para la planta.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+# =========================
+# Configuración por defecto
+# =========================
+
+# Modos: "apagado" (no analiza), "marcar" (sube todo con metadata),
+# "omitir" (no sube frames sin actividad)
+MODOS_ACTIVIDAD = ("apagado", "marcar", "omitir")
+
+CONFIG_ACTIVIDAD_DEFAULT = {
+    "modo": "marcar",
+    "tamano": (160, 90),       # resolución de análisis (ancho, alto)
+    "alpha": 0.05,             # velocidad de adaptación del fondo
+    "umbral_pixel": 25,        # diferencia de gris para considerar un píxel cambiado
+    "umbral_area": 0.01,       # fracción mínima de píxeles cambiados
+    "max_omitidos": 15,        # sube 1 frame cada N omitidos para no dejar huecos
+}
+
+
+# =========================
+# Utilidades
+# =========================
+
+def gris_reducido(data, tamano=(160, 90)) -> np.ndarray:
+    """Decodifica un JPEG (bytes o memoryview) a escala de grises reducida como array float32"""
+    img = Image.open(LectorMemoria(data))
+    # draft() permite al decoder JPEG escalar por DCT (1/2, 1/4, 1/8)
+    img.draft("L", (tamano[0] * 2, tamano[1] * 2))
+    img = img.convert("L").resize(tamano, Image.BILINEAR)
+    return np.asarray(img, dtype=np.float32)
+
+
+# =========================
+# Detector
+# =========================
+
+class DetectorActividad:
+    def __init__(self, config_por_planta=None, config_default=None):
+        self.config_default = dict(CONFIG_ACTIVIDAD_DEFAULT)
+        if config_default:
+            self.config_default.update(config_default)
+        self.config_por_planta = config_por_planta or {}
+        self.fondos = {}
+        self.omitidos = {}
+
+    def config(self, planta):
+        """Configuración efectiva de una planta (default + override)"""
+        cfg = dict(self.config_default)
+        cfg.update(self.config_por_planta.get(planta, {}))
+        if cfg["modo"] not in MODOS_ACTIVIDAD:
+            raise ValueError(f"Modo de actividad inválido para {planta}: {cfg['modo']}")
+        return cfg
+
+    def modo(self, planta):
+        return self.config(planta)["modo"]
+
+    def puntaje(self, planta, data) -> float:
+        """Fracción de píxeles que difieren del fondo; actualiza el fondo de la planta"""
+        cfg = self.config(planta)
+        frame = gris_reducido(data, tuple(cfg["tamano"]))
+
+        fondo = self.fondos.get(planta)
+        if fondo is None or fondo.shape != frame.shape:
+            # Sin referencia: el primer frame se considera activo
+            self.fondos[planta] = frame
+            return 1.0
+
+        cambiados = np.abs(frame - fondo) > cfg["umbral_pixel"]
+        puntaje = float(np.count_nonzero(cambiados)) / cambiados.size
+
+        # Actualización in-place del fondo (evita asignar un array nuevo por frame)
+        fondo *= (1.0 - cfg["alpha"])
+        fondo += cfg["alpha"] * frame
+        return puntaje
+
+    def evaluar(self, planta, data):
+        """
+        Retorna (subir, puntaje).
+        En modo "omitir" sube igual 1 de cada max_omitidos frames inactivos.
+        """
+        cfg = self.config(planta)
+        if cfg["modo"] == "apagado":
+            return True, None
+
+        try:
+            puntaje = self.puntaje(planta, data)
+        except Exception as e:
+            logger.warning(f"{planta} - Detector de actividad falló: {e}")
+            return True, None
+
+        activo = puntaje >= cfg["umbral_area"]
+        if activo or cfg["modo"] == "marcar":
+            self.omitidos[planta] = 0
+            return True, puntaje
+
+        self.omitidos[planta] = self.omitidos.get(planta, 0) + 1
+        if self.omitidos[planta] >= cfg["max_omitidos"]:
+            self.omitidos[planta] = 0
+            return True, puntaje
+        return False, puntaje
+
+    def reiniciar(self, planta=None):
+        """Descarta el fondo (la planta cambió de cámara o se quitó del registro)"""
+        if planta is None:
+            self.fondos.clear()
+            self.omitidos.clear()
+        else:
+            self.fondos.pop(planta, None)
+            self.omitidos.pop(planta, None)
@@ -0,0 +1,345 @@
+import argparse
+import gc
+import glob
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from imageRecopilator.Cloud.buffers import LectorMemoria, SlotBuffer
+from imageRecopilator.Cloud.codificador import PERFILES, comandos_ffmpeg, ffmpeg_disponible, perfil_desde_entorno
+from imageRecopilator.Cloud.recompresion import jpegtran_disponible, optimizar_sin_perdida, quitar_metadatos
+
+"""
+BENCHMARKS
+==========
+
+Mediciones reproducibles de los caminos calientes, sin red ni S3.
+
+    python -m imageRecopilator.Cloud.benchmarks buffers --frames 500
+    python -m imageRecopilator.Cloud.benchmarks codificador --directorio semana/Temuco
+    python -m imageRecopilator.Cloud.benchmarks recompresion --directorio capturas/Temuco
+"""
+
+
+# =========================
+# Utilidades
+# =========================
+
+def jpeg_sintetico(ancho=1280, alto=720, calidad=90, semilla=0) -> bytes:
+    """JPEG con ruido + gradiente, de tamaño similar a una captura real"""
+    rng = np.random.default_rng(semilla)
+    gradiente = np.linspace(0, 255, ancho, dtype=np.float32)[None, :, None]
+    ruido = rng.normal(0, 18, (alto, ancho, 3)).astype(np.float32)
+    pixeles = np.clip(gradiente + ruido, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixeles).save(buffer, format="JPEG", quality=calidad)
+    return buffer.getvalue()
+
+
+class MedidorGC:
+    """Cuenta colecciones y tiempo total en pausas del GC"""
+
+    def __init__(self):
+        self.pausas = 0
+        self.segundos = 0.0
+        self._inicio = None
+
+    def __call__(self, fase, info):
+        if fase == "start":
+            self._inicio = time.perf_counter()
+        elif self._inicio is not None:
+            self.pausas += 1
+            self.segundos += time.perf_counter() - self._inicio
+            self._inicio = None
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+
+def reiniciar_pico_rss():
+    """Linux: lleva el pico de RSS (VmHWM, ru_maxrss) al RSS actual. False si no se puede"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def rss_actual_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def medir(funcion, repeticiones):
+    """
+    Ejecuta funcion() N veces midiendo tiempo, pico de memoria, page faults y GC.
+    ru_maxrss es el pico de todo el proceso y nunca baja: se reinicia antes
+    de medir (Linux) y además cada camino corre en su propio proceso (ver
+    en_subproceso), así la preparación y el otro camino no cuentan.
+    """
+    gc.collect()
+    pico_reiniciado = reiniciar_pico_rss()
+    rss_ini = rss_actual_kb()
+    rusage_ini = resource.getrusage(resource.RUSAGE_SELF)
+    tracemalloc.start()
+    inicio = time.perf_counter()
+
+    with MedidorGC() as medidor_gc:
+        for _ in range(repeticiones):
+            funcion()
+
+    duracion = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rusage_fin = resource.getrusage(resource.RUSAGE_SELF)
+
+    return {
+        "segundos": round(duracion, 3),
+        "ms_por_frame": round(duracion / repeticiones * 1000, 3),
+        "pico_tracemalloc_kb": pico // 1024,
+        "page_faults_menores": rusage_fin.ru_minflt - rusage_ini.ru_minflt,
+        "max_rss_kb": rusage_fin.ru_maxrss,
+        "rss_incremento_kb": rusage_fin.ru_maxrss - rss_ini if pico_reiniciado else None,
+        "gc_pausas": medidor_gc.pausas,
+        "gc_ms": round(medidor_gc.segundos * 1000, 3),
+    }
+
+
+# =========================
+# Buffers (captura -> compresión -> subida)
+# =========================
+
+def en_subproceso(nombre, *argumentos):
+    """Corre `benchmarks <nombre> ...` en un proceso nuevo y retorna su JSON"""
+    src = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")])))
+    proceso = subprocess.run([sys.executable, "-m", "imageRecopilator.Cloud.benchmarks", nombre, *argumentos],
+                             capture_output=True, text=True, env=env, check=True)
+    return json.loads(proceso.stdout)
+
+
+CAMINOS_BUFFERS = ("bytes", "slots")
+
+
+def bench_buffers(frames=500, calidad=80, chunk=16 * 1024, camino=None):
+    """
+    Compara el camino con bytes (lista de chunks + join, BytesIO, getvalue)
+    contra slots reutilizables. Simula la lectura HTTP en chunks. Sin
+    `camino`, cada uno corre en su propio proceso para que RSS y page
+    faults no arrastren lo del otro.
+    """
+    if camino is None:
+        resultados = {c: en_subproceso("buffers", "--frames", str(frames), "--camino", c) for c in CAMINOS_BUFFERS}
+        return {"frames": frames, "bytes_frame": resultados["bytes"]["bytes_frame"],
+                **{c: r[c] for c, r in resultados.items()}}
+
+    original = jpeg_sintetico()
+    chunks = [original[i:i + chunk] for i in range(0, len(original), chunk)]
+
+    def camino_bytes():
+        data = b"".join(chunks)                      # resp.read()
+        img = Image.open(io.BytesIO(data))
+        salida = io.BytesIO()
+        img.save(salida, format="JPEG", quality=calidad, optimize=True)
+        comprimido = salida.getvalue()
+        LectorMemoria(comprimido).read()             # cuerpo S3
+
+    entrada = SlotBuffer(2 * len(original))
+    salida = SlotBuffer(2 * len(original))
+
+    def camino_slots():
+        entrada.reiniciar()
+        for c in chunks:                             # leer_respuesta()
+            entrada.write(c)
+        img = Image.open(LectorMemoria(entrada.vista()))
+        salida.reiniciar()
+        img.save(salida, format="JPEG", quality=calidad, optimize=True)
+        LectorMemoria(salida.vista()).read()         # cuerpo S3
+
+    caminos = {"bytes": camino_bytes, "slots": camino_slots}
+    return {"frames": frames, "bytes_frame": len(original), camino: medir(caminos[camino], frames)}
+
+
+# =========================
+# Codificación (perfiles de timelapse)
+# =========================
+
+def secuencia_sintetica(destino, frames, ancho=1280, alto=720):
+    """Fondo fijo con ruido leve y un bloque que se mueve (cámara fija con tránsito)"""
+    rng = np.random.default_rng(0)
+    fondo = np.tile(np.linspace(40, 200, ancho, dtype=np.float32)[None, :, None], (alto, 1, 3))
+    for i in range(frames):
+        pixeles = fondo + rng.normal(0, 4, fondo.shape).astype(np.float32)
+        x = (i * 17) % (ancho - 160)
+        pixeles[alto // 2:alto // 2 + 90, x:x + 160] = (200, 30, 30)
+        Image.fromarray(np.clip(pixeles, 0, 255).astype(np.uint8)).save(
+            f"{destino}/{i:06d}.jpg", format="JPEG", quality=95
+        )
+
+
+def bench_codificador(frames=500, directorio=None, perfiles=None):
+    """
+    Codifica la misma secuencia con cada perfil y reporta tiempo, fps de
+    codificación y tamaño. Con --directorio usa frames reales (p. ej. una
+    semana descargada); si no, una secuencia sintética de `frames` frames.
+    """
+    if not ffmpeg_disponible():
+        return {"error": "ffmpeg no disponible en PATH"}
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_codificador_")
+    try:
+        if directorio:
+            origen = sorted(glob.glob(os.path.join(directorio, "*.jpg")))[:frames]
+            for i, ruta in enumerate(origen):
+                shutil.copy(ruta, f"{tmpdir}/{i:06d}.jpg")
+            total = len(origen)
+        else:
+            secuencia_sintetica(tmpdir, frames)
+            total = frames
+
+        resultados = {"frames": total}
+        for nombre in perfiles or sorted(PERFILES):
+            perfil = perfil_desde_entorno(nombre)
+            salida = f"{tmpdir}/salida_{nombre}.{perfil['ext']}"
+            inicio = time.perf_counter()
+            error = None
+            for comando in comandos_ffmpeg(perfil, f"{tmpdir}/[0-9]*.jpg", salida):
+                proceso = subprocess.run(comando, capture_output=True, text=True)
+                if proceso.returncode != 0:
+                    error = proceso.stderr.strip().splitlines()[-1:] or ["ffmpeg falló"]
+                    break
+            duracion = time.perf_counter() - inicio
+
+            if error:
+                resultados[nombre] = {"codec": perfil["codec"], "error": error[0]}
+                continue
+            tamano = os.path.getsize(salida)
+            resultados[nombre] = {
+                "codec": perfil["codec"],
+                "segundos": round(duracion, 2),
+                "fps_codificacion": round(total / duracion, 1),
+                "bytes_salida": tamano,
+                "kb_por_frame": round(tamano / 1024 / max(total, 1), 2),
+            }
+        return resultados
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# =========================
+# Recompresión (Pillow vs sin pérdida)
+# =========================
+
+def jpeg_con_exif(semilla=0):
+    """JPEG sintético con un bloque EXIF, como los que entrega la cámara"""
+    img = Image.open(io.BytesIO(jpeg_sintetico(semilla=semilla)))
+    exif = Image.Exif()
+    exif[0x010F] = "Camara PRT"                      # Make
+    exif[0x0132] = "2024:01:01 12:00:00"             # DateTime
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def bench_recompresion(frames=200, directorio=None, calidad=80):
+    """
+    CPU por frame (incluye procesos hijos: jpegtran) y bytes ahorrados de
+    cada motor sobre los mismos frames. Con --directorio usa capturas reales.
+    """
+    if directorio:
+        originales = []
+        for ruta in sorted(glob.glob(os.path.join(directorio, "*.jpg")))[:frames]:
+            with open(ruta, "rb") as f:
+                originales.append(f.read())
+    else:
+        originales = [jpeg_con_exif(i) for i in range(min(frames, 20))]
+    total = len(originales)
+    bytes_entrada = sum(len(o) for o in originales)
+
+    def pillow(data):
+        img = Image.open(LectorMemoria(data))
+        img.info.pop("exif", None)
+        salida = io.BytesIO()
+        img.save(salida, format="JPEG", quality=calidad, optimize=True)
+        return salida.getvalue()
+
+    motores = {"pillow": pillow, "solo_metadatos": quitar_metadatos}
+    if jpegtran_disponible():
+        motores["jpegtran"] = optimizar_sin_perdida
+
+    resultados = {"frames": frames, "bytes_entrada_frame": bytes_entrada // max(total, 1),
+                  "jpegtran_disponible": jpegtran_disponible()}
+    for nombre, motor in motores.items():
+        cpu_ini = os.times()
+        inicio = time.perf_counter()
+        bytes_salida = 0
+        for i in range(frames):
+            bytes_salida += len(motor(originales[i % total]))
+        duracion = time.perf_counter() - inicio
+        cpu_fin = os.times()
+        cpu = sum(cpu_fin[:4]) - sum(cpu_ini[:4])    # user + sys propios y de hijos
+
+        entrada = bytes_entrada * frames / total
+        resultados[nombre] = {
+            "ms_por_frame": round(duracion / frames * 1000, 3),
+            "cpu_ms_por_frame": round(cpu / frames * 1000, 3),
+            "kb_por_frame": round(bytes_salida / frames / 1024, 2),
+            "ahorro_pct": round(100 * (1 - bytes_salida / entrada), 2),
+        }
+    return resultados
+
+
+# =========================
+# CLI
+# =========================
+
+BENCHMARKS = {
+    "buffers": bench_buffers,
+    "codificador": bench_codificador,
+    "recompresion": bench_recompresion,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks FlujoPRT")
+    parser.add_argument("nombre", choices=sorted(BENCHMARKS))
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--directorio", help="codificador/recompresion: frames reales en vez de sintéticos")
+    parser.add_argument("--perfiles", nargs="+", choices=sorted(PERFILES), help="codificador: subconjunto de perfiles")
+    parser.add_argument("--camino", choices=CAMINOS_BUFFERS, help="buffers: mide solo un camino en este proceso")
+    args = parser.parse_args(argv)
+
+    opciones = {"frames": args.frames}
+    if args.nombre == "codificador":
+        opciones.update(directorio=args.directorio, perfiles=args.perfiles)
+    elif args.nombre == "recompresion":
+        opciones.update(directorio=args.directorio)
+    elif args.nombre == "buffers":
+        opciones.update(camino=args.camino)
+    resultado = BENCHMARKS[args.nombre](**opciones)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import glob
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+"""
+BITÁCORA COLUMNAR DE CAPTURAS
+=============================
+
+Un registro por intento de captura (planta, ts, estado HTTP, latencia,
+bytes, duplicado, resultado de la subida), para responder "¿cuál fue la
+disponibilidad de Temuco el mes pasado?" sin recorrer captura.log:
+
+- `registrar()` solo agrega a un buffer en memoria (event loop).
+- `volcar()` (en un hilo, cada BITACORA_VOLCADO) agrega las filas al
+  archivo binario del día: `<YYYY-MM-DD>.<proceso>.bin`, solo append.
+- `rotar()` convierte los días ya cerrados a `<YYYY-MM-DD>.<proceso>.npz`
+  comprimido por columnas (la planta como categoría) y borra el .bin.
+- `cargar()` / `resumen()` leen un rango de días (npz + el .bin de hoy) y
+  calculan disponibilidad, frescura y percentiles de latencia.
+
+Formato npz en vez de Parquet/Arrow: numpy ya es dependencia (conteo,
+actividad) y las consultas son agregaciones por columna.
+
+    flujoprt bitacora --desde 2026-01-01 --hasta 2026-01-31 Temuco
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+RESULTADOS = ("subida", "error_s3", "duplicada", "sin_actividad", "cola_llena", "error_http", "timeout", "error",
+              "congelada", "descartada")     # solo se agregan al final: el código queda en los archivos
+_CODIGOS = {nombre: i for i, nombre in enumerate(RESULTADOS)}
+
+DTYPE = np.dtype([
+    ("planta", "U32"),
+    ("ts", "f8"),
+    ("estado", "i2"),          # 0 = sin respuesta HTTP
+    ("latencia_ms", "f4"),
+    ("bytes", "i4"),
+    ("duplicado", "?"),
+    ("resultado", "i1"),       # índice en RESULTADOS
+])
+
+
+def _dia(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+# =========================
+# Escritura
+# =========================
+
+class BitacoraCapturas:
+    def __init__(self, directorio, sufijo="", reloj=time.time):
+        self.directorio = directorio
+        self.sufijo = sufijo or "principal"
+        self.reloj = reloj
+        os.makedirs(directorio, exist_ok=True)
+        self._filas = []
+        self._lock = threading.Lock()
+        self.volcadas = 0
+
+    def registrar(self, planta, ts, resultado, estado=0, latencia_ms=0.0, bytes_=0):
+        """Agrega un intento al buffer (no toca disco)"""
+        fila = (planta, ts, estado, latencia_ms, bytes_, resultado == "duplicada", _CODIGOS[resultado])
+        with self._lock:
+            self._filas.append(fila)
+
+    def volcar(self):
+        """Agrega el buffer a los .bin de cada día. Retorna las filas escritas."""
+        with self._lock:
+            filas, self._filas = self._filas, []
+        if not filas:
+            return 0
+
+        por_dia = {}
+        for fila in filas:
+            por_dia.setdefault(_dia(fila[1]), []).append(fila)
+        for dia, grupo in por_dia.items():
+            with open(os.path.join(self.directorio, f"{dia}.{self.sufijo}.bin"), "ab") as f:
+                f.write(np.array(grupo, dtype=DTYPE).tobytes())
+        self.volcadas += len(filas)
+        return len(filas)
+
+    def rotar(self, hoy=None):
+        """Comprime a npz los .bin de este proceso de días anteriores a `hoy`"""
+        hoy = hoy or _dia(self.reloj())
+        rotados = []
+        for ruta in sorted(glob.glob(os.path.join(self.directorio, f"*.{self.sufijo}.bin"))):
+            dia = os.path.basename(ruta).split(".")[0]
+            if dia >= hoy:
+                continue
+            filas = np.fromfile(ruta, dtype=DTYPE)
+            destino = os.path.join(self.directorio, f"{dia}.{self.sufijo}.npz")
+            if os.path.exists(destino):
+                # Filas tardías (subidas que terminaron pasada la medianoche) o rotación repetida
+                filas = np.concatenate([_leer_npz(destino), filas])
+            _escribir_npz(destino, filas)
+            os.remove(ruta)
+            rotados.append(dia)
+        if rotados:
+            logger.info(f"Bitácora: {len(rotados)} días comprimidos ({', '.join(rotados)})")
+        return rotados
+
+
+def _escribir_npz(destino, filas):
+    plantas, codigos = np.unique(filas["planta"], return_inverse=True)
+    columnas = {nombre: filas[nombre] for nombre in DTYPE.names if nombre != "planta"}
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, plantas=plantas, planta=codigos.astype(np.uint16), **columnas)
+    temporal = destino + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(temporal, destino)
+
+
+def _leer_npz(ruta):
+    with np.load(ruta) as datos:
+        filas = np.empty(len(datos["ts"]), dtype=DTYPE)
+        filas["planta"] = datos["plantas"][datos["planta"]]
+        for nombre in DTYPE.names[1:]:
+            filas[nombre] = datos[nombre]
+    return filas
+
+
+# =========================
+# Consultas
+# =========================
+
+def cargar(directorio, desde, hasta, plantas=None):
+    """Filas (array estructurado, ordenado por ts) entre `desde` y `hasta` (datetimes, inclusive)"""
+    partes = []
+    dia = desde.date()
+    while dia <= hasta.date():
+        for ruta in sorted(glob.glob(os.path.join(directorio, f"{dia.isoformat()}.*"))):
+            if ruta.endswith(".npz"):
+                partes.append(_leer_npz(ruta))
+            elif ruta.endswith(".bin"):
+                partes.append(np.fromfile(ruta, dtype=DTYPE))
+        dia += timedelta(days=1)
+
+    if not partes:
+        return np.empty(0, dtype=DTYPE)
+    filas = np.concatenate(partes)
+    filtro = (filas["ts"] >= desde.timestamp()) & (filas["ts"] <= hasta.timestamp())
+    if plantas:
+        filtro &= np.isin(filas["planta"], list(plantas))
+    filas = filas[filtro]
+    return filas[np.argsort(filas["ts"], kind="stable")]
+
+
+def _frescura(ts_subidas):
+    """Huecos entre subidas consecutivas del mismo día (la noche no cuenta como hueco)"""
+    if len(ts_subidas) < 2:
+        return np.empty(0)
+    dias = np.array([_dia(ts) for ts in ts_subidas])
+    huecos = np.diff(ts_subidas)
+    return huecos[dias[1:] == dias[:-1]]
+
+
+def resumen(directorio, desde, hasta, plantas=None):
+    """
+    Por planta: intentos, disponibilidad (respuestas 200 / intentos),
+    conteo por resultado, latencia p50/p95/p99 (ms), última subida y
+    frescura (p95 y máximo del hueco entre subidas, en segundos).
+    """
+    filas = cargar(directorio, desde, hasta, plantas)
+    salida = {}
+    for planta in np.unique(filas["planta"]):
+        propias = filas[filas["planta"] == planta]
+        ok = propias["estado"] == 200
+        subidas = propias["ts"][propias["resultado"] == _CODIGOS["subida"]]
+        latencias = propias["latencia_ms"][ok]
+        huecos = _frescura(subidas)
+        conteo = np.bincount(propias["resultado"], minlength=len(RESULTADOS))
+
+        salida[str(planta)] = {
+            "intentos": int(len(propias)),
+            "disponibilidad": round(float(ok.mean()), 4) if len(propias) else 0.0,
+            "resultados": {nombre: int(n) for nombre, n in zip(RESULTADOS, conteo) if n},
+            "bytes": int(propias["bytes"].sum()),
+            "latencia_ms": {
+                f"p{p}": round(float(np.percentile(latencias, p)), 1) for p in (50, 95, 99)
+            } if len(latencias) else None,
+            "ultima_subida": datetime.fromtimestamp(subidas[-1]).isoformat() if len(subidas) else None,
+            "frescura_s": {
+                "p95": round(float(np.percentile(huecos, 95)), 1),
+                "max": round(float(huecos.max()), 1),
+            } if len(huecos) else None,
+        }
+    return salida
+
+
+# =========================
+# CLI
+# =========================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Disponibilidad, frescura y latencia desde la bitácora de capturas")
+    parser.add_argument("plantas", nargs="*")
+    parser.add_argument("--desde", required=True, help="YYYY-MM-DD[ HH:MM]")
+    parser.add_argument("--hasta", help="YYYY-MM-DD[ HH:MM] (default: ahora; una fecha sola incluye el día)")
+    parser.add_argument("--directorio", default=os.getenv("BITACORA_DIR", os.path.expanduser("~/.flujoprt/bitacora")))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    desde = datetime.fromisoformat(args.desde)
+    hasta = datetime.fromisoformat(args.hasta) if args.hasta else datetime.now()
+    if args.hasta and len(args.hasta) == 10:
+        hasta += timedelta(days=1, seconds=-1)
+
+    inicio = time.perf_counter()
+    resultado = resumen(args.directorio, desde, hasta, args.plantas)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    logger.info(f"Bitácora: {len(resultado)} plantas en {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
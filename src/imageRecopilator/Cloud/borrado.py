@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from imageRecopilator.Cloud.clientes_s3 import gestor_s3
+
+"""
+SERVICIO DE BORRADO EN SEGUNDO PLANO
+====================================
+
+Los timelapses encolan las keys a borrar y siguen; el borrado corre aparte:
+
+- Cola de keys, `BORRADO_CONCURRENCIA` workers: cada uno arma un batch de
+  hasta 1000 keys con lo que haya en la cola y lo envía (varios batches
+  en vuelo a la vez).
+- Los `Errors` por key de `delete_objects` se reintentan con backoff
+  (`BORRADO_REINTENTOS`); si falla el request completo se reintenta el
+  batch entero.
+- Nada se pierde en silencio: las keys pendientes se registran en un
+  diario (`pendientes.jsonl`, altas y bajas) y al reiniciar se vuelven a
+  encolar, incluidas las que agotaron los reintentos.
+- Auditoría JSONL: una línea por batch con acción, resultado y keys.
+- `BORRADO_MODO=etiquetar`: en lugar de borrar, marca cada objeto con el
+  tag `flujoprt-expirar=1` para que una regla de lifecycle del bucket lo
+  expire (borrado diferido, reversible hasta que expira).
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+MODOS = ("borrar", "etiquetar")
+TAG_EXPIRAR = {'TagSet': [{'Key': 'flujoprt-expirar', 'Value': '1'}]}
+MAX_BATCH = 1000
+
+
+class ServicioBorrado:
+    def __init__(self, bucket, s3=None, concurrencia=None, modo=None, dir_estado=None,
+                 reintentos=None, espera_base=1.0):
+        self.bucket = bucket
+        self.s3 = s3
+        self.concurrencia = concurrencia or int(os.getenv("BORRADO_CONCURRENCIA", "4"))
+        self.modo = modo or os.getenv("BORRADO_MODO", "borrar")
+        if self.modo not in MODOS:
+            raise ValueError(f"BORRADO_MODO inválido: {self.modo} (opciones: {', '.join(MODOS)})")
+        self.reintentos = reintentos if reintentos is not None else int(os.getenv("BORRADO_REINTENTOS", "5"))
+        self.espera_base = espera_base
+
+        self.dir_estado = dir_estado or os.getenv(
+            "BORRADO_ESTADO_DIR", os.path.join(os.path.expanduser("~"), ".flujoprt", "borrado")
+        )
+        os.makedirs(self.dir_estado, exist_ok=True)
+        self.ruta_diario = os.path.join(self.dir_estado, "pendientes.jsonl")
+        self.ruta_auditoria = os.path.join(self.dir_estado, "auditoria.jsonl")
+
+        self.cola = None
+        self.workers = []
+        self.pendientes = set()
+        self.borradas = 0
+        self.fallidas = 0
+
+    # =========================
+    # Diario y auditoría
+    # =========================
+
+    def _anotar(self, ruta, registro):
+        with open(ruta, "a") as f:
+            f.write(json.dumps(registro) + "\n")
+
+    def _recuperar_pendientes(self):
+        """Reproduce el diario y lo compacta a las keys que siguen pendientes"""
+        pendientes = set()
+        if os.path.exists(self.ruta_diario):
+            with open(self.ruta_diario) as f:
+                for linea in f:
+                    try:
+                        registro = json.loads(linea)
+                    except json.JSONDecodeError:
+                        continue                     # línea truncada por un corte
+                    pendientes.update(registro.get("+", []))
+                    pendientes.difference_update(registro.get("-", []))
+
+        tmp = self.ruta_diario + ".tmp"
+        with open(tmp, "w") as f:
+            if pendientes:
+                f.write(json.dumps({"+": sorted(pendientes)}) + "\n")
+        os.replace(tmp, self.ruta_diario)
+        return pendientes
+
+    # =========================
+    # Ciclo de vida
+    # =========================
+
+    def iniciar(self):
+        """Arranca los workers y reencola lo que quedó pendiente de ejecuciones anteriores"""
+        if self.workers:
+            return self
+        self.cola = asyncio.Queue()
+        recuperadas = self._recuperar_pendientes()
+        self.pendientes |= recuperadas
+        for key in sorted(recuperadas):
+            self.cola.put_nowait(key)
+        if recuperadas:
+            logger.warning(f"Borrado: {len(recuperadas)} keys pendientes de la ejecución anterior")
+
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrencia)]
+        return self
+
+    def encolar(self, keys, origen=""):
+        """Registra las keys en el diario y las deja en cola; no espera el borrado"""
+        nuevas = [k for k in keys if k not in self.pendientes]
+        if not nuevas:
+            return 0
+        if not self.workers:
+            self.iniciar()
+        self._anotar(self.ruta_diario, {"+": nuevas})
+        self.pendientes.update(nuevas)
+        for key in nuevas:
+            self.cola.put_nowait(key)
+        logger.debug(f"Borrado: {len(nuevas)} keys encoladas {origen}".rstrip())
+        return len(nuevas)
+
+    async def drenar(self, timeout=None):
+        """Espera a que la cola se vacíe. True si terminó a tiempo."""
+        if self.cola is None:
+            return True
+        try:
+            await asyncio.wait_for(self.cola.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def detener(self, timeout=None):
+        """Drena (con timeout) y detiene los workers; lo pendiente queda en el diario"""
+        if not await self.drenar(timeout):
+            logger.warning(f"Borrado: {len(self.pendientes)} keys quedan pendientes para el próximo inicio")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    # =========================
+    # Workers
+    # =========================
+
+    async def _cliente(self):
+        return self.s3 if self.s3 is not None else await gestor_s3().cliente("s3")
+
+    async def _worker(self, worker_id):
+        while True:
+            batch = [await self.cola.get()]
+            while len(batch) < MAX_BATCH and not self.cola.empty():
+                batch.append(self.cola.get_nowait())
+            try:
+                await self._procesar_batch(batch)
+            except Exception as e:
+                logger.error(f"Borrado worker {worker_id}: {e}")
+            finally:
+                for _ in batch:
+                    self.cola.task_done()
+
+    async def _procesar_batch(self, batch):
+        restantes = batch
+        for intento in range(self.reintentos + 1):
+            if intento:
+                await asyncio.sleep(self.espera_base * 2 ** (intento - 1))
+            try:
+                errores = await self._enviar(restantes)
+            except Exception as e:
+                errores = {k: str(e) for k in restantes}
+
+            hechas = [k for k in restantes if k not in errores]
+            if hechas:
+                self._confirmar(hechas, intento)
+            restantes = [k for k in restantes if k in errores]
+            if not restantes:
+                return
+
+        # Agotó los reintentos: sigue en el diario y se reintenta al próximo inicio
+        self.fallidas += len(restantes)
+        self.pendientes.difference_update(restantes)
+        self._anotar(self.ruta_auditoria, {
+            "ts": time.time(), "accion": self.modo, "resultado": "fallido",
+            "errores": {k: errores[k] for k in restantes},
+        })
+        logger.error(f"Borrado: {len(restantes)} keys fallaron tras {self.reintentos} reintentos")
+
+    async def _enviar(self, keys):
+        """Retorna {key: error} de las que no se pudieron borrar/etiquetar"""
+        s3 = await self._cliente()
+        if self.modo == "etiquetar":
+            resultados = await asyncio.gather(*[
+                s3.put_object_tagging(Bucket=self.bucket, Key=k, Tagging=TAG_EXPIRAR) for k in keys
+            ], return_exceptions=True)
+            return {k: str(r) for k, r in zip(keys, resultados) if isinstance(r, Exception)}
+
+        resp = await s3.delete_objects(
+            Bucket=self.bucket,
+            Delete={'Objects': [{'Key': k} for k in keys], 'Quiet': True}
+        )
+        return {e['Key']: e.get('Code', 'Error') for e in resp.get('Errors', [])}
+
+    def _confirmar(self, keys, intento):
+        self.borradas += len(keys)
+        self.pendientes.difference_update(keys)
+        self._anotar(self.ruta_diario, {"-": keys})
+        self._anotar(self.ruta_auditoria, {
+            "ts": time.time(), "accion": self.modo, "resultado": "ok",
+            "intento": intento, "keys": keys,
+        })
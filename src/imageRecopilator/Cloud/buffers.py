@@ -0,0 +1,140 @@
+import asyncio
+import io
+import logging
+
+"""
+POOL DE BUFFERS REUTILIZABLES
+=============================
+
+Slots bytearray preasignados para la cadena captura -> compresión -> subida.
+
+- La respuesta HTTP se copia chunk a chunk directo al slot (sin la lista
+  de chunks + join de resp.read()).
+- Pillow decodifica desde un lector sobre memoryview (sin BytesIO(data)).
+- La recompresión escribe en un slot de salida de capacidad fija (sin los
+  realloc de un BytesIO que crece) y la subida a S3 lee la misma memoria.
+- El slot vuelve al pool cuando el worker S3 termina la subida.
+
+Si un frame no cabe en el slot se usa un bytearray temporal (desborde).
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+# =========================
+# Vistas de lectura/escritura
+# =========================
+
+class LectorMemoria(io.RawIOBase):
+    """Archivo de solo lectura sobre un buffer (memoryview), sin copiarlo"""
+
+    def __init__(self, buffer):
+        self.vista = memoryview(buffer).cast("B")
+        self.posicion = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, destino):
+        n = min(len(destino), len(self.vista) - self.posicion)
+        if n <= 0:
+            return 0
+        destino[:n] = self.vista[self.posicion:self.posicion + n]
+        self.posicion += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.posicion = offset
+        elif whence == io.SEEK_CUR:
+            self.posicion += offset
+        else:
+            self.posicion = len(self.vista) + offset
+        return self.posicion
+
+    def tell(self):
+        return self.posicion
+
+    def __len__(self):
+        return len(self.vista)
+
+
+class SlotBuffer(io.RawIOBase):
+    """Slot reutilizable: se llena por lectura HTTP o como destino de img.save()"""
+
+    def __init__(self, capacidad):
+        self.buffer = bytearray(capacidad)
+        self.largo = 0
+        self.desborde = None
+
+    # --- Escritura (Pillow img.save) ---
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        n = len(datos)
+        fin = self.largo + n
+        if self.desborde is None and fin > len(self.buffer):
+            self.desborde = bytearray(self.buffer[:self.largo])
+        destino = self.desborde if self.desborde is not None else self.buffer
+        if self.desborde is not None:
+            destino.extend(datos)
+        else:
+            destino[self.largo:fin] = datos
+        self.largo = fin
+        return n
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        return self.largo
+
+    # --- Lectura HTTP ---
+
+    async def leer_respuesta(self, resp):
+        """Copia el cuerpo de una respuesta aiohttp al slot"""
+        self.reiniciar()
+        async for chunk in resp.content.iter_any():
+            self.write(chunk)
+        return self.largo
+
+    # --- Acceso ---
+
+    def vista(self) -> memoryview:
+        origen = self.desborde if self.desborde is not None else self.buffer
+        return memoryview(origen)[:self.largo]
+
+    def reiniciar(self):
+        self.largo = 0
+        self.desborde = None
+
+
+class PoolBuffers:
+    def __init__(self, slots, capacidad):
+        self.capacidad = capacidad
+        self.libres = asyncio.Queue()
+        for _ in range(slots):
+            self.libres.put_nowait(SlotBuffer(capacidad))
+        self.total = slots
+        self.desbordes = 0
+
+    async def tomar(self) -> SlotBuffer:
+        slot = await self.libres.get()
+        slot.reiniciar()
+        return slot
+
+    def liberar(self, slot):
+        if slot is None:
+            return
+        if slot.desborde is not None:
+            self.desbordes += 1
+        slot.reiniciar()
+        self.libres.put_nowait(slot)
+
+    def en_uso(self):
+        return self.total - self.libres.qsize()
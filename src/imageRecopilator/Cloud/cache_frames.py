@@ -0,0 +1,294 @@
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+"""
+CACHE LOCAL DE FRAMES (MMAP)
+============================
+
+Reprocesar una semana (reintento de un trabajo, render de un rango ya
+codificado, análisis) volvía a descargar cada frame desde S3. Este cache
+guarda los bytes en disco local y los lee con mmap:
+
+- Clave: (key S3, ETag). Si el objeto cambia en S3 cambia el ETag y el
+  frame viejo simplemente deja de usarse.
+- Los frames se agregan a segmentos empaquetados (`segmento_mb` cada uno,
+  uno activo por proceso). Un índice SQLite mapea clave -> (segmento,
+  offset, largo); los segmentos se leen con mmap de solo lectura.
+- Tope de tamaño (`max_mb`): se expulsan segmentos completos, el de
+  acceso más antiguo primero (LRU por segmento).
+- Métricas: aciertos, fallos, bytes servidos/guardados, expulsiones.
+
+Configuración (cache_compartido): `CACHE_FRAMES_DIR`, `CACHE_FRAMES_MB`
+(0 desactiva el cache).
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+# =========================
+# Cache
+# =========================
+
+class CacheFrames:
+    def __init__(self, directorio, max_mb=1024, segmento_mb=64, reloj=time.time):
+        self.directorio = directorio
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.segmento_bytes = int(segmento_mb * 1024 * 1024)
+        self.reloj = reloj
+        os.makedirs(directorio, exist_ok=True)
+        self.ruta_indice = os.path.join(directorio, "indice.db")
+
+        self._lock = threading.Lock()
+        self._mapas = {}            # segmento -> mmap (se re-mapea si el archivo creció)
+        self._activo = None         # segmento donde escribe este proceso
+        self._activo_bytes = 0
+        self._crear_tablas()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes_servidos = 0
+        self.bytes_guardados = 0
+        self.expulsados = 0
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta_indice, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _crear_tablas(self):
+        conn = self._conectar()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS frames (
+                    clave TEXT PRIMARY KEY,
+                    segmento TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    largo INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS segmentos (
+                    nombre TEXT PRIMARY KEY,
+                    bytes INTEGER NOT NULL DEFAULT 0,
+                    acceso REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_frames_segmento ON frames(segmento)")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def clave(img):
+        """'key|etag' o None si el frame no trae ETag (sin ETag no se puede validar)"""
+        etag = (img.get('etag') or "").strip('"')
+        if not etag:
+            return None
+        return f"{img['key']}|{etag}"
+
+    # -------------------------
+    # Lectura
+    # -------------------------
+
+    def _mapa(self, segmento, fin):
+        mapa = self._mapas.get(segmento)
+        if mapa is None or len(mapa) < fin:
+            if mapa is not None:
+                mapa.close()
+            with open(os.path.join(self.directorio, segmento), "rb") as f:
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapas[segmento] = mapa
+        return mapa
+
+    def obtener_varios(self, imagenes):
+        """Lista paralela a `imagenes` con los bytes cacheados o None"""
+        claves = [self.clave(img) for img in imagenes]
+        buscadas = [c for c in claves if c]
+        encontrados = {}
+        if buscadas:
+            conn = self._conectar()
+            try:
+                marcas = ",".join("?" * len(buscadas))
+                filas = conn.execute(
+                    f"SELECT clave, segmento, offset, largo FROM frames WHERE clave IN ({marcas})", buscadas
+                ).fetchall()
+                encontrados = {clave: (segmento, offset, largo) for clave, segmento, offset, largo in filas}
+                segmentos = {segmento for segmento, _, _ in encontrados.values()}
+                if segmentos:
+                    conn.executemany("UPDATE segmentos SET acceso = ? WHERE nombre = ?",
+                                     [(self.reloj(), s) for s in segmentos])
+            finally:
+                conn.close()
+
+        resultado = []
+        with self._lock:
+            for clave in claves:
+                ubicacion = encontrados.get(clave)
+                data = None
+                if ubicacion:
+                    segmento, offset, largo = ubicacion
+                    try:
+                        # Copia: el segmento puede expulsarse mientras el frame sigue en uso
+                        data = bytes(self._mapa(segmento, offset + largo)[offset:offset + largo])
+                    except (OSError, ValueError):
+                        data = None     # expulsado por otro proceso entre el índice y la lectura
+                    if data is not None and len(data) != largo:
+                        data = None
+                if data is None:
+                    self.fallos += 1
+                else:
+                    self.aciertos += 1
+                    self.bytes_servidos += len(data)
+                resultado.append(data)
+        return resultado
+
+    def obtener(self, img):
+        return self.obtener_varios([img])[0]
+
+    # -------------------------
+    # Escritura
+    # -------------------------
+
+    def _nuevo_segmento(self, conn):
+        self._activo = f"seg_{os.getpid()}_{uuid.uuid4().hex[:8]}.bin"
+        self._activo_bytes = 0
+        conn.execute("INSERT INTO segmentos (nombre, bytes, acceso) VALUES (?, 0, ?)", (self._activo, self.reloj()))
+
+    def guardar_varios(self, pares):
+        """Agrega [(img, data)] al segmento activo. Los frames sin ETag o ya cacheados se ignoran."""
+        pares = [(self.clave(img), data) for img, data in pares]
+        pares = [(clave, data) for clave, data in pares if clave and data]
+        if not pares:
+            return 0
+
+        guardados = 0
+        with self._lock:
+            conn = self._conectar()
+            archivo = None
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                existentes = {fila[0] for fila in conn.execute(
+                    f"SELECT clave FROM frames WHERE clave IN ({','.join('?' * len(pares))})",
+                    [clave for clave, _ in pares]
+                )}
+                for clave, data in pares:
+                    if clave in existentes:
+                        continue
+                    if self._activo is None or self._activo_bytes + len(data) > self.segmento_bytes:
+                        if archivo:
+                            archivo.close()
+                            archivo = None
+                        self._nuevo_segmento(conn)
+                    if archivo is None:
+                        archivo = open(os.path.join(self.directorio, self._activo), "ab")
+                    offset = self._activo_bytes
+                    archivo.write(data)
+                    self._activo_bytes += len(data)
+                    conn.execute("INSERT OR REPLACE INTO frames (clave, segmento, offset, largo) VALUES (?, ?, ?, ?)",
+                                 (clave, self._activo, offset, len(data)))
+                    existentes.add(clave)
+                    guardados += 1
+                    self.bytes_guardados += len(data)
+                if archivo:
+                    # Los bytes quedan en disco antes de que el índice los publique
+                    archivo.close()
+                    archivo = None
+                if guardados:
+                    conn.execute("UPDATE segmentos SET bytes = ?, acceso = ? WHERE nombre = ?",
+                                 (self._activo_bytes, self.reloj(), self._activo))
+                self._expulsar(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                self._activo = None     # el segmento nuevo pudo quedar sin fila
+                raise
+            finally:
+                if archivo:
+                    archivo.close()
+                conn.close()
+        return guardados
+
+    def guardar(self, img, data):
+        return self.guardar_varios([(img, data)])
+
+    def _expulsar(self, conn):
+        """Borra segmentos completos, el de acceso más antiguo primero, hasta quedar bajo el tope"""
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM segmentos").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for nombre, tamaño in conn.execute(
+                "SELECT nombre, bytes FROM segmentos WHERE nombre != ? ORDER BY acceso", (self._activo or "",)
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM frames WHERE segmento = ?", (nombre,))
+            conn.execute("DELETE FROM segmentos WHERE nombre = ?", (nombre,))
+            mapa = self._mapas.pop(nombre, None)
+            if mapa is not None:
+                mapa.close()
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except OSError:
+                pass
+            total -= tamaño
+            self.expulsados += 1
+            logger.debug(f"Cache de frames: segmento {nombre} expulsado ({tamaño / 1024 / 1024:.1f}MB)")
+
+    # -------------------------
+    # Métricas
+    # -------------------------
+
+    def tamaño(self):
+        conn = self._conectar()
+        try:
+            return conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM segmentos").fetchone()[0]
+        finally:
+            conn.close()
+
+    def resumen(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else 0.0,
+            "bytes_servidos": self.bytes_servidos,
+            "bytes_guardados": self.bytes_guardados,
+            "expulsados": self.expulsados,
+        }
+
+    def cerrar(self):
+        with self._lock:
+            for mapa in self._mapas.values():
+                mapa.close()
+            self._mapas.clear()
+            self._activo = None
+
+
+# =========================
+# Cache del proceso
+# =========================
+
+_cache = None
+
+
+def cache_compartido():
+    """Cache del proceso según CACHE_FRAMES_DIR / CACHE_FRAMES_MB; None si está desactivado"""
+    global _cache
+    if _cache is None:
+        max_mb = float(os.getenv("CACHE_FRAMES_MB", "1024"))
+        if max_mb <= 0:
+            return None
+        directorio = os.getenv("CACHE_FRAMES_DIR", os.path.expanduser("~/.flujoprt/cache_frames"))
+        _cache = CacheFrames(directorio, max_mb=max_mb)
+    return _cache
+
+
+def configurar_cache(cache):
+    """Reemplaza el cache del proceso (tests, otro directorio). Retorna el anterior."""
+    global _cache
+    anterior, _cache = _cache, cache
+    return anterior
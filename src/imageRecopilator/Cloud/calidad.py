@@ -0,0 +1,174 @@
+import io
+import logging
+import threading
+from datetime import datetime
+
+from PIL import Image
+
+from imageRecopilator.Cloud.buffers import LectorMemoria
+from imageRecopilator.registro import TIPO_DIA
+
+"""
+CONTROL DE CALIDAD JPEG POR PRESUPUESTO
+=======================================
+
+En lugar de un JPEG_QUALITY fijo para todas las cámaras, cada planta
+tiene un presupuesto de bytes por día y la calidad se ajusta para
+cumplirlo:
+
+- Objetivo por frame = presupuesto restante del día / frames restantes
+  esperados. Se corrige solo: si la mañana gastó de más, la tarde baja.
+- Búsqueda binaria de la calidad sobre una sonda reducida (decodificación
+  draft 1/4 por DCT, ~1/16 de los píxeles): la calidad más alta cuyo
+  tamaño estimado cabe en el objetivo. Escenas simples llegan al máximo
+  sin sondeos extra; escenas complejas bajan.
+- La sonda subestima el tamaño real: un factor de calibración por planta
+  (promedio móvil de real / estimado) corrige la estimación.
+- Cache por (planta, hora del día): la búsqueda se repite cada
+  `resondeo` frames o si el tamaño real se aleja del objetivo más que la
+  tolerancia. El resto de los frames solo codifica una vez.
+
+Sin presupuesto para la planta (0) se usa la calidad fija de siempre.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+def sonda_reducida(data, divisor=4):
+    """Decodifica el JPEG a 1/divisor por lado usando la escala DCT del decoder"""
+    img = Image.open(LectorMemoria(data))
+    ancho, alto = img.size
+    img.draft("RGB", (max(1, ancho // divisor), max(1, alto // divisor)))
+    img = img.convert("RGB")
+    return img, (ancho * alto) / (img.size[0] * img.size[1])
+
+
+def bytes_jpeg(img, calidad):
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=calidad, optimize=True)
+    return buffer.tell()
+
+
+class ControladorCalidad:
+    def __init__(self, presupuesto_mb=0, por_planta=None, horas=None, intervalo=60,
+                 calidad_fija=80, calidad_min=40, calidad_max=90,
+                 resondeo=30, tolerancia=0.25, reloj=datetime.now):
+        self.presupuesto_mb = presupuesto_mb
+        self.por_planta = por_planta or {}
+        self.horas = horas if horas is not None else {}     # registro.horas (se recarga en caliente)
+        self.intervalo = intervalo
+        self.calidad_fija = calidad_fija
+        self.calidad_min = calidad_min
+        self.calidad_max = calidad_max
+        self.resondeo = resondeo
+        self.tolerancia = tolerancia
+        self.reloj = reloj
+
+        self.cache = {}            # (planta, hora) -> {"calidad", "restantes"}
+        self.factor = {}           # planta -> real / estimado por la sonda
+        self.estimado = {}         # planta -> bytes estimados de la última búsqueda
+        self.dia = {}              # planta -> {"fecha", "bytes", "frames"}
+        self.sondeos = 0
+        self._lock = threading.Lock()
+
+    def presupuesto(self, planta):
+        """Bytes por día de la planta (0 = sin control)"""
+        return int(self.por_planta.get(planta, self.presupuesto_mb) * 1024 * 1024)
+
+    def frames_esperados(self, planta, ahora):
+        """Frames que la planta captura en el día según su horario e intervalo"""
+        tipo = TIPO_DIA[ahora.weekday()]
+        if tipo not in self.horas.get(planta, {}):
+            return 1                    # sin captura ese día (domingo sin horario "domingo")
+        inicio, fin = self.horas[planta][tipo]
+        segundos = (fin.hour * 3600 + fin.minute * 60) - (inicio.hour * 3600 + inicio.minute * 60)
+        return max(1, segundos // self.intervalo)
+
+    def _consumo(self, planta, fecha):
+        estado = self.dia.get(planta)
+        if estado is None or estado["fecha"] != fecha:
+            estado = self.dia[planta] = {"fecha": fecha, "bytes": 0, "frames": 0}
+        return estado
+
+    def objetivo(self, planta):
+        """Bytes por frame para terminar el día dentro del presupuesto"""
+        ahora = self.reloj()
+        consumo = self._consumo(planta, ahora.date())
+        restante = max(0, self.presupuesto(planta) - consumo["bytes"])
+        frames = max(1, self.frames_esperados(planta, ahora) - consumo["frames"])
+        return restante / frames
+
+    def buscar(self, planta, data, objetivo):
+        """Búsqueda binaria: la calidad más alta cuyo tamaño estimado cabe en el objetivo"""
+        img, area = sonda_reducida(data)
+        factor = area * self.factor.get(planta, 1.0)
+        bajo, alto = self.calidad_min, self.calidad_max
+        elegida, estimado = self.calidad_min, None
+
+        while bajo <= alto:
+            medio = (bajo + alto) // 2
+            tamano = bytes_jpeg(img, medio) * factor
+            self.sondeos += 1
+            if tamano <= objetivo:
+                elegida, estimado = medio, tamano
+                bajo = medio + 1
+            else:
+                alto = medio - 1
+
+        if estimado is None:
+            estimado = bytes_jpeg(img, self.calidad_min) * factor
+        self.estimado[planta] = estimado
+        return elegida
+
+    def calidad(self, planta, data):
+        """Calidad a usar para este frame de la planta"""
+        if not planta or self.presupuesto(planta) <= 0:
+            return self.calidad_fija
+
+        clave = (planta, self.reloj().hour)
+        with self._lock:
+            entrada = self.cache.get(clave)
+            if entrada and entrada["restantes"] > 0:
+                entrada["restantes"] -= 1
+                return entrada["calidad"]
+            objetivo = self.objetivo(planta)
+
+        calidad = self.buscar(planta, data, objetivo)
+        with self._lock:
+            self.cache[clave] = {"calidad": calidad, "restantes": self.resondeo - 1, "objetivo": objetivo}
+        logger.debug(f"{planta} - calidad {calidad} (objetivo {objetivo / 1024:.0f}KB/frame)")
+        return calidad
+
+    def registrar(self, planta, bytes_reales, calidad):
+        """Tamaño real del frame: consume presupuesto y recalibra la sonda"""
+        if not planta or self.presupuesto(planta) <= 0:
+            return
+        ahora = self.reloj()
+        with self._lock:
+            consumo = self._consumo(planta, ahora.date())
+            consumo["bytes"] += bytes_reales
+            consumo["frames"] += 1
+
+            entrada = self.cache.get((planta, ahora.hour))
+            if entrada is None or entrada["calidad"] != calidad:
+                return
+
+            # Calibración con el primer frame de cada búsqueda (la estimación es de ese frame)
+            estimado = self.estimado.pop(planta, None)
+            if estimado:
+                factor = self.factor.get(planta, 1.0)
+                self.factor[planta] = factor * (0.5 + 0.5 * bytes_reales / estimado)
+
+            # Lejos del objetivo (y con margen para corregir): la próxima captura vuelve a buscar
+            objetivo = entrada["objetivo"]
+            excedido = bytes_reales > objetivo * (1 + self.tolerancia) and calidad > self.calidad_min
+            holgado = bytes_reales < objetivo * (1 - self.tolerancia) and calidad < self.calidad_max
+            if excedido or holgado:
+                entrada["restantes"] = 0
+
+    def resumen(self):
+        """Consumo del día por planta: {planta: {bytes, frames, presupuesto}}"""
+        return {
+            planta: {"bytes": estado["bytes"], "frames": estado["frames"], "presupuesto": self.presupuesto(planta)}
+            for planta, estado in self.dia.items()
+        }
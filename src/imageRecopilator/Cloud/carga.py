@@ -0,0 +1,100 @@
+import logging
+from collections import defaultdict
+
+"""
+POLÍTICA DE CARGA (BACKPRESSURE)
+================================
+
+Cuando la cola de subida se llena, la captura no debe quedarse esperando
+con un cupo de descarga tomado. La política degrada por niveles según la
+ocupación de la cola:
+
+- normal:    sin cambios.
+- presión:   (>= umbral_presion) se comprime más: la calidad JPEG baja
+             `reduccion_calidad` puntos.
+- alta:      (>= umbral_alta) además se espacia el sondeo
+             (`factor_intervalo`) y se descartan los frames sin
+             actividad de las plantas de prioridad 0.
+- saturada:  cola llena; solo entran frames con actividad (o de plantas
+             con prioridad >= 2) y nadie espera más de `espera_cola`
+             por un lugar.
+
+Prioridad de un frame = prioridad de la planta (PRIORIDAD_POR_PLANTA,
+default 1) + 1 si el detector vio actividad, o sea 0..3. Con la
+prioridad por defecto un frame con actividad nunca se descarta por
+prioridad: solo si la cola sigue llena tras `espera_cola`. Los
+descartes se cuentan por planta y motivo.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+NORMAL, PRESION, ALTA, SATURADA = range(4)
+NIVELES = ("normal", "presion", "alta", "saturada")
+
+CONFIG_CARGA_DEFAULT = {
+    "umbral_presion": 0.5,       # ocupación de la cola desde la que se comprime más
+    "umbral_alta": 0.8,          # ocupación desde la que se espacia el sondeo y se descarta
+    "reduccion_calidad": 15,     # puntos de calidad JPEG menos desde "presión"
+    "factor_intervalo": 2.0,     # multiplicador del intervalo de sondeo desde "alta"
+    "espera_cola": 5.0,          # segundos máximos esperando lugar en la cola (sin cupo de descarga tomado)
+    "prioridad_minima": {ALTA: 1, SATURADA: 2},  # prioridad de frame necesaria para entrar
+}
+
+
+class PoliticaCarga:
+    def __init__(self, capacidad, prioridades=None, config=None):
+        self.capacidad = max(1, capacidad)
+        self.prioridades = prioridades or {}
+        self.config = dict(CONFIG_CARGA_DEFAULT)
+        if config:
+            self.config.update(config)
+        self.nivel = NORMAL
+        self.descartados = defaultdict(lambda: defaultdict(int))   # planta -> motivo -> frames
+
+    def actualizar(self, en_cola) -> int:
+        """Recalcula el nivel según los elementos en cola; avisa en los cambios"""
+        ocupacion = en_cola / self.capacidad
+        if en_cola >= self.capacidad:
+            nivel = SATURADA
+        elif ocupacion >= self.config["umbral_alta"]:
+            nivel = ALTA
+        elif ocupacion >= self.config["umbral_presion"]:
+            nivel = PRESION
+        else:
+            nivel = NORMAL
+
+        if nivel != self.nivel:
+            mensaje = f"Carga: {NIVELES[self.nivel]} -> {NIVELES[nivel]} (cola {en_cola}/{self.capacidad})"
+            if nivel > self.nivel:
+                logger.warning(mensaje)
+            else:
+                logger.info(mensaje)
+            self.nivel = nivel
+        return nivel
+
+    def reduccion_calidad(self) -> int:
+        return self.config["reduccion_calidad"] if self.nivel >= PRESION else 0
+
+    def factor_intervalo(self) -> float:
+        return self.config["factor_intervalo"] if self.nivel >= ALTA else 1.0
+
+    def espera_cola(self) -> float:
+        return self.config["espera_cola"]
+
+    def prioridad(self, planta, activo=True) -> int:
+        return self.prioridades.get(planta, 1) + (1 if activo else 0)
+
+    def descartar(self, planta, activo=True) -> bool:
+        """True si el frame no debe encolarse en el nivel actual"""
+        minima = self.config["prioridad_minima"].get(self.nivel)
+        return minima is not None and self.prioridad(planta, activo) < minima
+
+    def registrar_descarte(self, planta, motivo):
+        self.descartados[planta][motivo] += 1
+
+    def resumen(self):
+        """{planta: {motivo: frames}} de los descartes desde el arranque"""
+        return {planta: dict(motivos) for planta, motivos in self.descartados.items()}
+
+    def total_descartados(self) -> int:
+        return sum(sum(motivos.values()) for motivos in self.descartados.values())
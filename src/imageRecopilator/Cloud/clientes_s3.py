@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+
+"""
+CLIENTES AWS COMPARTIDOS
+========================
+
+Un único gestor por proceso: una sesión (cache de credenciales común) y
+un cliente por servicio, creado la primera vez que se pide y reutilizado
+hasta `cerrar()`. Crear un cliente resuelve credenciales y abre un pool
+de conexiones nuevo; con el gestor eso ocurre una vez por proceso, no
+por planta ni por batch.
+
+- `S3_MAX_CONEXIONES`: tamaño del pool (uploaders + ventana del pipeline
+  + borrado + compactación comparten el mismo cliente).
+- `S3_ENDPOINT_URL`: S3 alternativo (MinIO, localstack) para pruebas.
+- `configurar_gestor()` inyecta otro gestor o clientes ya construidos.
+- Los clientes creados quedan atados al event loop que los creó: si se
+  piden desde otro loop (`correr()` y `correr_virtual` abren uno nuevo
+  por corrida) se descartan y se crean de nuevo. Los inyectados se
+  conservan.
+- aioboto3 se importa al crear el gestor, no al importar este módulo
+  (boto3 es la importación más cara del arranque).
+
+Uso:
+    async with gestor_s3().s3() as s3:
+        await s3.put_object(...)
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+class GestorClientesS3:
+    def __init__(self, session=None, max_conexiones=None, endpoint_url=None):
+        import aioboto3
+        from aiobotocore.config import AioConfig
+
+        self.session = session or aioboto3.Session()
+        self.endpoint_url = endpoint_url or os.getenv("S3_ENDPOINT_URL") or None
+        self.config = AioConfig(
+            max_pool_connections=max_conexiones or int(os.getenv("S3_MAX_CONEXIONES", "64")),
+            retries={"max_attempts": 3, "mode": "adaptive"},
+            tcp_keepalive=True,
+        )
+        self._pila = AsyncExitStack()
+        self._clientes = {}
+        self._inyectados = set()
+        self._lock = None
+        self._loop = None
+
+    def inyectar(self, servicio, cliente):
+        """Registra un cliente ya construido (p. ej. un S3 en memoria para tests)"""
+        self._clientes[servicio] = cliente
+        self._inyectados.add(servicio)
+
+    def _revisar_loop(self):
+        """Olvida los clientes creados en otro event loop (su pool no sirve fuera de él)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        creados = [s for s in self._clientes if s not in self._inyectados]
+        if creados:
+            logger.debug(f"Event loop nuevo: se recrean los clientes {', '.join(creados)}")
+        for servicio in creados:
+            del self._clientes[servicio]
+        self._pila = AsyncExitStack()
+        self._lock = None
+        self._loop = loop
+
+    async def cliente(self, servicio="s3"):
+        self._revisar_loop()
+        if servicio in self._clientes:
+            return self._clientes[servicio]
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if servicio not in self._clientes:
+                kwargs = {"config": self.config}
+                if servicio == "s3" and self.endpoint_url:
+                    kwargs["endpoint_url"] = self.endpoint_url
+                self._clientes[servicio] = await self._pila.enter_async_context(
+                    self.session.client(servicio, **kwargs)
+                )
+                logger.debug(f"Cliente {servicio} creado (pool {self.config.max_pool_connections})")
+        return self._clientes[servicio]
+
+    @asynccontextmanager
+    async def s3(self):
+        """Mismo uso que `session.client('s3')`, pero sin cerrar el cliente compartido"""
+        yield await self.cliente("s3")
+
+    async def cerrar(self):
+        if self._loop is asyncio.get_running_loop():
+            await self._pila.aclose()
+        self._pila = AsyncExitStack()
+        self._clientes.clear()
+        self._inyectados.clear()
+        self._loop = None
+
+
+_gestor = None
+
+
+def gestor_s3() -> GestorClientesS3:
+    global _gestor
+    if _gestor is None:
+        _gestor = GestorClientesS3()
+    return _gestor
+
+
+def configurar_gestor(gestor):
+    """Reemplaza el gestor del proceso (tests, otro endpoint). Retorna el anterior."""
+    global _gestor
+    anterior, _gestor = _gestor, gestor
+    return anterior
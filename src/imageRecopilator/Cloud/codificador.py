@@ -0,0 +1,151 @@
+import logging
+import os
+import shutil
+
+"""
+PERFILES DE CODIFICACIÓN
+========================
+
+Perfiles con nombre para el timelapse (TIMELAPSE_PERFIL):
+
+- rapido:  libx264, el mismo CRF de siempre; prioriza tiempo de CPU.
+- tamano:  libx265, ~40-50% menos bytes a calidad similar, más CPU.
+- archivo: libsvtav1, el menor tamaño; el más lento.
+
+Cada perfil fija hilos, tune (stillimage donde el encoder lo soporta:
+cámaras fijas con fondo estático) y decimación (1 de cada N frames).
+Con `bitrate` en vez de `crf` se codifica en dos pasadas; con `escala`
+("1280:-2") se reescala al codificar.
+
+TIMELAPSE_FPS, TIMELAPSE_CODEC, TIMELAPSE_EXT y TIMELAPSE_THREADS
+sobrescriben lo del perfil. Comparar perfiles con datos:
+
+    python -m imageRecopilator.Cloud.benchmarks codificador --frames 600
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+PERFILES = {
+    "rapido": {
+        "codec": "libx264",
+        "preset": "fast",
+        "crf": 28,
+        "tune": "stillimage",
+        "threads": 0,           # 0 = automático
+        "decimar": 1,
+    },
+    "tamano": {
+        "codec": "libx265",
+        "preset": "medium",
+        "crf": 30,
+        "tune": None,           # x265 no tiene stillimage
+        "threads": 0,
+        "decimar": 1,
+    },
+    "archivo": {
+        "codec": "libsvtav1",
+        "preset": "6",
+        "crf": 34,
+        "tune": None,
+        "threads": 0,
+        "decimar": 1,
+    },
+}
+
+PERFIL_DEFAULT = "rapido"
+
+# Encoders que aceptan -tune stillimage
+_TUNE_STILLIMAGE = {"libx264"}
+
+PIPE_ENTRADA = "pipe:0"
+PIPE_SALIDA = "pipe:1"
+
+# Formato ffmpeg para escribir cada extensión a un pipe
+_FORMATOS_STREAM = {"mp4": "mp4", "mov": "mov", "mkv": "matroska", "webm": "webm"}
+
+
+def perfil_desde_entorno(nombre=None):
+    """Perfil efectivo: el de TIMELAPSE_PERFIL con los overrides del entorno"""
+    nombre = nombre or os.getenv("TIMELAPSE_PERFIL", PERFIL_DEFAULT)
+    if nombre not in PERFILES:
+        raise ValueError(f"Perfil de codificación desconocido: {nombre} (opciones: {', '.join(PERFILES)})")
+
+    perfil = dict(PERFILES[nombre], nombre=nombre)
+    perfil["fps"] = int(os.getenv("TIMELAPSE_FPS", "30"))
+    perfil["ext"] = os.getenv("TIMELAPSE_EXT", "mp4")
+    if os.getenv("TIMELAPSE_CODEC"):
+        perfil["codec"] = os.getenv("TIMELAPSE_CODEC")
+    if os.getenv("TIMELAPSE_THREADS"):
+        perfil["threads"] = int(os.getenv("TIMELAPSE_THREADS"))
+    if os.getenv("TIMELAPSE_DECIMAR"):
+        perfil["decimar"] = max(1, int(os.getenv("TIMELAPSE_DECIMAR")))
+    return perfil
+
+
+def _opciones_codec(perfil, pasada=None, log_pasadas=None):
+    codec = perfil["codec"]
+    opciones = ["-c:v", codec, "-preset", str(perfil["preset"])]
+
+    if perfil.get("tune") and (perfil["tune"] != "stillimage" or codec in _TUNE_STILLIMAGE):
+        opciones += ["-tune", perfil["tune"]]
+
+    if perfil.get("threads") is not None:
+        opciones += ["-threads", str(perfil["threads"])]
+
+    if codec == "libx265":
+        parametros = "log-level=error"
+        if pasada:
+            parametros += f":pass={pasada}:stats={log_pasadas}"
+        opciones += ["-tag:v", "hvc1", "-x265-params", parametros]
+    elif pasada:
+        opciones += ["-pass", str(pasada), "-passlogfile", log_pasadas]
+
+    if perfil.get("escala"):
+        opciones += ["-vf", f"scale={perfil['escala']}"]
+
+    opciones += ["-pix_fmt", "yuv420p"]
+    return opciones
+
+
+def requiere_archivos(perfil):
+    """Dos pasadas leen la entrada dos veces: no se puede alimentar por pipe"""
+    return bool(perfil.get("bitrate"))
+
+
+def _salida(perfil, salida):
+    """Salida a archivo o a pipe (pipe:1): MP4 fragmentado, escribible sin seek"""
+    if salida != PIPE_SALIDA:
+        return [salida]
+    formato = _FORMATOS_STREAM.get(perfil["ext"], perfil["ext"])
+    opciones = ["-f", formato]
+    if formato in ("mp4", "mov"):
+        opciones = ["-movflags", "frag_keyframe+empty_moov+default_base_moof"] + opciones
+    return opciones + [salida]
+
+
+def comandos_ffmpeg(perfil, entrada, salida, log_pasadas=None):
+    """
+    Lista de comandos a ejecutar en orden: uno con CRF, dos con bitrate
+    (primera pasada sin salida). `entrada` es un patrón glob o pipe:0
+    (JPEGs concatenados por stdin); `salida` un archivo o pipe:1.
+    """
+    if entrada == PIPE_ENTRADA:
+        entrada = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                   "-f", "image2pipe", "-framerate", str(perfil["fps"]), "-c:v", "mjpeg", "-i", entrada]
+    else:
+        entrada = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                   "-framerate", str(perfil["fps"]), "-pattern_type", "glob", "-i", entrada]
+
+    if not perfil.get("bitrate"):
+        return [entrada + _opciones_codec(perfil) + ["-crf", str(perfil["crf"])] + _salida(perfil, salida)]
+
+    log_pasadas = log_pasadas or f"{salida}.pasada"
+    bitrate = ["-b:v", str(perfil["bitrate"])]
+    return [
+        entrada + _opciones_codec(perfil, 1, log_pasadas) + bitrate + ["-an", "-f", "null", os.devnull],
+        entrada + _opciones_codec(perfil, 2, log_pasadas) + bitrate + _salida(perfil, salida),
+    ]
+
+
+def ffmpeg_disponible():
+    return shutil.which("ffmpeg") is not None
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import tarfile
+import tempfile
+from collections import defaultdict
+
+"""
+COMPACTACIÓN DIARIA EN SHARDS
+=============================
+
+Al cierre del día empaqueta los frames de cada planta en UN objeto tar
+(sin compresión: los JPEG ya están comprimidos) más un índice JSON con
+el offset de cada frame dentro del tar.
+
+    shards/YYYY/MM/DD/<planta>-<version>.tar
+    shards/YYYY/MM/DD/<planta>.json
+
+El tar lleva una versión en el nombre: el índice se reescribe después de
+subir el tar nuevo, así nunca apunta a offsets de otro contenido.
+
+El domingo se leen con pocos GETs por rango en vez de un GET por frame,
+y el borrado pasa de miles de keys a 2 por planta-día. El tar se puede
+abrir con `tar xf` si hace falta revisar frames a mano.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+SHARDS_PREFIX = "shards"
+INDICE_VERSION = 1
+
+
+# =========================
+# Utilidades
+# =========================
+
+def claves_shard(fecha, planta, version=""):
+    """(key del tar, key del índice) para una planta-día"""
+    base = f"{SHARDS_PREFIX}/{fecha.year}/{fecha.month:02d}/{fecha.day:02d}/{planta}"
+    tar_key = f"{base}-{version}.tar" if version else f"{base}.tar"
+    return tar_key, f"{base}.json"
+
+
+def prefijo_shards(fecha):
+    return f"{SHARDS_PREFIX}/{fecha.year}/{fecha.month:02d}/{fecha.day:02d}/"
+
+
+def construir_shard(frames, destino):
+    """
+    Escribe un tar con los frames [(key, data)] en `destino` (archivo binario)
+    y retorna el índice [{key, offset, size, etag}] con offsets de datos.
+    """
+    with tarfile.open(fileobj=destino, mode="w", format=tarfile.USTAR_FORMAT) as tar:
+        for key, data in frames:
+            info = tarfile.TarInfo(name=key.rsplit("/", 1)[-1])
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    etags = {key.rsplit("/", 1)[-1]: (key, hashlib.md5(data, usedforsecurity=False).hexdigest())
+             for key, data in frames}
+
+    # Releer cabeceras para obtener offset_data exacto de cada miembro
+    destino.seek(0)
+    indice = []
+    with tarfile.open(fileobj=destino, mode="r:") as tar:
+        for miembro in tar:
+            key, etag = etags[miembro.name]
+            indice.append({
+                "key": key,
+                "offset": miembro.offset_data,
+                "size": miembro.size,
+                "etag": etag,
+            })
+    destino.seek(0)
+    return indice
+
+
+async def borrar_en_lotes(s3, bucket, keys):
+    """delete_objects en batches de 1000; retorna keys con error"""
+    errores = []
+    for i in range(0, len(keys), 1000):
+        batch = [{'Key': k} for k in keys[i:i + 1000]]
+        resp = await s3.delete_objects(Bucket=bucket, Delete={'Objects': batch, 'Quiet': True})
+        errores.extend(e['Key'] for e in resp.get('Errors', []))
+    return errores
+
+
+# =========================
+# Compactación
+# =========================
+
+async def cargar_indice(s3, bucket, indice_key):
+    try:
+        obj = await s3.get_object(Bucket=bucket, Key=indice_key)
+        return json.loads(await obj['Body'].read())
+    except Exception:
+        return None
+
+
+async def compactar_planta_dia(s3, bucket, fecha, planta, keys, ventana=8):
+    """Empaqueta las keys sueltas de una planta-día (y un shard previo si existe)"""
+    _, indice_key = claves_shard(fecha, planta)
+    frames = []
+
+    # Si ya existe un shard (frames tardíos), se reconstruye incluyéndolo
+    previo = await cargar_indice(s3, bucket, indice_key)
+    if previo:
+        obj = await s3.get_object(Bucket=bucket, Key=previo["shard"])
+        contenido = await obj['Body'].read()
+        for f in previo["frames"]:
+            frames.append((f["key"], contenido[f["offset"]:f["offset"] + f["size"]]))
+
+    sem = asyncio.Semaphore(ventana)
+
+    async def descargar(key):
+        async with sem:
+            try:
+                obj = await s3.get_object(Bucket=bucket, Key=key)
+                return key, await obj['Body'].read()
+            except Exception as e:
+                logger.error(f"  [COMPACTACIÓN] {key}: {e}")
+                return key, None
+
+    for key, data in await asyncio.gather(*[descargar(k) for k in keys]):
+        if data is not None:
+            frames.append((key, data))
+
+    if not frames:
+        return 0
+
+    frames.sort(key=lambda f: f[0])
+    sueltas = set(keys)
+    compactadas = [key for key, _ in frames if key in sueltas]
+    version = hashlib.md5("|".join(key for key, _ in frames).encode(), usedforsecurity=False).hexdigest()[:8]
+    tar_key, _ = claves_shard(fecha, planta, version)
+
+    with tempfile.TemporaryFile() as tmp:
+        indice = await asyncio.to_thread(construir_shard, frames, tmp)
+        tamano = tmp.seek(0, io.SEEK_END)
+        tmp.seek(0)
+        await s3.upload_fileobj(tmp, bucket, tar_key)
+
+    # Verificar el shard antes de borrar los originales
+    head = await s3.head_object(Bucket=bucket, Key=tar_key)
+    if head['ContentLength'] != tamano:
+        logger.error(f"  [COMPACTACIÓN] {tar_key}: tamaño {head['ContentLength']} != {tamano}, no se borran originales")
+        return 0
+
+    await s3.put_object(
+        Bucket=bucket,
+        Key=indice_key,
+        Body=json.dumps({
+            "version": INDICE_VERSION,
+            "shard": tar_key,
+            "planta": planta,
+            "fecha": f"{fecha.date()}",
+            "frames": indice,
+        }),
+        ContentType="application/json"
+    )
+
+    obsoletos = [previo["shard"]] if previo and previo["shard"] != tar_key else []
+    errores = await borrar_en_lotes(s3, bucket, compactadas + obsoletos)
+    if errores:
+        logger.warning(f"  [COMPACTACIÓN] {planta}: {len(errores)} originales sin borrar")
+
+    logger.info(f"  Shard {planta} {fecha.date()}: {len(frames)} frames, {tamano/1024/1024:.1f}MB")
+    return len(compactadas)
+
+
+async def compactar_dia(s3, bucket, prefix, fecha):
+    """Compacta todas las plantas de un día. Retorna frames compactados"""
+    prefijo_dia = f"{prefix}/{fecha.year}/{fecha.month:02d}/{fecha.day:02d}/"
+    por_planta = defaultdict(list)
+
+    paginator = s3.get_paginator('list_objects_v2')
+    async for page in paginator.paginate(Bucket=bucket, Prefix=prefijo_dia):
+        for obj in page.get('Contents', []):
+            if obj['Key'].endswith('.jpg'):
+                planta = obj['Key'][len(prefijo_dia):].split('/')[0]
+                por_planta[planta].append(obj['Key'])
+
+    total = 0
+    for planta, keys in por_planta.items():
+        try:
+            total += await compactar_planta_dia(s3, bucket, fecha, planta, keys)
+        except Exception as e:
+            logger.error(f"  [COMPACTACIÓN] {planta} {fecha.date()}: {e}")
+
+    return total
+
+
+# =========================
+# Lectura (Sunday)
+# =========================
+
+async def frames_desde_indices(s3, bucket, fecha):
+    """Frames sharded de un día: {planta: [{key, etag, size, shard, offset}]}"""
+    resultado = defaultdict(list)
+    paginator = s3.get_paginator('list_objects_v2')
+
+    async for page in paginator.paginate(Bucket=bucket, Prefix=prefijo_shards(fecha)):
+        for obj in page.get('Contents', []):
+            if not obj['Key'].endswith('.json'):
+                continue
+            indice = await cargar_indice(s3, bucket, obj['Key'])
+            if not indice:
+                continue
+            for f in indice["frames"]:
+                resultado[indice["planta"]].append({
+                    'key': f["key"],
+                    'etag': f["etag"],
+                    'size': f["size"],
+                    'shard': indice["shard"],
+                    'indice': obj['Key'],
+                    'offset': f["offset"],
+                })
+
+    return resultado
+
+
+def keys_borrables(imagenes, confirmadas):
+    """
+    Keys S3 a borrar tras procesar: frames sueltos confirmados y shards
+    (tar + índice) cuyos frames fueron todos confirmados.
+    """
+    confirmadas = set(confirmadas)
+    sueltas = []
+    shards = {}
+
+    for img in imagenes:
+        if img.get('shard'):
+            clave = (img['shard'], img['indice'])
+            shards[clave] = shards.get(clave, True) and img['key'] in confirmadas
+        elif img['key'] in confirmadas:
+            sueltas.append(img['key'])
+
+    return sueltas + [key for clave, completo in shards.items() if completo for key in clave]
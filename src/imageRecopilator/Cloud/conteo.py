@@ -0,0 +1,255 @@
+import argparse
+import io
+import logging
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from imageRecopilator.Cloud.actividad import gris_reducido
+from imageRecopilator.registro import TIPO_DIA
+
+"""
+MOTOR DE CONTEO VEHICULAR
+=========================
+
+Análisis offline por lotes sobre los frames de la semana.
+
+- Los frames se apilan en arrays (N, alto, ancho) y se procesan vectorizados.
+- Fondo por planta: mediana del lote combinada con el fondo anterior.
+- Ocupación: fracción de píxeles de la ROI que difieren del fondo.
+- Conteo estimado: ocupación / ocupación típica de un vehículo.
+- Salida: serie de tiempo columnar en .npz (timestamp, ocupacion, conteo)
+  más un resumen por hora (cola media/máxima y flujo de llegadas).
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+# =========================
+# Configuración por defecto
+# =========================
+
+CONFIG_CONTEO_DEFAULT = {
+    "tamano": (320, 180),            # resolución de análisis (ancho, alto)
+    "roi": None,                     # polígono [(x, y), ...] en fracciones 0-1; None = frame completo
+    "umbral_pixel": 30,              # diferencia de gris para considerar un píxel ocupado
+    "ocupacion_por_vehiculo": 0.04,  # fracción de la ROI que ocupa un vehículo típico
+    "tamano_lote": 64,               # frames apilados por lote
+}
+
+PATRON_FECHA = re.compile(r"(\d{8}_\d{6})\.jpg$")
+
+
+# =========================
+# Utilidades
+# =========================
+
+def mascara_roi(poligono, tamano) -> np.ndarray:
+    """Máscara booleana (alto, ancho) a partir de un polígono en coordenadas relativas"""
+    ancho, alto = tamano
+    if not poligono:
+        return np.ones((alto, ancho), dtype=bool)
+
+    img = Image.new("1", (ancho, alto), 0)
+    puntos = [(x * (ancho - 1), y * (alto - 1)) for x, y in poligono]
+    ImageDraw.Draw(img).polygon(puntos, fill=1)
+    return np.asarray(img, dtype=bool)
+
+
+def timestamp_desde_nombre(nombre: str):
+    """Extrae el epoch de captura desde 'DENOM_YYYYmmdd_HHMMSS.jpg' (key S3 o path local)"""
+    m = PATRON_FECHA.search(str(nombre))
+    if not m:
+        return None
+    return int(datetime.strptime(m.group(1), "%Y%m%d_%H%M%S").timestamp())
+
+
+def dentro_de_ventana(ts, horarios_planta) -> bool:
+    """True si el epoch cae dentro del horario de la planta (lun-vie / sábado / domingo si lo tiene)"""
+    dt = datetime.fromtimestamp(ts)
+    tipo = TIPO_DIA[dt.weekday()]
+    if tipo not in horarios_planta:
+        return False
+    inicio, fin = horarios_planta[tipo]
+    return inicio <= dt.strftime("%H:%M") <= fin
+
+
+# =========================
+# Motor
+# =========================
+
+class MotorConteo:
+    def __init__(self, config_por_planta=None, config_default=None):
+        self.config_default = dict(CONFIG_CONTEO_DEFAULT)
+        if config_default:
+            self.config_default.update(config_default)
+        self.config_por_planta = config_por_planta or {}
+
+        self.pendientes = defaultdict(list)   # planta -> [(ts, array)]
+        self.fondos = {}
+        self.mascaras = {}
+        self.series = defaultdict(lambda: {"timestamp": [], "ocupacion": [], "conteo": []})
+
+    def config(self, planta):
+        cfg = dict(self.config_default)
+        cfg.update(self.config_por_planta.get(planta, {}))
+        return cfg
+
+    def mascara(self, planta):
+        if planta not in self.mascaras:
+            cfg = self.config(planta)
+            self.mascaras[planta] = mascara_roi(cfg["roi"], tuple(cfg["tamano"]))
+        return self.mascaras[planta]
+
+    def agregar(self, planta, ts, data):
+        """Agrega un frame JPEG; procesa el lote cuando se completa"""
+        cfg = self.config(planta)
+        if ts is None:
+            return
+        try:
+            frame = gris_reducido(data, tuple(cfg["tamano"]))
+        except Exception as e:
+            logger.warning(f"  [CONTEO] {planta}: frame inválido ({e})")
+            return
+
+        self.pendientes[planta].append((ts, frame))
+        if len(self.pendientes[planta]) >= cfg["tamano_lote"]:
+            self.procesar_lote(planta)
+
+    def procesar_lote(self, planta):
+        """Ocupación y conteo vectorizados sobre el lote pendiente"""
+        lote = self.pendientes.pop(planta, [])
+        if not lote:
+            return
+
+        cfg = self.config(planta)
+        mascara = self.mascara(planta)
+        timestamps = np.fromiter((ts for ts, _ in lote), dtype=np.int64, count=len(lote))
+        pila = np.stack([frame for _, frame in lote])          # (N, alto, ancho)
+
+        fondo_lote = np.median(pila, axis=0)
+        fondo = self.fondos.get(planta)
+        fondo = fondo_lote if fondo is None else 0.5 * fondo + 0.5 * fondo_lote
+        self.fondos[planta] = fondo
+
+        ocupados = (np.abs(pila - fondo) > cfg["umbral_pixel"]) & mascara
+        ocupacion = ocupados.sum(axis=(1, 2)) / max(int(mascara.sum()), 1)
+        conteo = np.rint(ocupacion / cfg["ocupacion_por_vehiculo"]).astype(np.int16)
+
+        serie = self.series[planta]
+        serie["timestamp"].append(timestamps)
+        serie["ocupacion"].append(ocupacion.astype(np.float32))
+        serie["conteo"].append(conteo)
+
+    def serie(self, planta):
+        """Serie completa de la planta (procesa el lote parcial pendiente)"""
+        self.procesar_lote(planta)
+        columnas = self.series.get(planta)
+        if not columnas or not columnas["timestamp"]:
+            return {
+                "timestamp": np.empty(0, dtype=np.int64),
+                "ocupacion": np.empty(0, dtype=np.float32),
+                "conteo": np.empty(0, dtype=np.int16),
+            }
+
+        serie = {nombre: np.concatenate(partes) for nombre, partes in columnas.items()}
+        orden = np.argsort(serie["timestamp"], kind="stable")
+        return {nombre: col[orden] for nombre, col in serie.items()}
+
+    def resumen_por_hora(self, serie, horarios_planta=None):
+        """Cola media/máxima y flujo (llegadas estimadas) por hora"""
+        if len(serie["timestamp"]) == 0:
+            return {
+                "hora": np.empty(0, dtype=np.int64),
+                "frames": np.empty(0, dtype=np.int32),
+                "cola_media": np.empty(0, dtype=np.float32),
+                "cola_max": np.empty(0, dtype=np.int16),
+                "flujo": np.empty(0, dtype=np.int32),
+                "en_horario": np.empty(0, dtype=bool),
+            }
+
+        conteo = serie["conteo"].astype(np.int32)
+        horas, idx = np.unique(serie["timestamp"] // 3600 * 3600, return_inverse=True)
+
+        frames = np.bincount(idx, minlength=len(horas))
+        cola_media = np.bincount(idx, weights=conteo, minlength=len(horas)) / frames
+        cola_max = np.zeros(len(horas), dtype=np.int32)
+        np.maximum.at(cola_max, idx, conteo)
+
+        # Llegadas: incrementos positivos del conteo entre frames consecutivos
+        llegadas = np.diff(conteo, prepend=conteo[0]).clip(min=0)
+        flujo = np.bincount(idx, weights=llegadas, minlength=len(horas))
+
+        if horarios_planta:
+            en_horario = np.array([dentro_de_ventana(int(h), horarios_planta) for h in horas])
+        else:
+            en_horario = np.ones(len(horas), dtype=bool)
+
+        return {
+            "hora": horas.astype(np.int64),
+            "frames": frames.astype(np.int32),
+            "cola_media": cola_media.astype(np.float32),
+            "cola_max": cola_max.astype(np.int16),
+            "flujo": flujo.astype(np.int32),
+            "en_horario": en_horario,
+        }
+
+    def exportar_npz(self, planta, horarios_planta=None) -> bytes:
+        """Serie + resumen por hora como .npz comprimido (columnar)"""
+        serie = self.serie(planta)
+        resumen = self.resumen_por_hora(serie, horarios_planta)
+
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            **serie,
+            **{f"hora_{nombre}": col for nombre, col in resumen.items() if nombre != "hora"},
+            hora=resumen["hora"],
+        )
+        return buffer.getvalue()
+
+    def descartar(self, planta):
+        """Libera el estado de una planta ya exportada"""
+        self.pendientes.pop(planta, None)
+        self.fondos.pop(planta, None)
+        self.series.pop(planta, None)
+
+
+# =========================
+# Lectura en streaming
+# =========================
+
+def iterar_frames_locales(directorio_planta, patron="*.jpg"):
+    """Frames de un árbol local (YYYY/MM/DD/Planta/*.jpg) en orden de captura"""
+    for path in sorted(Path(directorio_planta).rglob(patron), key=lambda p: p.name):
+        yield timestamp_desde_nombre(path.name), path.read_bytes()
+
+
+# =========================
+# CLI offline
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Conteo vehicular offline sobre capturas locales")
+    parser.add_argument("directorio", help="Carpeta con los frames de una planta (recursivo)")
+    parser.add_argument("--planta", required=True)
+    parser.add_argument("--salida", default=None, help="Archivo .npz de salida")
+    args = parser.parse_args()
+
+    motor = MotorConteo()
+    for ts, data in iterar_frames_locales(args.directorio):
+        motor.agregar(args.planta, ts, data)
+
+    salida = args.salida or f"{args.planta.replace(' ', '_')}_conteo.npz"
+    with open(salida, "wb") as f:
+        f.write(motor.exportar_npz(args.planta))
+    print(f"Serie guardada en {os.path.abspath(salida)}")
+
+
+if __name__ == "__main__":
+    main()
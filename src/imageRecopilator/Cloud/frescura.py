@@ -0,0 +1,143 @@
+import logging
+from collections import deque
+
+import numpy as np
+
+from imageRecopilator.Cloud.actividad import gris_reducido
+
+"""
+DETECTOR DE IMAGEN CONGELADA
+============================
+
+El servidor de cámaras entrega un `imagen.jpg` cacheado: si el feed se
+congela aguas arriba se sigue recibiendo la misma escena, a veces con la
+hora del overlay re-dibujada (el MD5 cambia y la deduplicación no lo ve).
+
+- Firma: escala de grises muy reducida (64x36, decodificación draft) sin
+  los píxeles de la máscara (overlay con la hora, logos).
+- Se compara con una ventana de firmas recientes: si la nueva no difiere
+  de NINGUNA (fracción de píxeles cambiados <= umbral_area) y la ventana
+  está llena, la cámara queda "congelada".
+- Congelada: los frames iguales no se suben y `SaludCamara` alarga el
+  intervalo de sondeo hasta que el contenido vuelve a cambiar.
+- Un frame con el mismo MD5 que el anterior cuenta como igual sin
+  decodificar (`repetir`).
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+# =========================
+# Configuración por defecto
+# =========================
+
+CONFIG_FRESCURA_DEFAULT = {
+    "habilitado": True,
+    "tamano": (64, 36),                  # resolución de la firma (ancho, alto)
+    "mascara": [(0.0, 0.0, 1.0, 0.1)],   # rectángulos (x0, y0, x1, y1) en fracciones que se ignoran
+    "umbral_pixel": 8,                   # diferencia de gris para considerar un píxel cambiado
+    "umbral_area": 0.002,                # fracción de píxeles cambiados bajo la que dos firmas son iguales
+    "ventana": 5,                        # firmas iguales consecutivas para declarar congelada
+}
+
+
+# =========================
+# Detector
+# =========================
+
+class DetectorFrescura:
+    def __init__(self, config_por_planta=None, config_default=None):
+        self.config_default = dict(CONFIG_FRESCURA_DEFAULT)
+        if config_default:
+            self.config_default.update(config_default)
+        self.config_por_planta = config_por_planta or {}
+        self.ventanas = {}
+        self.mascaras = {}
+        self.congeladas = {}     # planta -> frames congelados desde que se detectó
+
+    def config(self, planta):
+        """Configuración efectiva de una planta (default + override)"""
+        cfg = dict(self.config_default)
+        cfg.update(self.config_por_planta.get(planta, {}))
+        return cfg
+
+    def _mascara(self, planta, cfg):
+        """Booleano (alto, ancho): True en los píxeles que entran a la firma"""
+        ancho, alto = cfg["tamano"]
+        clave = (planta, ancho, alto)
+        if clave not in self.mascaras:
+            visible = np.ones((alto, ancho), dtype=bool)
+            for x0, y0, x1, y1 in cfg["mascara"]:
+                visible[int(y0 * alto):int(np.ceil(y1 * alto)), int(x0 * ancho):int(np.ceil(x1 * ancho))] = False
+            self.mascaras[clave] = visible
+        return self.mascaras[clave]
+
+    def firma(self, planta, data) -> np.ndarray:
+        cfg = self.config(planta)
+        gris = gris_reducido(data, tuple(cfg["tamano"]))
+        return gris[self._mascara(planta, cfg)]
+
+    @staticmethod
+    def diferencia(a, b, umbral_pixel) -> float:
+        """Fracción de píxeles de la firma que cambiaron más de `umbral_pixel`"""
+        return float(np.count_nonzero(np.abs(a - b) > umbral_pixel)) / max(a.size, 1)
+
+    def _registrar(self, planta, cfg, firma, igual):
+        ventana = self.ventanas.get(planta)
+        if ventana is None or ventana.maxlen != cfg["ventana"]:
+            ventana = self.ventanas[planta] = deque(maxlen=cfg["ventana"])
+
+        congelada = igual and len(ventana) == ventana.maxlen
+        if not igual:
+            ventana.clear()         # contenido nuevo: nueva referencia
+        ventana.append(firma)
+
+        previa = planta in self.congeladas
+        if congelada:
+            if not previa:
+                logger.warning(f"{planta} - Imagen congelada ({cfg['ventana']} frames sin cambios), sondeo reducido")
+                self.congeladas[planta] = 0
+            self.congeladas[planta] += 1
+        elif previa:
+            logger.info(f"{planta} - Imagen fresca tras {self.congeladas.pop(planta)} frames congelados")
+        return congelada
+
+    def evaluar(self, planta, data) -> bool:
+        """True si el frame repite el contenido congelado (no debería subirse)"""
+        cfg = self.config(planta)
+        if not cfg["habilitado"]:
+            return False
+        try:
+            firma = self.firma(planta, data)
+        except Exception as e:
+            logger.warning(f"{planta} - Detector de frescura falló: {e}")
+            return False
+
+        ventana = self.ventanas.get(planta)
+        igual = bool(ventana) and ventana[-1].shape == firma.shape and all(
+            self.diferencia(firma, previa, cfg["umbral_pixel"]) <= cfg["umbral_area"] for previa in ventana
+        )
+        return self._registrar(planta, cfg, firma, igual)
+
+    def repetir(self, planta) -> bool:
+        """Mismo MD5 que el frame anterior: cuenta como igual sin decodificar"""
+        cfg = self.config(planta)
+        ventana = self.ventanas.get(planta)
+        if not cfg["habilitado"] or not ventana:
+            return False
+        return self._registrar(planta, cfg, ventana[-1], igual=True)
+
+    def congelada(self, planta) -> bool:
+        return planta in self.congeladas
+
+    def resumen(self):
+        return dict(self.congeladas)
+
+    def reiniciar(self, planta=None):
+        """Descarta la ventana de firmas (la planta cambió de cámara o se quitó del registro)"""
+        if planta is None:
+            self.ventanas.clear()
+            self.congeladas.clear()
+        else:
+            self.ventanas.pop(planta, None)
+            self.congeladas.pop(planta, None)
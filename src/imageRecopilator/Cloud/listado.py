@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+
+from imageRecopilator.Cloud.compactacion import frames_desde_indices
+from imageRecopilator.Cloud.metadatos import indices_del_dia
+
+"""
+LISTADO PARALELO DE LA SEMANA
+=============================
+
+En lugar de paginar los seis días uno tras otro:
+
+1. Por día (en paralelo): plantas con frames sueltos (Delimiter='/'),
+   frames en shards y el índice lateral de metadatos.
+2. Abanico día × planta con concurrencia acotada (LISTADO_CONCURRENCIA);
+   las páginas se acumulan a medida que llegan.
+3. Cada planta se entrega apenas terminan TODOS sus prefijos, sin esperar
+   al resto: el procesamiento de la primera planta se solapa con el
+   listado de las demás. Las tareas se crean planta por planta para que
+   las primeras terminen primero.
+
+Una planta cuyo listado falla no se entrega (un listado parcial
+produciría un timelapse incompleto).
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+def prefijo_dia(prefijo, fecha):
+    return f"{prefijo}/{fecha.year}/{fecha.month:02d}/{fecha.day:02d}/"
+
+
+async def plantas_del_dia(s3, bucket, prefijo):
+    """Nombres de planta bajo un prefijo de día (un nivel, sin listar objetos)"""
+    plantas = []
+    paginator = s3.get_paginator('list_objects_v2')
+    async for page in paginator.paginate(Bucket=bucket, Prefix=prefijo, Delimiter='/'):
+        for comun in page.get('CommonPrefixes', []):
+            plantas.append(comun['Prefix'][len(prefijo):].rstrip('/'))
+    return plantas
+
+
+def deduplicar(dias):
+    """
+    Frames de una planta deduplicados por ETag (sueltos y luego shards, día
+    por día). Retorna (imagenes, duplicados sueltos a borrar).
+    """
+    imagenes = []
+    etags = {}
+    duplicados = []
+
+    for fecha, objetos, frames, metas in dias:
+        for obj in objetos:
+            if not obj['Key'].endswith('.jpg'):
+                continue
+            etag = obj['ETag'].strip('"')
+            if etag in etags:
+                duplicados.append(obj['Key'])
+                continue
+            etags[etag] = obj['Key']
+            imagenes.append({
+                'key': obj['Key'],
+                'etag': etag,
+                'size': obj['Size'],
+                'meta': metas.get(obj['Key'])
+            })
+
+        # Frames compactados en shards (se leen por rango)
+        for frame in frames:
+            if frame['etag'] in etags:
+                # Duplicado dentro de un shard: se borra junto con el shard
+                continue
+            etags[frame['etag']] = frame['key']
+            frame['meta'] = metas.get(frame['key'])
+            imagenes.append(frame)
+
+    return imagenes, duplicados
+
+
+class ListadorSemana:
+    """Lista un conjunto de días (la semana dominical o cualquier rango)"""
+
+    def __init__(self, s3, bucket, prefijo, fechas, concurrencia=None, solo=None):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefijo = prefijo
+        self.fechas = list(fechas)
+        self.concurrencia = concurrencia or int(os.getenv("LISTADO_CONCURRENCIA", "8"))
+        self.solo = set(solo) if solo else None       # restringe a estas plantas
+        self.paginas = 0
+
+    async def _preparar_dia(self, fecha, cupos):
+        async with cupos:
+            plantas = await plantas_del_dia(self.s3, self.bucket, prefijo_dia(self.prefijo, fecha))
+        async with cupos:
+            shards = await frames_desde_indices(self.s3, self.bucket, fecha)
+        async with cupos:
+            metas = await indices_del_dia(self.s3, self.bucket, fecha)
+        return plantas, shards, metas
+
+    async def _listar(self, planta, fecha, cupos, destino):
+        prefijo = f"{prefijo_dia(self.prefijo, fecha)}{planta}/"
+        async with cupos:
+            paginator = self.s3.get_paginator('list_objects_v2')
+            async for page in paginator.paginate(Bucket=self.bucket, Prefix=prefijo):
+                self.paginas += 1
+                destino.extend(page.get('Contents', []))
+
+    async def plantas(self):
+        """
+        Genera (planta, dias) a medida que cada planta queda completa.
+        dias: [(fecha, objetos_sueltos, frames_shard, metas)] en orden de fecha.
+        """
+        cupos = asyncio.Semaphore(self.concurrencia)
+        preparados = await asyncio.gather(*[self._preparar_dia(f, cupos) for f in self.fechas])
+
+        sueltas = defaultdict(dict)               # planta -> fecha -> [objetos]
+        todas = set()
+        for fecha, (plantas, shards, metas) in zip(self.fechas, preparados):
+            for planta in plantas:
+                sueltas[planta][fecha] = []
+            todas.update(plantas, shards, metas)
+        if self.solo is not None:
+            todas &= self.solo
+
+        listas = asyncio.Queue()
+        pendientes = {planta: len(sueltas[planta]) for planta in todas}
+        fallidas = set()
+
+        def armar(planta):
+            return planta, [
+                (fecha, sueltas[planta].get(fecha, []), shards.get(planta, []), metas.get(planta, {}))
+                for fecha, (_, shards, metas) in zip(self.fechas, preparados)
+            ]
+
+        async def listar(planta, fecha):
+            try:
+                await self._listar(planta, fecha, cupos, sueltas[planta][fecha])
+            except Exception as e:
+                logger.error(f"Listado {planta} {fecha.date()} falló: {e}")
+                fallidas.add(planta)
+            pendientes[planta] -= 1
+            if pendientes[planta] == 0 and planta not in fallidas:
+                listas.put_nowait(armar(planta))
+
+        tareas = []
+        for planta in sorted(todas):
+            if pendientes[planta] == 0:
+                listas.put_nowait(armar(planta))      # solo shards
+            for fecha in sorted(sueltas[planta]):
+                tareas.append(asyncio.create_task(listar(planta, fecha)))
+
+        async def cerrar():
+            await asyncio.gather(*tareas)
+            listas.put_nowait(None)
+
+        productor = asyncio.create_task(cerrar())
+        try:
+            while (item := await listas.get()) is not None:
+                yield item
+        finally:
+            for tarea in [*tareas, productor]:
+                tarea.cancel()
+            await asyncio.gather(*tareas, productor, return_exceptions=True)
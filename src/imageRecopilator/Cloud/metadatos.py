@@ -0,0 +1,207 @@
+import json
+import logging
+from collections import Counter, defaultdict
+
+from botocore.exceptions import ClientError
+
+from imageRecopilator.Cloud.conteo import timestamp_desde_nombre
+
+"""
+METADATOS DE CAPTURA
+====================
+
+Cada frame se describe al capturarlo (ancho, alto, timestamp, bytes, md5):
+
+- Como user metadata del objeto S3 (x-amz-meta-*).
+- En un índice lateral por planta-día `indices/YYYY/MM/DD/<planta>.jsonl`
+  (una línea por frame), que se reescribe periódicamente.
+
+El domingo el índice basta para descartar resoluciones inconsistentes y
+ordenar por timestamp real, sin descargar ni decodificar nada. Los frames
+sin entrada en el índice (capturas anteriores) se conservan y se validan
+al decodificar, como antes.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+INDICES_PREFIX = "indices"
+
+# Marcadores SOF con dimensiones (excluye DHT=C4, JPG=C8, DAC=CC)
+_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+# =========================
+# Dimensiones sin decodificar
+# =========================
+
+def dimensiones_jpeg(data):
+    """(ancho, alto) leyendo solo los headers del JPEG; None si no se encuentra el SOF"""
+    vista = memoryview(data)
+    if len(vista) < 4 or vista[0] != 0xFF or vista[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 4 <= len(vista):
+        if vista[i] != 0xFF:
+            return None
+        marcador = vista[i + 1]
+        if marcador == 0xFF:                 # relleno
+            i += 1
+            continue
+        if marcador in (0xD8, 0x01) or 0xD0 <= marcador <= 0xD7:
+            i += 2
+            continue
+        largo = (vista[i + 2] << 8) | vista[i + 3]
+        if marcador in _SOF:
+            if i + 9 > len(vista):
+                return None
+            alto = (vista[i + 5] << 8) | vista[i + 6]
+            ancho = (vista[i + 7] << 8) | vista[i + 8]
+            return ancho, alto
+        if marcador == 0xDA:                 # inicio de datos sin SOF previo
+            return None
+        i += 2 + largo
+    return None
+
+
+def metadatos_frame(data, ts, md5):
+    """Metadata S3 (valores str) de un frame recién comprimido"""
+    meta = {"ts": str(int(ts)), "bytes": str(len(data)), "md5": md5}
+    dimensiones = dimensiones_jpeg(data)
+    if dimensiones:
+        meta["ancho"], meta["alto"] = str(dimensiones[0]), str(dimensiones[1])
+    return meta
+
+
+def entrada_indice(key, meta):
+    """Línea del índice: mismos campos que la metadata, con tipos numéricos"""
+    entrada = {"key": key}
+    for campo, valor in meta.items():
+        entrada[campo] = int(valor) if campo in ("ts", "bytes", "ancho", "alto") else valor
+    return entrada
+
+
+# =========================
+# Índice lateral por planta-día
+# =========================
+
+def clave_indice(fecha, planta):
+    return f"{INDICES_PREFIX}/{fecha.year}/{fecha.month:02d}/{fecha.day:02d}/{planta}.jsonl"
+
+
+def prefijo_indices(fecha):
+    return f"{INDICES_PREFIX}/{fecha.year}/{fecha.month:02d}/{fecha.day:02d}/"
+
+
+def _parsear_jsonl(contenido):
+    entradas = {}
+    for linea in contenido.splitlines():
+        if linea.strip():
+            entrada = json.loads(linea)
+            entradas[entrada["key"]] = entrada
+    return entradas
+
+
+class IndiceDiario:
+    """
+    Acumula las entradas de los frames subidos y reescribe el .jsonl de
+    cada planta-día modificado. Cada volcado se fusiona antes con lo que
+    haya en S3: reinicios a mitad de día y particiones que escriben el
+    mismo planta-día (una planta reasignada) no se pisan las entradas.
+    """
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.entradas = defaultdict(dict)    # (fecha, planta) -> {key: entrada}
+        self.pendientes = set()
+
+    def agregar(self, fecha, planta, key, meta):
+        clave = (fecha.date(), planta)
+        self.entradas[clave][key] = entrada_indice(key, meta)
+        self.pendientes.add(clave)
+
+    async def volcar(self, s3):
+        """Sube los índices con entradas nuevas. Retorna cuántos se escribieron."""
+        escritos = 0
+        for clave in list(self.pendientes):
+            fecha, planta = clave
+            key = clave_indice(fecha, planta)
+            try:
+                previas = await cargar_indice_dia(s3, self.bucket, key)
+                previas.update(self.entradas[clave])
+                self.entradas[clave] = previas
+
+                cuerpo = "\n".join(
+                    json.dumps(e, ensure_ascii=False)
+                    for e in sorted(self.entradas[clave].values(), key=lambda e: e.get("ts", 0))
+                )
+                await s3.put_object(Bucket=self.bucket, Key=key, Body=cuerpo.encode(),
+                                    ContentType="application/x-ndjson")
+                self.pendientes.discard(clave)
+                escritos += 1
+            except Exception as e:
+                logger.error(f"Índice {key}: {e}")
+        return escritos
+
+    def descartar_anteriores(self, fecha):
+        """Libera de memoria los días ya volcados anteriores a fecha"""
+        for clave in list(self.entradas):
+            if clave[0] < fecha.date() and clave not in self.pendientes:
+                del self.entradas[clave]
+
+
+async def cargar_indice_dia(s3, bucket, key):
+    try:
+        obj = await s3.get_object(Bucket=bucket, Key=key)
+        return _parsear_jsonl((await obj['Body'].read()).decode())
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return {}
+        raise
+
+
+async def indices_del_dia(s3, bucket, fecha):
+    """{planta: {key: entrada}} de todos los índices laterales de un día"""
+    resultado = {}
+    paginator = s3.get_paginator('list_objects_v2')
+    async for page in paginator.paginate(Bucket=bucket, Prefix=prefijo_indices(fecha)):
+        for obj in page.get('Contents', []):
+            if obj['Key'].endswith('.jsonl'):
+                planta = obj['Key'].rsplit('/', 1)[-1][:-len('.jsonl')]
+                resultado[planta] = await cargar_indice_dia(s3, bucket, obj['Key'])
+    return resultado
+
+
+# =========================
+# Selección dominical
+# =========================
+
+def filtrar_y_ordenar(imagenes):
+    """
+    Con la metadata adjunta (img['meta']) descarta los frames de resolución
+    distinta a la dominante y ordena por timestamp de captura.
+    Retorna (validas, descartadas).
+    """
+    resoluciones = Counter(
+        (img['meta']['ancho'], img['meta']['alto'])
+        for img in imagenes
+        if img.get('meta') and 'ancho' in img['meta']
+    )
+    dominante = resoluciones.most_common(1)[0][0] if resoluciones else None
+
+    validas, descartadas = [], []
+    for img in imagenes:
+        meta = img.get('meta') or {}
+        if dominante and 'ancho' in meta and (meta['ancho'], meta['alto']) != dominante:
+            descartadas.append(img)
+        else:
+            validas.append(img)
+
+    validas.sort(key=lambda img: (ts_frame(img) or 0, img['key']))
+    return validas, descartadas
+
+
+def ts_frame(img):
+    """Timestamp de captura: metadata si existe, si no el del nombre del archivo"""
+    meta = img.get('meta') or {}
+    return meta.get('ts') or timestamp_desde_nombre(img['key'])
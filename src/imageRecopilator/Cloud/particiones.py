@@ -0,0 +1,197 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+"""
+CAPTURA PARTICIONADA
+====================
+
+Reparte las cámaras entre N procesos (o hosts) con hashing consistente.
+
+- Coordinación con una base SQLite compartida (sin servicios externos):
+  cada worker renueva su lease (latido); los que no renuevan dentro del
+  TTL dejan de contar y sus cámaras se reasignan solas en el próximo
+  ciclo de los demás.
+- Hashing consistente: al entrar o salir un worker solo se mueven las
+  cámaras de ese worker, no todo el registro.
+- Líder = worker vivo con menor id; ejecuta las tareas únicas
+  (compactación, procesamiento dominical).
+- Cada worker publica sus métricas y el líder las agrega.
+
+Entre hosts la base debe estar en un filesystem compartido con locks
+POSIX funcionales (SQLite sobre NFS sin locks no es seguro).
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+# =========================
+# Hashing consistente
+# =========================
+
+def _hash(valor: str) -> int:
+    return int.from_bytes(hashlib.md5(valor.encode(), usedforsecurity=False).digest()[:8], "big")
+
+
+class AnilloConsistente:
+    def __init__(self, nodos, replicas=64):
+        self.replicas = replicas
+        self.anillo = sorted(
+            (_hash(f"{nodo}#{i}"), nodo)
+            for nodo in nodos
+            for i in range(replicas)
+        )
+        self.claves = [h for h, _ in self.anillo]
+
+    def asignar(self, clave):
+        if not self.anillo:
+            return None
+        i = bisect.bisect(self.claves, _hash(clave)) % len(self.anillo)
+        return self.anillo[i][1]
+
+
+def camaras_asignadas(plantas, worker_id, vivos):
+    """Subconjunto de plantas que le corresponde a worker_id entre los vivos"""
+    anillo = AnilloConsistente(sorted(set(vivos) | {worker_id}))
+    return {planta for planta in plantas if anillo.asignar(planta) == worker_id}
+
+
+# =========================
+# Coordinador (lease SQLite)
+# =========================
+
+class CoordinadorSQLite:
+    def __init__(self, ruta, worker_id, ttl=90, reloj=time.time):
+        self.ruta = ruta
+        self.worker_id = worker_id
+        self.ttl = ttl
+        self.reloj = reloj
+        self.host = socket.gethostname()
+        self._crear_tablas()
+
+    @contextmanager
+    def _conectar(self):
+        """Una conexión por operación: commit (o rollback) y cierre al salir"""
+        conn = sqlite3.connect(self.ruta, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _crear_tablas(self):
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    id TEXT PRIMARY KEY,
+                    host TEXT,
+                    pid INTEGER,
+                    latido REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metricas (
+                    worker_id TEXT PRIMARY KEY,
+                    datos TEXT,
+                    actualizado REAL
+                )
+            """)
+
+    def latido(self):
+        """Renueva el lease de este worker"""
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO workers (id, host, pid, latido) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET host=excluded.host, pid=excluded.pid, latido=excluded.latido",
+                (self.worker_id, self.host, os.getpid(), self.reloj())
+            )
+
+    def vivos(self):
+        limite = self.reloj() - self.ttl
+        with self._conectar() as conn:
+            filas = conn.execute("SELECT id FROM workers WHERE latido >= ? ORDER BY id", (limite,)).fetchall()
+        return [fila[0] for fila in filas]
+
+    def es_lider(self):
+        vivos = self.vivos()
+        return not vivos or vivos[0] == self.worker_id
+
+    def retirar(self):
+        """Libera el lease al apagar: los demás reasignan sin esperar el TTL"""
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM workers WHERE id = ?", (self.worker_id,))
+            conn.execute("DELETE FROM metricas WHERE worker_id = ?", (self.worker_id,))
+
+    def asignacion(self, plantas):
+        return camaras_asignadas(plantas, self.worker_id, self.vivos())
+
+    def publicar_metricas(self, datos):
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO metricas (worker_id, datos, actualizado) VALUES (?, ?, ?) "
+                "ON CONFLICT(worker_id) DO UPDATE SET datos=excluded.datos, actualizado=excluded.actualizado",
+                (self.worker_id, json.dumps(datos), self.reloj())
+            )
+
+    def metricas_agregadas(self):
+        """Suma los contadores numéricos publicados por los workers vivos"""
+        vivos = set(self.vivos())
+        total = {}
+        with self._conectar() as conn:
+            filas = conn.execute("SELECT worker_id, datos FROM metricas").fetchall()
+        for worker_id, datos in filas:
+            if worker_id not in vivos:
+                continue
+            for nombre, valor in json.loads(datos).items():
+                if isinstance(valor, (int, float)):
+                    total[nombre] = total.get(nombre, 0) + valor
+        total["workers"] = len(vivos)
+        return total
+
+
+# =========================
+# Lanzador
+# =========================
+
+def lanzar_particiones(n, script, db, reinicio=30, continuar=lambda: True):
+    """
+    Levanta N procesos de captura (PARTICION_ID=p0..pN-1) y los reinicia
+    si mueren. Mientras un worker está caído, su lease vence y los demás
+    toman sus cámaras.
+    """
+    procesos = {}
+
+    def iniciar(particion):
+        env = dict(os.environ, PARTICION_ID=particion, PARTICIONES_DB=db)
+        procesos[particion] = subprocess.Popen([sys.executable, script], env=env)
+        logger.info(f"Partición {particion} iniciada (PID {procesos[particion].pid})")
+
+    for i in range(n):
+        iniciar(f"p{i}")
+
+    try:
+        while continuar():
+            time.sleep(reinicio)
+            if not continuar():
+                break
+            for particion, proceso in list(procesos.items()):
+                codigo = proceso.poll()
+                if codigo is not None:
+                    logger.warning(f"Partición {particion} terminó (código {codigo}), reiniciando")
+                    iniciar(particion)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proceso in procesos.values():
+            proceso.terminate()
+        for proceso in procesos.values():
+            proceso.wait()
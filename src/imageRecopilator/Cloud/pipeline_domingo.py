@@ -0,0 +1,436 @@
+import asyncio
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from collections import deque
+
+from imageRecopilator.Cloud.codificador import (
+    PIPE_ENTRADA, PIPE_SALIDA, comandos_ffmpeg, perfil_desde_entorno, requiere_archivos
+)
+from imageRecopilator.Cloud.conteo import MotorConteo
+from imageRecopilator.Cloud.metadatos import dimensiones_jpeg, ts_frame
+from imageRecopilator.Cloud.subida_multiparte import SubidaMultiparte
+
+"""
+PIPELINE DOMINICAL: UNA DESCARGA, VARIOS CONSUMIDORES
+=====================================================
+
+Cada frame se descarga UNA sola vez (ventana acotada en memoria) y se
+entrega en orden a todas las etapas registradas (timelapse, conteo, ...).
+
+- Las etapas se registran como fábricas: una instancia nueva por planta,
+  así dos plantas en paralelo no comparten estado.
+- Un frame queda confirmado (ack) cuando TODAS las etapas lo consumieron
+  sin error.
+- Solo se borran los frames confirmados y solo si todas las etapas
+  finalizaron correctamente. Agregar etapas no agrega GETs a S3.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+_CONTENT_TYPES = {"mp4": "video/mp4", "mov": "video/quicktime", "mkv": "video/x-matroska", "webm": "video/webm"}
+
+
+# =========================
+# Descarga ordenada
+# =========================
+
+def agrupar_peticiones(imagenes, max_bytes=32 * 1024 * 1024, max_hueco=64 * 1024):
+    """
+    Agrupa frames consecutivos del mismo shard en una sola petición por rango.
+    Frames sueltos quedan como una petición cada uno. Retorna [(shard, [imagenes])].
+    """
+    peticiones = []
+    for img in imagenes:
+        shard = img.get('shard')
+        if shard and peticiones and peticiones[-1][0] == shard:
+            grupo = peticiones[-1][1]
+            ultimo = grupo[-1]
+            fin_ultimo = ultimo['offset'] + ultimo['size']
+            fin = img['offset'] + img['size']
+            if (0 <= img['offset'] - fin_ultimo <= max_hueco
+                    and fin - grupo[0]['offset'] <= max_bytes):
+                grupo.append(img)
+                continue
+        peticiones.append((shard, [img]))
+    return peticiones
+
+
+async def descargar_en_orden(s3, bucket, imagenes, ventana=5, cache=None, al_descargar=None):
+    """
+    Descarga frames con a lo más `ventana` GETs en vuelo y entrega
+    (key, data | excepción) en el orden recibido. Los frames compactados
+    en shards se leen con GETs por rango agrupados. Con `cache`
+    (CacheFrames) un grupo ya cacheado completo no hace GET y lo
+    descargado se guarda. `al_descargar(bytes)` se llama por cada GET
+    real a S3 (no por los aciertos de cache).
+    """
+    async def descargar_s3(shard, grupo):
+        if not shard:
+            obj = await s3.get_object(Bucket=bucket, Key=grupo[0]['key'])
+            datos = [await obj['Body'].read()]
+        else:
+            inicio = grupo[0]['offset']
+            fin = grupo[-1]['offset'] + grupo[-1]['size'] - 1
+            obj = await s3.get_object(Bucket=bucket, Key=shard, Range=f"bytes={inicio}-{fin}")
+            bloque = memoryview(await obj['Body'].read())
+            datos = [bytes(bloque[img['offset'] - inicio:img['offset'] - inicio + img['size']]) for img in grupo]
+        if al_descargar:
+            al_descargar(sum(len(data) for data in datos))
+        return datos
+
+    async def descargar(shard, grupo):
+        if cache is None:
+            return await descargar_s3(shard, grupo)
+        datos = await asyncio.to_thread(cache.obtener_varios, grupo)
+        if all(data is not None for data in datos):
+            return datos
+        # Acierto parcial: el GET por rango trae el grupo entero igual
+        datos = await descargar_s3(shard, grupo)
+        try:
+            await asyncio.to_thread(cache.guardar_varios, list(zip(grupo, datos)))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"  Cache de frames: no se pudo guardar ({e})")
+        return datos
+
+    pendientes = deque()
+    peticiones = iter(agrupar_peticiones(imagenes))
+
+    def lanzar_siguiente():
+        peticion = next(peticiones, None)
+        if peticion is not None:
+            pendientes.append((peticion[1], asyncio.ensure_future(descargar(*peticion))))
+
+    for _ in range(ventana):
+        lanzar_siguiente()
+
+    try:
+        while pendientes:
+            grupo, tarea = pendientes.popleft()
+            try:
+                datos = await tarea
+            except Exception as e:
+                datos = [e] * len(grupo)
+            lanzar_siguiente()
+            for img, data in zip(grupo, datos):
+                yield img['key'], data
+    finally:
+        for _, tarea in pendientes:
+            tarea.cancel()
+
+
+# =========================
+# Etapas
+# =========================
+
+class EtapaFallida(Exception):
+    """Error de la etapa completa (no de un frame): el pipeline aborta la planta"""
+
+
+class Etapa:
+    """Consumidor del pipeline. Una instancia por planta."""
+    nombre = "etapa"
+
+    async def iniciar(self, planta, contexto):
+        pass
+
+    async def consumir(self, planta, frame, contexto):
+        """
+        frame: {'key', 'data', 'ts'}. Lanzar excepción = frame no confirmado;
+        EtapaFallida = la etapa ya no puede seguir y se aborta la planta.
+        """
+        pass
+
+    async def finalizar(self, planta, contexto) -> bool:
+        """True si la etapa completó su trabajo y los frames pueden borrarse"""
+        return True
+
+    async def abortar(self, planta, contexto):
+        pass
+
+
+async def _vaciar(flujo):
+    while flujo is not None and await flujo.read(256 * 1024):
+        pass
+
+
+class EtapaTimelapse(Etapa):
+    """
+    Codifica el timelapse a medida que llegan los frames y lo sube en
+    streaming: JPEGs por stdin de ffmpeg -> MP4 fragmentado por stdout ->
+    subida multiparte. Descarga, codificación y subida se solapan.
+    Los perfiles de dos pasadas guardan los frames en disco y codifican
+    al final (la salida igual va por pipe a la subida).
+    """
+    nombre = "timelapse"
+
+    def __init__(self, bucket, min_frames=10, perfil=None):
+        self.bucket = bucket
+        self.min_frames = min_frames
+        self.perfil = perfil or perfil_desde_entorno()
+        self.tmpdir = None
+        self.resolucion_ref = None
+        self.frames_validos = 0
+        self.frames_vistos = 0
+        self.proceso = None
+        self.subida = None
+        self.lector = None
+        self.errores_ffmpeg = None
+
+    async def _lanzar_ffmpeg(self, comando, contexto, con_stdin):
+        self.subida = await SubidaMultiparte(
+            contexto["s3"], self.bucket, contexto["video_key"],
+            ContentType=_CONTENT_TYPES.get(self.perfil["ext"], "application/octet-stream")
+        ).iniciar()
+        self.proceso = await asyncio.create_subprocess_exec(
+            *comando,
+            stdin=asyncio.subprocess.PIPE if con_stdin else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        self.lector = asyncio.create_task(self.subida.consumir_stream(self.proceso.stdout))
+        self.errores_ffmpeg = asyncio.create_task(self.proceso.stderr.read())
+
+    async def iniciar(self, planta, contexto):
+        if requiere_archivos(self.perfil):
+            self.tmpdir = tempfile.mkdtemp(prefix="timelapse_")
+            return
+        [comando] = comandos_ffmpeg(self.perfil, PIPE_ENTRADA, PIPE_SALIDA)
+        await self._lanzar_ffmpeg(comando, contexto, con_stdin=True)
+
+    def _guardar_frame(self, data):
+        with open(f"{self.tmpdir}/{self.frames_validos:06d}.jpg", "wb") as f:
+            f.write(data)
+
+    async def consumir(self, planta, frame, contexto):
+        # Decimación: 1 de cada N frames entra al video (el resto se confirma igual)
+        self.frames_vistos += 1
+        if (self.frames_vistos - 1) % self.perfil["decimar"]:
+            return
+
+        resolucion = dimensiones_jpeg(frame["data"])
+        if resolucion is None:
+            raise ValueError("JPEG inválido")
+        if self.resolucion_ref is None:
+            self.resolucion_ref = resolucion
+        elif resolucion != self.resolucion_ref:
+            logger.warning(f"  [WARN] Resolución inconsistente: {frame['key']}")
+            return
+
+        if self.tmpdir:
+            await asyncio.to_thread(self._guardar_frame, frame["data"])
+        else:
+            await self._escribir_ffmpeg(frame["data"])
+        self.frames_validos += 1
+
+        if self.frames_validos % 100 == 0:
+            logger.info(f"  Procesados {self.frames_validos} frames...")
+
+    async def _escribir_ffmpeg(self, data):
+        """
+        Escribe en el stdin de ffmpeg. Si la subida falla, el lector deja de
+        leer stdout, ffmpeg deja de leer stdin y drain() esperaría para
+        siempre: se espera drain() o el fin del lector, lo que ocurra primero.
+        """
+        if not self.lector.done():
+            self.proceso.stdin.write(data)
+            drenado = asyncio.ensure_future(self.proceso.stdin.drain())
+            await asyncio.wait({drenado, self.lector}, return_when=asyncio.FIRST_COMPLETED)
+            if drenado.done():
+                drenado.result()
+                return
+            drenado.cancel()
+            await asyncio.gather(drenado, return_exceptions=True)
+
+        error = None if self.lector.cancelled() else self.lector.exception()
+        await self._detener_ffmpeg()
+        raise EtapaFallida(f"subida del timelapse interrumpida: {error or 'ffmpeg cerró su salida'}") from error
+
+    async def finalizar(self, planta, contexto):
+        try:
+            if self.frames_validos < self.min_frames:
+                logger.error(f"  [ERROR] Solo {self.frames_validos} frames válidos, abortando")
+                await self._descartar()
+                return False
+
+            logger.info(f"  Total frames válidos: {self.frames_validos}")
+
+            if self.tmpdir:
+                logger.info(f"  Generando video con ffmpeg (perfil {self.perfil['nombre']}, {self.perfil['codec']})...")
+                *previas, final = comandos_ffmpeg(
+                    self.perfil, f"{self.tmpdir}/*.jpg", PIPE_SALIDA, log_pasadas=f"{self.tmpdir}/pasada"
+                )
+                for comando in previas:
+                    result = await asyncio.to_thread(subprocess.run, comando, capture_output=True, text=True)
+                    if result.returncode != 0:
+                        logger.error(f"  [ERROR] ffmpeg falló: {result.stderr}")
+                        await self._descartar()
+                        return False
+                await self._lanzar_ffmpeg(final, contexto, con_stdin=False)
+            else:
+                self.proceso.stdin.close()
+                try:
+                    await self.proceso.stdin.wait_closed()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            # Primero el lector: si la subida falla, ffmpeg queda bloqueado escribiendo stdout
+            await self.lector
+            codigo = await self.proceso.wait()
+            errores = (await self.errores_ffmpeg).decode(errors="replace")
+            if codigo != 0:
+                logger.error(f"  [ERROR] ffmpeg falló: {errores}")
+                await self._descartar()
+                return False
+
+            total = await self.subida.completar()
+            logger.info(f"  Video subido: {total / 1024 / 1024:.1f}MB en {len(self.subida.partes)} partes"
+                        f" ({self.subida.reutilizadas} retomadas)")
+            contexto["num_frames"] = self.frames_validos
+            contexto["video_subido"] = True
+            return True
+        except Exception:
+            await self._descartar()
+            raise
+        finally:
+            self._limpiar_tmpdir()
+
+    async def _detener_ffmpeg(self):
+        for tarea in (self.lector, self.errores_ffmpeg):
+            if tarea and not tarea.done():
+                tarea.cancel()
+                await asyncio.gather(tarea, return_exceptions=True)
+        if self.proceso and self.proceso.returncode is None:
+            self.proceso.kill()
+        if self.proceso:
+            # wait() no retorna hasta que stdout/stderr lleguen a EOF: sin lectores, se vacían aquí
+            await asyncio.gather(_vaciar(self.proceso.stdout), _vaciar(self.proceso.stderr), self.proceso.wait())
+
+    async def _descartar(self):
+        """Fallo definitivo: aborta el upload en S3"""
+        await self._detener_ffmpeg()
+        if self.subida:
+            await self.subida.abortar()
+            self.subida = None
+
+    def _limpiar_tmpdir(self):
+        if self.tmpdir:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+            self.tmpdir = None
+
+    async def abortar(self, planta, contexto):
+        """Interrupción: se conserva el upload para retomarlo en la próxima ejecución"""
+        await self._detener_ffmpeg()
+        if self.subida:
+            await self.subida.abortar(conservar_estado=True)
+            self.subida = None
+        self._limpiar_tmpdir()
+
+
+class EtapaConteo(Etapa):
+    """Conteo vehicular sobre los mismos bytes descargados para el timelapse"""
+    nombre = "conteo"
+
+    def __init__(self, bucket, config_por_planta=None, horarios=None):
+        self.bucket = bucket
+        self.motor = MotorConteo(config_por_planta=config_por_planta)
+        self.horarios = horarios or {}
+
+    async def consumir(self, planta, frame, contexto):
+        await asyncio.to_thread(self.motor.agregar, planta, frame["ts"], frame["data"])
+
+    async def finalizar(self, planta, contexto):
+        data = await asyncio.to_thread(self.motor.exportar_npz, planta, self.horarios.get(planta))
+        conteo_key = f"analisis/{contexto['año']}/semana_{contexto['semana']:02d}/{planta}.npz"
+        await contexto["s3"].put_object(Bucket=self.bucket, Key=conteo_key, Body=data)
+        logger.info(f"  Conteo guardado: s3://{self.bucket}/{conteo_key}")
+        self.motor.descartar(planta)
+        return True
+
+
+# =========================
+# Pipeline
+# =========================
+
+class PipelineDomingo:
+    def __init__(self, bucket, ventana=None, cache=None):
+        self.bucket = bucket
+        self.ventana = ventana or int(os.getenv("PIPELINE_VENTANA", "8"))
+        self.cache = cache
+        self.fabricas = []
+        self.descargas = 0              # GETs reales a S3 (los aciertos de cache no cuentan)
+        self.bytes_descargados = 0
+
+    def registrar(self, fabrica):
+        """Registra una etapa (callable sin argumentos que retorna una Etapa)"""
+        self.fabricas.append(fabrica)
+        return self
+
+    async def procesar(self, s3, planta, imagenes, contexto):
+        """
+        Descarga cada frame una vez y lo entrega a todas las etapas.
+        Retorna las keys confirmadas por todas las etapas (vacío si alguna falló).
+        """
+        etapas = [fabrica() for fabrica in self.fabricas]
+        contexto["s3"] = s3
+        confirmadas = []
+        ts_por_key = {img["key"]: ts_frame(img) for img in imagenes}
+        iniciadas = []
+
+        def contar(bytes_):
+            self.descargas += 1
+            self.bytes_descargados += bytes_
+
+        try:
+            for etapa in etapas:
+                # Una etapa que falla al iniciar puede dejar recursos a medias: también se aborta
+                iniciadas.append(etapa)
+                await etapa.iniciar(planta, contexto)
+
+            descargas = descargar_en_orden(s3, self.bucket, imagenes, self.ventana, self.cache, al_descargar=contar)
+            async for key, data in descargas:
+                if isinstance(data, Exception):
+                    logger.error(f"  [ERROR] Descargando {key}: {data}")
+                    continue
+
+                frame = {"key": key, "data": data, "ts": ts_por_key.get(key)}
+
+                acks = 0
+                for etapa in etapas:
+                    try:
+                        await etapa.consumir(planta, frame, contexto)
+                        acks += 1
+                    except EtapaFallida:
+                        raise
+                    except Exception as e:
+                        logger.error(f"  [ERROR] Etapa {etapa.nombre} procesando {key}: {e}")
+
+                if acks == len(etapas):
+                    confirmadas.append(key)
+
+            resultados = []
+            for etapa in etapas:
+                try:
+                    resultados.append(await etapa.finalizar(planta, contexto))
+                except Exception as e:
+                    logger.error(f"  [ERROR] Etapa {etapa.nombre} al finalizar {planta}: {e}")
+                    resultados.append(False)
+        except BaseException:
+            for etapa in iniciadas:
+                try:
+                    await etapa.abortar(planta, contexto)
+                except Exception as e:
+                    logger.error(f"  [ERROR] Etapa {etapa.nombre} al abortar {planta}: {e}")
+            raise
+        finally:
+            contexto.pop("s3", None)
+
+        if not all(resultados):
+            fallidas = [e.nombre for e, ok in zip(etapas, resultados) if not ok]
+            logger.warning(f"  {planta}: etapas sin completar {fallidas}, no se borran frames")
+            return []
+
+        return confirmadas
@@ -0,0 +1,91 @@
+import io
+import logging
+import shutil
+import subprocess
+
+"""
+RECOMPRESIÓN SIN PÉRDIDA (ESTILO JPEGTRAN)
+==========================================
+
+Alternativa a decodificar y recodificar con Pillow cada captura:
+
+- `jpegtran -copy none -optimize -progressive` trabaja sobre los
+  coeficientes DCT: tablas Huffman óptimas, escaneo progresivo y sin
+  metadatos, sin tocar un píxel (sin pérdida de generación).
+- Sin jpegtran en el PATH, se quitan los metadatos (APP1..APP15, COM)
+  recorriendo los marcadores; el resto del archivo se copia tal cual.
+
+Se elige por planta (RECOMPRESION_MOTOR / RECOMPRESION_POR_PLANTA). La
+calidad la fija la cámara: el control por presupuesto no aplica a las
+plantas sin pérdida. Comparar con el camino Pillow:
+
+    python -m imageRecopilator.Cloud.benchmarks recompresion --frames 200
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+MOTORES = ("pillow", "jpegtran")
+
+COMANDO_JPEGTRAN = ["jpegtran", "-copy", "none", "-optimize", "-progressive"]
+
+# Marcadores sin longitud (SOI, EOI, RSTn, TEM)
+_SIN_LONGITUD = {0xD8, 0xD9, 0x01} | set(range(0xD0, 0xD8))
+
+_jpegtran = None
+
+
+def jpegtran_disponible():
+    global _jpegtran
+    if _jpegtran is None:
+        _jpegtran = shutil.which("jpegtran") is not None
+    return _jpegtran
+
+
+def quitar_metadatos(data, destino=None):
+    """
+    Copia el JPEG sin segmentos APP1..APP15 ni COM (EXIF, XMP, ICC,
+    comentarios). Desde SOS en adelante se copia sin parsear.
+    """
+    vista = memoryview(data)
+    if len(vista) < 4 or vista[0] != 0xFF or vista[1] != 0xD8:
+        raise ValueError("No es un JPEG")
+
+    salida = destino if destino is not None else io.BytesIO()
+    salida.write(vista[:2])
+    i = 2
+    while i + 4 <= len(vista):
+        if vista[i] != 0xFF:
+            raise ValueError(f"Marcador inválido en offset {i}")
+        marcador = vista[i + 1]
+        if marcador == 0xFF:                     # relleno entre marcadores
+            i += 1
+            continue
+        if marcador in _SIN_LONGITUD:
+            salida.write(vista[i:i + 2])
+            i += 2
+            continue
+        largo = (vista[i + 2] << 8) | vista[i + 3]
+        fin = i + 2 + largo
+        if 0xE1 <= marcador <= 0xEF or marcador == 0xFE:
+            i = fin
+            continue
+        if marcador == 0xDA:                     # SOS: datos de imagen hasta el final
+            salida.write(vista[i:])
+            break
+        salida.write(vista[i:fin])
+        i = fin
+
+    return destino.vista() if destino is not None else salida.getvalue()
+
+
+def optimizar_sin_perdida(data, destino=None):
+    """jpegtran si está disponible; si no (o si falla), solo quita metadatos"""
+    if jpegtran_disponible():
+        proceso = subprocess.run(COMANDO_JPEGTRAN, input=bytes(data), capture_output=True)
+        if proceso.returncode == 0 and proceso.stdout:
+            if destino is None:
+                return proceso.stdout
+            destino.write(proceso.stdout)
+            return destino.vista()
+        logger.warning(f"jpegtran falló ({proceso.stderr.decode(errors='replace').strip()}), solo se quitan metadatos")
+    return quitar_metadatos(data, destino)
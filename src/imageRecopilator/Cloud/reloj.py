@@ -0,0 +1,129 @@
+import asyncio
+import selectors
+import time
+from datetime import datetime, timedelta
+
+"""
+RELOJ INYECTABLE Y TIEMPO VIRTUAL
+=================================
+
+La captura pregunta la hora a un reloj del módulo (`ImageRecompilerCloud.reloj`)
+en vez de llamar `datetime.now()` / `time.time()` directo:
+
+- `RelojSistema`: la hora real (default en producción).
+- `RelojVirtual`: hora simulada que solo avanza cuando se le pide.
+
+`BucleVirtual` es un event loop de asyncio cuyo `time()` es el reloj
+virtual: `asyncio.sleep`, `wait_for` y los timers vencen en tiempo
+simulado. Cuando no queda nada listo, en vez de bloquear en el selector
+salta directo al próximo timer, así una semana de capturas con sleeps
+de 60s corre en segundos. Mientras hay trabajo en hilos (`to_thread`,
+recompresión en el executor) espera de verdad a que termine, para que
+el resultado no dependa de cuánto tarda el hilo.
+
+Uso (ver simulacion.py):
+    reloj = RelojVirtual(datetime(2026, 1, 5))
+    with asyncio.Runner(loop_factory=lambda: BucleVirtual(reloj)) as runner:
+        runner.run(corrutina())
+"""
+
+# Espera real máxima sin timers ni hilos pendientes antes de dar la simulación por trabada
+ESPERA_REAL_MAX = 30
+
+
+class RelojSistema:
+    def ahora(self) -> datetime:
+        return datetime.now()
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+class RelojVirtual:
+    def __init__(self, inicio: datetime):
+        self.inicio = inicio
+        self._base = inicio.timestamp()
+        self.transcurrido = 0.0
+
+    def ahora(self) -> datetime:
+        return self.inicio + timedelta(seconds=self.transcurrido)
+
+    def time(self) -> float:
+        return self._base + self.transcurrido
+
+    def monotonic(self) -> float:
+        return self.transcurrido
+
+    def avanzar(self, segundos):
+        if segundos > 0:
+            self.transcurrido += segundos
+
+
+class SelectorVirtual(selectors.BaseSelector):
+    """Delega en el selector real; cuando no hay IO lista avanza el reloj en vez de esperar"""
+
+    def __init__(self, reloj, pendientes):
+        self.reloj = reloj
+        self.pendientes = pendientes        # callable: trabajos en hilos aún sin terminar
+        self._real = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._real.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._real.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._real.modify(fileobj, events, data)
+
+    def get_key(self, fileobj):
+        return self._real.get_key(fileobj)
+
+    def get_map(self):
+        return self._real.get_map()
+
+    def close(self):
+        self._real.close()
+
+    def select(self, timeout=None):
+        eventos = self._real.select(0)
+        if eventos:
+            return eventos
+        if self.pendientes():
+            # Un hilo despierta al loop por el self-pipe al terminar
+            return self._real.select(timeout)
+        if timeout is None:
+            eventos = self._real.select(ESPERA_REAL_MAX)
+            if not eventos and not self.pendientes():
+                raise RuntimeError("Simulación trabada: sin timers, IO ni hilos pendientes")
+            return eventos
+        self.reloj.avanzar(timeout)
+        return []
+
+
+class BucleVirtual(asyncio.SelectorEventLoop):
+    def __init__(self, reloj):
+        self.reloj = reloj
+        self.en_hilos = 0
+        super().__init__(SelectorVirtual(reloj, lambda: self.en_hilos))
+
+    def time(self):
+        return self.reloj.monotonic()
+
+    def run_in_executor(self, executor, func, *args):
+        futuro = super().run_in_executor(executor, func, *args)
+        self.en_hilos += 1
+        futuro.add_done_callback(self._hilo_terminado)
+        return futuro
+
+    def _hilo_terminado(self, futuro):
+        self.en_hilos -= 1
+
+
+def correr_virtual(corrutina, reloj):
+    """Ejecuta `corrutina` en un BucleVirtual sobre `reloj` y retorna su resultado"""
+    with asyncio.Runner(loop_factory=lambda: BucleVirtual(reloj)) as runner:
+        return runner.run(corrutina)
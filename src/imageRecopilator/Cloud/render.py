@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from botocore.exceptions import ClientError
+
+from imageRecopilator.Cloud.cache_frames import cache_compartido
+from imageRecopilator.Cloud.clientes_s3 import gestor_s3
+from imageRecopilator.Cloud.codificador import PERFILES, perfil_desde_entorno
+from imageRecopilator.Cloud.listado import ListadorSemana, deduplicar
+from imageRecopilator.Cloud.metadatos import filtrar_y_ordenar, ts_frame
+from imageRecopilator.Cloud.pipeline_domingo import EtapaTimelapse, PipelineDomingo
+
+"""
+TIMELAPSE POR RANGO
+===================
+
+`render(plantas, inicio, fin, fps, resolucion)` genera el video de
+cualquier rango de fechas, no solo "la semana pasada":
+
+1. Lista los días del rango en paralelo (mismo listador del domingo) y
+   filtra por timestamp de captura (metadata del índice o nombre).
+2. input_hash = md5(keys + parámetros de codificación), como el manifest
+   dominical. El video queda en `renders/<planta>/<hash>.<ext>` con su
+   `.manifest` al lado: si ya existe se entrega sin descargar ni codificar.
+3. Si no, usa el pipeline dominical (descarga ordenada + codificación y
+   subida en streaming). Los frames NO se borran.
+
+    python -m imageRecopilator.Cloud.render Temuco Osorno \\
+        --desde 2024-01-01 --hasta "2024-01-03 18:00" --fps 24 --resolucion 1280x720
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+# Parámetros que cambian el video (entran al hash)
+_PARAMETROS_HASH = ("codec", "preset", "crf", "bitrate", "tune", "fps", "escala", "decimar", "ext")
+
+
+# =========================
+# Parámetros
+# =========================
+
+def parsear_resolucion(texto):
+    """'1280x720' -> '1280:720'; '1280' -> '1280:-2' (alto proporcional, par)"""
+    if not texto:
+        return None
+    ancho, _, alto = texto.lower().partition("x")
+    if not ancho.isdigit() or (alto and not alto.isdigit()):
+        raise ValueError(f"Resolución inválida: {texto} (formato ANCHOxALTO o ANCHO)")
+    return f"{ancho}:{alto or -2}"
+
+
+def perfil_render(fps=None, resolucion=None, perfil=None):
+    efectivo = perfil_desde_entorno(perfil)
+    if fps:
+        efectivo["fps"] = int(fps)
+    if resolucion:
+        efectivo["escala"] = parsear_resolucion(resolucion)
+    return efectivo
+
+
+def hash_entrada(imagenes, perfil):
+    parametros = {k: perfil.get(k) for k in _PARAMETROS_HASH}
+    contenido = '|'.join(img['key'] for img in imagenes) + json.dumps(parametros, sort_keys=True)
+    return hashlib.md5(contenido.encode()).hexdigest()
+
+
+def claves_render(planta, input_hash, ext):
+    base = f"renders/{planta}/{input_hash}"
+    return f"{base}.{ext}", f"{base}.manifest"
+
+
+def dias_del_rango(inicio, fin):
+    dia = datetime(inicio.year, inicio.month, inicio.day)
+    dias = []
+    while dia <= fin:
+        dias.append(dia)
+        dia += timedelta(days=1)
+    return dias
+
+
+# =========================
+# Listado
+# =========================
+
+async def frames_en_rango(s3, bucket, prefijo, plantas, inicio, fin):
+    """Genera (planta, imagenes ordenadas) a medida que cada planta termina de listarse"""
+    desde, hasta = inicio.timestamp(), fin.timestamp()
+    pedidas = set(plantas)
+    listador = ListadorSemana(s3, bucket, prefijo, dias_del_rango(inicio, fin), solo=pedidas)
+
+    async for planta, dias in listador.plantas():
+        pedidas.discard(planta)
+        imagenes, _ = deduplicar(dias)
+        en_rango = [img for img in imagenes if (ts := ts_frame(img)) and desde <= ts <= hasta]
+        validas, descartadas = filtrar_y_ordenar(en_rango)
+        if descartadas:
+            logger.warning(f"  {planta}: {len(descartadas)} frames con resolución inconsistente")
+        yield planta, validas
+
+    for planta in sorted(pedidas):
+        yield planta, []
+
+
+# =========================
+# Render
+# =========================
+
+async def cargar_manifest(s3, bucket, key):
+    try:
+        obj = await s3.get_object(Bucket=bucket, Key=key)
+        return json.loads(await obj['Body'].read())
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+
+
+async def render_planta(s3, bucket, planta, imagenes, perfil, inicio, fin, min_frames=10, cache=None,
+                        reloj=datetime.now):
+    resultado = {"planta": planta, "num_frames": len(imagenes), "video_key": None, "cache": False}
+    if not imagenes:
+        logger.warning(f"[RENDER] {planta} - sin frames en el rango")
+        return resultado
+
+    input_hash = hash_entrada(imagenes, perfil)
+    video_key, manifest_key = claves_render(planta, input_hash, perfil["ext"])
+
+    manifest = await cargar_manifest(s3, bucket, manifest_key)
+    if manifest and manifest.get("input_hash") == input_hash:
+        logger.info(f"[CACHE] {planta} - {manifest['video_key']}")
+        return dict(resultado, video_key=manifest["video_key"], cache=True)
+
+    logger.info(f"[RENDER] {planta} - {len(imagenes)} frames ({perfil['nombre']}, {perfil['fps']} fps)")
+    pipeline = PipelineDomingo(bucket, cache=cache).registrar(
+        lambda: EtapaTimelapse(bucket, min_frames=min_frames, perfil=perfil)
+    )
+    contexto = {"video_key": video_key}
+    await pipeline.procesar(s3, planta, imagenes, contexto)
+    if not contexto.get("video_subido"):
+        return resultado
+
+    await s3.put_object(Bucket=bucket, Key=manifest_key, Body=json.dumps({
+        "input_hash": input_hash,
+        "num_frames": contexto["num_frames"],
+        "video_key": video_key,
+        "desde": inicio.isoformat(),
+        "hasta": fin.isoformat(),
+        "perfil": {k: perfil.get(k) for k in _PARAMETROS_HASH},
+        "timestamp": reloj().isoformat(),
+    }, indent=2))
+    logger.info(f"  → {planta}: s3://{bucket}/{video_key}")
+    return dict(resultado, video_key=video_key)
+
+
+async def render(plantas, inicio, fin, fps=None, resolucion=None, perfil=None,
+                 bucket=None, prefijo=None, s3=None, concurrencia=2, cache_frames=None,
+                 reloj=datetime.now):
+    """
+    Timelapse de cada planta entre `inicio` y `fin` (datetimes, inclusive).
+    Retorna [{planta, video_key, num_frames, cache}] en el orden de `plantas`.
+    Con `cache_frames` (CacheFrames) los frames se leen del disco local si
+    ya se descargaron antes. `reloj` fecha el manifest.
+    """
+    if isinstance(plantas, str):
+        plantas = [plantas]
+    if fin < inicio:
+        raise ValueError("El fin del rango es anterior al inicio")
+    bucket = bucket or os.getenv("S3_BUCKET", "flujo-prt-imagenes")
+    prefijo = prefijo or os.getenv("S3_PREFIX", "capturas")
+    perfil = perfil if isinstance(perfil, dict) else perfil_render(fps, resolucion, perfil)
+
+    cupos = asyncio.Semaphore(concurrencia)
+    tareas = {}
+
+    async def procesar(cliente, planta, imagenes):
+        async with cupos:
+            return await render_planta(cliente, bucket, planta, imagenes, perfil, inicio, fin,
+                                       cache=cache_frames, reloj=reloj)
+
+    async with (gestor_s3().s3() if s3 is None else nullcontext(s3)) as cliente:
+        async for planta, imagenes in frames_en_rango(cliente, bucket, prefijo, plantas, inicio, fin):
+            tareas[planta] = asyncio.create_task(procesar(cliente, planta, imagenes))
+        await asyncio.gather(*tareas.values())
+
+    return [tareas[p].result() for p in plantas if p in tareas]
+
+
+# =========================
+# CLI
+# =========================
+
+def _fecha(texto, fin=False):
+    """'2024-01-03' o '2024-01-03 18:00'. Una fecha sola como fin incluye todo el día."""
+    valor = datetime.fromisoformat(texto)
+    if fin and len(texto) == 10:
+        valor += timedelta(days=1, seconds=-1)
+    return valor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Timelapse de un rango de fechas")
+    parser.add_argument("plantas", nargs="+")
+    parser.add_argument("--desde", required=True, help="YYYY-MM-DD[ HH:MM]")
+    parser.add_argument("--hasta", required=True, help="YYYY-MM-DD[ HH:MM] (una fecha sola incluye el día)")
+    parser.add_argument("--fps", type=int)
+    parser.add_argument("--resolucion", help="ANCHOxALTO o ANCHO")
+    parser.add_argument("--perfil", choices=sorted(PERFILES))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    cache = cache_compartido()
+
+    async def ejecutar():
+        try:
+            return await render(args.plantas, _fecha(args.desde), _fecha(args.hasta, fin=True),
+                                fps=args.fps, resolucion=args.resolucion, perfil=args.perfil, cache_frames=cache)
+        finally:
+            await gestor_s3().cerrar()
+            if cache:
+                logger.info(f"Cache de frames: {cache.resumen()}")
+
+    resultado = asyncio.run(ejecutar())
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
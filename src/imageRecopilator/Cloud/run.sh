@@ -1,8 +1,9 @@
 #!/bin/bash
 
-# Script para ejecutar ImageRecompilerCloud en background
+# Script para ejecutar la captura en background (requiere `pip install -e .`)
+# Los domingos encola la semana; la procesa un worker aparte con nice/ionice
 
-SCRIPT_PATH="/home/ubuntu/FlujoPRT/src/imageRecopilator/Cloud/ImageRecompilerCloud.py"
+COMANDO="flujoprt capture --con-domingo"
 LOG_FILE="/home/ubuntu/captura.log"
 PID_FILE="/home/ubuntu/captura.pid"
 
@@ -14,7 +15,7 @@ case "$1" in
         fi
         
         echo "Iniciando captura en background..."
-        nohup python3 "$SCRIPT_PATH" > "$LOG_FILE" 2>&1 &
+        nohup $COMANDO > "$LOG_FILE" 2>&1 &
         echo $! > "$PID_FILE"
         echo "Proceso iniciado (PID: $(cat $PID_FILE))"
         echo "Ver logs: tail -f $LOG_FILE"
@@ -0,0 +1,167 @@
+import logging
+import time
+
+"""
+SALUD DE CÁMARAS
+================
+
+Circuit breaker por cámara + intervalo de sondeo adaptativo.
+
+Estados:
+- cerrado:     cámara sana, se captura normalmente.
+- abierto:     demasiados ciclos fallidos; no se intenta hasta que vence
+               el backoff (exponencial, con tope).
+- semiabierto: vencido el backoff se hace UN sondeo corto. Éxito -> cerrado,
+               fallo -> abierto con el doble de backoff.
+
+Intervalo: se alarga en cámaras cuyo contenido cambia poco y vuelve al
+mínimo en las horas con actividad observada. Una cámara con la imagen
+congelada (frescura.py) se sondea cada `intervalo_congelada` hasta que
+el contenido vuelve a cambiar.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+CONFIG_SALUD_DEFAULT = {
+    "intentos": 3,               # intentos por ciclo en estado cerrado
+    "espera_reintento": 1.5,     # segundos entre intentos (fuera del semáforo)
+    "timeout_sondeo": 5,         # timeout del sondeo en semiabierto
+    "fallos_para_abrir": 3,      # ciclos fallidos consecutivos para abrir el circuito
+    "backoff_inicial": 120,
+    "backoff_max": 1800,
+    "factor_backoff": 2,
+    "intervalo_min": 60,
+    "intervalo_max": 300,
+    "alpha": 0.1,                # suavizado de tasa de cambio y actividad
+    "umbral_actividad": 0.02,    # actividad horaria sobre la que se usa el intervalo mínimo
+    "intervalo_congelada": 600,  # sondeo mientras la imagen está congelada
+}
+
+
+class SaludCamara:
+    def __init__(self, planta, config=None, reloj=time.monotonic):
+        self.planta = planta
+        self.config = dict(CONFIG_SALUD_DEFAULT)
+        if config:
+            self.config.update(config)
+        self.reloj = reloj
+
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.backoff = self.config["backoff_inicial"]
+        self.abierto_hasta = 0.0
+
+        self.tasa_cambio = 1.0              # fracción de capturas con contenido nuevo
+        self.actividad_por_hora = {}        # hora -> actividad promedio observada
+        self.exitos = 0
+        self.fallos = 0
+        self.ultimo_exito = None
+        self.congelada = False
+
+    # --- Circuit breaker ---
+
+    def permite_intento(self) -> bool:
+        if self.estado == ABIERTO:
+            if self.reloj() < self.abierto_hasta:
+                return False
+            self.estado = SEMIABIERTO
+            logger.info(f"{self.planta} - Circuito semiabierto, sondeando")
+        return True
+
+    def intentos_permitidos(self) -> int:
+        return 1 if self.estado == SEMIABIERTO else self.config["intentos"]
+
+    def timeout(self):
+        """Timeout por petición: sondeos cortos en semiabierto, default de la sesión si no"""
+        return self.config["timeout_sondeo"] if self.estado == SEMIABIERTO else None
+
+    def segundos_hasta_sondeo(self) -> float:
+        return max(0.0, self.abierto_hasta - self.reloj())
+
+    def registrar_exito(self, cambio=True, actividad=None, hora=None):
+        if self.estado != CERRADO:
+            logger.info(f"{self.planta} - Circuito cerrado, cámara recuperada")
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.backoff = self.config["backoff_inicial"]
+        self.exitos += 1
+        self.ultimo_exito = self.reloj()
+
+        alpha = self.config["alpha"]
+        self.tasa_cambio = (1 - alpha) * self.tasa_cambio + alpha * (1.0 if cambio else 0.0)
+        if actividad is not None and hora is not None:
+            previa = self.actividad_por_hora.get(hora, actividad)
+            self.actividad_por_hora[hora] = (1 - alpha) * previa + alpha * actividad
+
+    def marcar_congelada(self, congelada):
+        """El detector de frescura informa si la imagen dejó de cambiar"""
+        self.congelada = congelada
+
+    def registrar_fallo(self):
+        self.fallos += 1
+        self.fallos_consecutivos += 1
+
+        if self.estado == SEMIABIERTO:
+            self.backoff = min(self.backoff * self.config["factor_backoff"], self.config["backoff_max"])
+            self._abrir()
+        elif self.fallos_consecutivos >= self.config["fallos_para_abrir"]:
+            self._abrir()
+
+    def _abrir(self):
+        self.estado = ABIERTO
+        self.abierto_hasta = self.reloj() + self.backoff
+        logger.warning(f"{self.planta} - Circuito abierto por {self.backoff:.0f}s "
+                       f"({self.fallos_consecutivos} fallos consecutivos)")
+
+    # --- Sondeo adaptativo ---
+
+    def intervalo(self, hora=None) -> float:
+        """Segundos hasta la próxima captura según tasa de cambio y actividad horaria"""
+        minimo = self.config["intervalo_min"]
+        maximo = self.config["intervalo_max"]
+
+        if self.congelada:
+            return max(self.config["intervalo_congelada"], minimo)
+
+        actividad = self.actividad_por_hora.get(hora)
+        if actividad is not None and actividad >= self.config["umbral_actividad"]:
+            return minimo
+
+        # Contenido que casi no cambia -> se acerca al máximo
+        return minimo + (maximo - minimo) * (1.0 - self.tasa_cambio)
+
+    def resumen(self):
+        return {
+            "estado": self.estado,
+            "fallos_consecutivos": self.fallos_consecutivos,
+            "sondeo_en": round(self.segundos_hasta_sondeo()) if self.estado == ABIERTO else 0,
+            "tasa_cambio": round(self.tasa_cambio, 3),
+            "congelada": self.congelada,
+            "exitos": self.exitos,
+            "fallos": self.fallos,
+        }
+
+
+class RegistroSalud:
+    def __init__(self, config_por_planta=None, config_default=None, reloj=time.monotonic):
+        self.config_por_planta = config_por_planta or {}
+        self.config_default = config_default or {}
+        self.reloj = reloj
+        self.camaras = {}
+
+    def de(self, planta) -> SaludCamara:
+        if planta not in self.camaras:
+            config = dict(self.config_default)
+            config.update(self.config_por_planta.get(planta, {}))
+            self.camaras[planta] = SaludCamara(planta, config, self.reloj)
+        return self.camaras[planta]
+
+    def resumen(self):
+        return {planta: salud.resumen() for planta, salud in self.camaras.items()}
+
+    def no_sanas(self):
+        return {planta: salud for planta, salud in self.camaras.items() if salud.estado != CERRADO}
@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from imageRecopilator.Cloud.benchmarks import jpeg_sintetico
+from imageRecopilator.Cloud.reloj import RelojVirtual, correr_virtual
+
+"""
+SIMULACIÓN DEL CICLO SEMANAL
+============================
+
+Corre la captura completa (main() sin cambios: horarios, salud, carga,
+uploaders, bitácora, índices, compactación y el encolado del domingo)
+en tiempo virtual contra cámaras y S3 locales. Una semana simulada
+tarda segundos, así una regresión de rendimiento del ciclo semanal se
+mide en cada corrida, sin esperar al domingo.
+
+- Reloj: `RelojVirtual` + `BucleVirtual` (reloj.py). El tiempo solo
+  avanza cuando nada está listo; el trabajo en hilos (recompresión,
+  SQLite) se espera de verdad.
+- Cámaras: `CamarasSimuladas` reemplaza la sesión aiohttp; cada GET
+  devuelve un JPEG sintético distinto tras `latencia` segundos virtuales
+  (las plantas en `congeladas` repiten siempre el mismo).
+- S3: `S3Memoria`, el subconjunto de la API que usan captura,
+  compactación y domingo.
+- El worker de trabajos no se lanza: el reporte muestra qué quedó en
+  la cola (la semana anterior, encolada el domingo).
+
+    flujoprt simular --dias 7 --plantas Temuco Osorno
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+LUNES_REFERENCIA = datetime(2026, 1, 5)   # inicio por defecto (lunes 00:00), fijo para comparar corridas
+
+
+# =========================
+# Cámaras locales
+# =========================
+
+class _Respuesta:
+    def __init__(self, cuerpo, latencia):
+        self.status = 200
+        self.content = self
+        self._cuerpo = cuerpo
+        self._latencia = latencia
+
+    async def iter_any(self):
+        yield self._cuerpo
+
+    async def __aenter__(self):
+        if self._latencia:
+            await asyncio.sleep(self._latencia)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class CamarasSimuladas:
+    """Reemplazo de aiohttp.ClientSession: GET {BASE_URL}/{cam_id}/imagen.jpg -> JPEG sintético"""
+
+    def __init__(self, ancho=96, alto=54, variantes=16, latencia=0.2, congeladas=()):
+        self.frames = [jpeg_sintetico(ancho, alto, calidad=90, semilla=i) for i in range(variantes)]
+        self.latencia = latencia
+        self.congeladas = set(congeladas)     # cam_id que siempre devuelven el mismo frame
+        self.peticiones = defaultdict(int)
+
+    def get(self, url, **kwargs):
+        cam_id = url.rsplit("/", 2)[-2]
+        n = self.peticiones[cam_id]
+        self.peticiones[cam_id] += 1
+        frame = self.frames[0 if cam_id in self.congeladas else n % len(self.frames)]
+        return _Respuesta(frame, self.latencia)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+# =========================
+# S3 y STS locales
+# =========================
+
+def _bytes(body):
+    if hasattr(body, "read"):
+        body = body.read()
+    if isinstance(body, str):
+        body = body.encode()
+    return bytes(body)
+
+
+def _no_existe(operacion):
+    from botocore.exceptions import ClientError
+    return ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, operacion)
+
+
+class _Cuerpo:
+    def __init__(self, data):
+        self._data = data
+
+    async def read(self):
+        return self._data
+
+
+class _Paginador:
+    def __init__(self, s3, pagina=1000):
+        self.s3 = s3
+        self.pagina = pagina
+
+    async def paginate(self, Bucket, Prefix="", Delimiter=None, **kwargs):
+        keys = sorted(k for k in self.s3.objetos if k.startswith(Prefix))
+        prefijos = []
+        if Delimiter:
+            directas = []
+            for key in keys:
+                resto = key[len(Prefix):]
+                if Delimiter in resto:
+                    prefijo = Prefix + resto.split(Delimiter, 1)[0] + Delimiter
+                    if not prefijos or prefijos[-1] != prefijo:
+                        prefijos.append(prefijo)
+                else:
+                    directas.append(key)
+            keys = directas
+
+        self.s3.operaciones["list_objects_v2"] += 1
+        for i in range(0, max(len(keys), 1), self.pagina):
+            pagina = {"Contents": [self.s3._resumen(k) for k in keys[i:i + self.pagina]]}
+            if i == 0 and prefijos:
+                pagina["CommonPrefixes"] = [{"Prefix": p} for p in prefijos]
+            yield pagina
+
+
+class S3Memoria:
+    """S3 en memoria: put/get (con Range)/head/delete, upload_fileobj y listados"""
+
+    def __init__(self):
+        self.objetos = {}                     # key -> (bytes, metadata, etag)
+        self.operaciones = defaultdict(int)
+
+    def _resumen(self, key):
+        data, _, etag = self.objetos[key]
+        return {"Key": key, "Size": len(data), "ETag": etag}
+
+    async def put_object(self, Bucket, Key, Body, Metadata=None, **kwargs):
+        self.operaciones["put_object"] += 1
+        data = _bytes(Body)
+        etag = f'"{hashlib.md5(data, usedforsecurity=False).hexdigest()}"'
+        self.objetos[Key] = (data, dict(Metadata or {}), etag)
+        return {"ETag": etag}
+
+    async def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, **kwargs):
+        await self.put_object(Bucket, Key, Fileobj, **(ExtraArgs or {}))
+
+    async def get_object(self, Bucket, Key, Range=None, **kwargs):
+        self.operaciones["get_object"] += 1
+        if Key not in self.objetos:
+            raise _no_existe("GetObject")
+        data, metadata, etag = self.objetos[Key]
+        if Range:
+            inicio, fin = Range.removeprefix("bytes=").split("-")
+            data = data[int(inicio):int(fin) + 1]
+        return {"Body": _Cuerpo(data), "ContentLength": len(data), "Metadata": metadata, "ETag": etag}
+
+    async def head_object(self, Bucket, Key, **kwargs):
+        self.operaciones["head_object"] += 1
+        if Key not in self.objetos:
+            raise _no_existe("HeadObject")
+        data, metadata, etag = self.objetos[Key]
+        return {"ContentLength": len(data), "Metadata": metadata, "ETag": etag}
+
+    async def delete_objects(self, Bucket, Delete, **kwargs):
+        self.operaciones["delete_objects"] += 1
+        borradas = []
+        for obj in Delete["Objects"]:
+            if self.objetos.pop(obj["Key"], None) is not None:
+                borradas.append({"Key": obj["Key"]})
+        return {"Deleted": borradas, "Errors": []}
+
+    async def put_object_tagging(self, **kwargs):
+        self.operaciones["put_object_tagging"] += 1
+        return {}
+
+    def get_paginator(self, nombre):
+        return _Paginador(self)
+
+    def resumen(self):
+        return {
+            "objetos": len(self.objetos),
+            "mb": round(sum(len(data) for data, _, _ in self.objetos.values()) / 1024 / 1024, 2),
+            "operaciones": dict(self.operaciones),
+        }
+
+
+class STSLocal:
+    async def get_caller_identity(self):
+        return {"Account": "000000000000", "Arn": "arn:aws:iam::000000000000:user/simulacion"}
+
+
+# =========================
+# Estado del proceso de captura
+# =========================
+
+# Globales que inicializar() crea: se vacían para que la simulación arme los suyos
+ESTADO_PROCESO = (
+    "ssl_context", "SEM_DESCARGAS", "cola_subida", "pool_entrada", "pool_salida", "executor",
+    "metricas", "registro_salud", "detector_actividad", "detector_frescura", "politica_carga",
+    "controlador_calidad", "indice_diario", "servicio_borrado", "cola_trabajos", "coordinador", "bitacora",
+)
+
+CONFIGURACION = (
+    "registro", "camaras", "HORARIOS", "DENOMINADORES", "RUNNING", "PROCESAMIENTO_DOMINGO",
+    "TRABAJOS_EJECUTOR", "TRABAJOS_DB", "BITACORA_DIR", "COMPACTACION_HABILITADA", "PARTICION_ID",
+)
+
+
+def registro_local(ruta_original, plantas, directorio):
+    """Copia de camaras.json reducida a `plantas` (todas si None)"""
+    from imageRecopilator.registro import RegistroCamaras
+
+    with open(ruta_original, encoding="utf-8") as f:
+        config = json.load(f)
+    if plantas:
+        faltantes = set(plantas) - set(config["plantas"])
+        if faltantes:
+            raise ValueError(f"Plantas desconocidas: {sorted(faltantes)}")
+        config["plantas"] = {p: datos for p, datos in config["plantas"].items() if p in plantas}
+
+    ruta = os.path.join(directorio, "camaras.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    return RegistroCamaras(ruta)
+
+
+@contextmanager
+def estado_simulado(cloud, reloj, registro, directorio, compactar=True):
+    """Reloj, registro y rutas de la simulación; al salir deja el módulo como estaba"""
+    previo = {nombre: getattr(cloud, nombre) for nombre in ESTADO_PROCESO + CONFIGURACION}
+    arranque = dict(cloud.arranque)
+    reloj_previo = cloud.configurar_reloj(reloj)
+    try:
+        for nombre in ESTADO_PROCESO:
+            setattr(cloud, nombre, None)
+        cloud.registro = registro
+        cloud.camaras = registro.camaras
+        cloud.HORARIOS = registro.horarios
+        cloud.DENOMINADORES = registro.denominadores
+        cloud.RUNNING = True
+        cloud.PROCESAMIENTO_DOMINGO = True
+        cloud.TRABAJOS_EJECUTOR = False           # el worker es otro proceso: no se simula
+        cloud.TRABAJOS_DB = os.path.join(directorio, "trabajos.db")
+        cloud.BITACORA_DIR = os.path.join(directorio, "bitacora")
+        cloud.COMPACTACION_HABILITADA = compactar
+        cloud.PARTICION_ID = None
+        cloud.arranque.update(dict.fromkeys(cloud.arranque))
+        yield
+    finally:
+        if cloud.executor is not None:
+            cloud.executor.shutdown(wait=True)
+        for nombre, valor in previo.items():
+            setattr(cloud, nombre, valor)
+        cloud.arranque.update(arranque)
+        cloud.configurar_reloj(reloj_previo)
+
+
+@contextmanager
+def gestor_local(s3):
+    from imageRecopilator.Cloud import clientes_s3
+
+    gestor = clientes_s3.GestorClientesS3()
+    gestor.inyectar("s3", s3)
+    gestor.inyectar("sts", STSLocal())
+    anterior = clientes_s3.configurar_gestor(gestor)
+    try:
+        yield gestor
+    finally:
+        clientes_s3.configurar_gestor(anterior)
+
+
+@contextmanager
+def nivel_log(nivel):
+    previo = logger.level
+    logger.setLevel(nivel)
+    try:
+        yield
+    finally:
+        logger.setLevel(previo)
+
+
+# =========================
+# Simulación
+# =========================
+
+async def _correr(cloud, sesion, segundos):
+    async def detener():
+        await asyncio.sleep(segundos)
+        cloud.RUNNING = False
+
+    parada = asyncio.create_task(detener())
+    try:
+        await cloud.main(sesion=sesion)
+    finally:
+        parada.cancel()
+
+
+def simular_semana(inicio=None, dias=7, plantas=None, directorio=None, compactar=True,
+                   latencia=0.2, congeladas=(), nivel=logging.WARNING):
+    """
+    Corre la captura desde `inicio` (default LUNES_REFERENCIA) durante
+    `dias` virtuales y retorna el reporte: segundos reales, frames,
+    S3, descartes y trabajos encolados.
+    """
+    from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+
+    inicio = inicio or LUNES_REFERENCIA
+    reloj = RelojVirtual(inicio)
+    s3 = S3Memoria()
+
+    with tempfile.TemporaryDirectory(prefix="flujoprt-simulacion-") as temporal:
+        directorio = directorio or temporal
+        os.makedirs(directorio, exist_ok=True)
+        registro = registro_local(cloud.registro.ruta, plantas, directorio)
+        sesion = CamarasSimuladas(latencia=latencia, congeladas={registro.camaras[p] for p in congeladas})
+
+        with estado_simulado(cloud, reloj, registro, directorio, compactar), gestor_local(s3), nivel_log(nivel):
+            t0 = time.perf_counter()
+            correr_virtual(_correr(cloud, sesion, dias * 86400), reloj)
+            segundos = time.perf_counter() - t0
+
+            totales = cloud.metricas.totales()
+            return {
+                "inicio": inicio.isoformat(),
+                "fin": reloj.ahora().isoformat(timespec="seconds"),
+                "dias_virtuales": round(reloj.monotonic() / 86400, 3),
+                "segundos_reales": round(segundos, 2),
+                "aceleracion": round(reloj.monotonic() / max(segundos, 1e-9)),
+                "plantas": len(registro.camaras),
+                "frames": totales,
+                "frames_por_segundo": round(totales.get("imagenes_capturadas", 0) / max(segundos, 1e-9), 1),
+                "descartados": cloud.politica_carga.resumen(),
+                "s3": s3.resumen(),
+                "trabajos": [{"tipo": t["tipo"], "clave": t["clave"], "estado": t["estado"]}
+                             for t in cloud.cola_trabajos.listar()],
+            }
+
+
+# =========================
+# CLI
+# =========================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="flujoprt simular", description="Ciclo semanal de captura en tiempo virtual")
+    parser.add_argument("--desde", type=datetime.fromisoformat, default=LUNES_REFERENCIA,
+                        help=f"inicio virtual (default: {LUNES_REFERENCIA:%Y-%m-%d}, un lunes)")
+    parser.add_argument("--dias", type=float, default=7)
+    parser.add_argument("--plantas", nargs="+", help="subconjunto de camaras.json (default: todas)")
+    parser.add_argument("--congeladas", nargs="+", default=[], help="plantas cuya cámara repite siempre el mismo frame")
+    parser.add_argument("--latencia", type=float, default=0.2, help="segundos virtuales por GET")
+    parser.add_argument("--sin-compactacion", action="store_true")
+    parser.add_argument("--directorio", help="conservar bitácora y cola de trabajos aquí")
+    parser.add_argument("--verbose", action="store_true", help="logs INFO de la captura")
+    args = parser.parse_args(argv)
+
+    reporte = simular_semana(args.desde, args.dias, args.plantas, args.directorio, not args.sin_compactacion,
+                             args.latencia, args.congeladas, logging.INFO if args.verbose else logging.WARNING)
+    print(json.dumps(reporte, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
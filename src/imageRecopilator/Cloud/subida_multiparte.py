@@ -0,0 +1,212 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+
+from botocore.exceptions import ClientError
+
+"""
+SUBIDA MULTIPARTE EN STREAMING
+==============================
+
+Sube a S3 un flujo de bytes (stdout de ffmpeg) a medida que se produce:
+
+- El flujo se corta en partes de `tamano_parte` que se suben en paralelo
+  (a lo más `concurrencia` en vuelo; si S3 va lento, la lectura del
+  pipe se frena y ffmpeg espera).
+- Estado local por key (upload_id + md5/etag de cada parte). Si el
+  proceso se interrumpe, la próxima ejecución retoma el mismo upload y
+  solo sube las partes cuyo md5 cambió o que S3 no tiene (list_parts).
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+TAMANO_PARTE_MIN = 5 * 1024 * 1024   # mínimo de S3 (salvo la última parte)
+
+
+def _dir_estado_default():
+    return os.getenv("SUBIDAS_ESTADO_DIR", os.path.expanduser("~/.flujoprt/subidas"))
+
+
+class SubidaMultiparte:
+    def __init__(self, s3, bucket, key, tamano_parte=None, concurrencia=None, dir_estado=None, **extra):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.tamano_parte = max(
+            TAMANO_PARTE_MIN,
+            tamano_parte or int(os.getenv("SUBIDA_PARTE_MB", "8")) * 1024 * 1024
+        )
+        self.concurrencia = concurrencia or int(os.getenv("SUBIDA_CONCURRENCIA", "4"))
+        self.extra = extra                      # ContentType, StorageClass, ...
+
+        dir_estado = dir_estado or _dir_estado_default()
+        nombre = hashlib.md5(f"{bucket}/{key}".encode(), usedforsecurity=False).hexdigest()
+        self.ruta_estado = os.path.join(dir_estado, f"{nombre}.json")
+
+        self.upload_id = None
+        self.partes_previas = {}                # numero -> {"md5", "etag"} de una ejecución anterior
+        self.partes = {}                        # numero -> etag de esta ejecución
+        self._partes_estado = {}                # numero -> {"md5", "etag"} ya confirmadas
+        self.reutilizadas = 0
+        self.bytes_totales = 0
+
+        self._buffer = bytearray()
+        self._numero = 0
+        self._cupos = asyncio.Semaphore(self.concurrencia)
+        self._tareas = set()
+        self._error = None
+
+    # --- Estado local ---
+
+    def _leer_estado(self):
+        try:
+            with open(self.ruta_estado, encoding="utf-8") as f:
+                estado = json.load(f)
+            if estado.get("key") == self.key:
+                return estado
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _guardar_estado(self):
+        os.makedirs(os.path.dirname(self.ruta_estado), exist_ok=True)
+        estado = {
+            "bucket": self.bucket,
+            "key": self.key,
+            "upload_id": self.upload_id,
+            "partes": {str(n): p for n, p in sorted({**self.partes_previas, **self._partes_estado}.items())},
+        }
+        temporal = f"{self.ruta_estado}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(estado, f)
+        os.replace(temporal, self.ruta_estado)
+
+    def _borrar_estado(self):
+        try:
+            os.remove(self.ruta_estado)
+        except OSError:
+            pass
+
+    async def _partes_en_s3(self):
+        """{numero: etag} de las partes que S3 tiene para el upload_id"""
+        partes = {}
+        kwargs = {"Bucket": self.bucket, "Key": self.key, "UploadId": self.upload_id}
+        while True:
+            respuesta = await self.s3.list_parts(**kwargs)
+            for parte in respuesta.get("Parts", []):
+                partes[parte["PartNumber"]] = parte["ETag"]
+            if not respuesta.get("IsTruncated"):
+                return partes
+            kwargs["PartNumberMarker"] = respuesta["NextPartNumberMarker"]
+
+    # --- Ciclo de vida ---
+
+    async def iniciar(self):
+        estado = self._leer_estado()
+        if estado:
+            self.upload_id = estado["upload_id"]
+            try:
+                en_s3 = await self._partes_en_s3()
+                self.partes_previas = {
+                    int(n): p for n, p in estado["partes"].items()
+                    if en_s3.get(int(n)) == p["etag"]
+                }
+                logger.info(f"  Retomando subida de {self.key}: {len(self.partes_previas)} partes ya en S3")
+                return self
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                    raise
+                logger.info(f"  Subida previa de {self.key} ya no existe, se inicia otra")
+
+        respuesta = await self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self.extra)
+        self.upload_id = respuesta["UploadId"]
+        self.partes_previas = {}
+        self._guardar_estado()
+        return self
+
+    async def escribir(self, data):
+        if self._error:
+            raise self._error
+        self._buffer += data
+        self.bytes_totales += len(data)
+        while len(self._buffer) >= self.tamano_parte:
+            parte = bytes(self._buffer[:self.tamano_parte])
+            del self._buffer[:self.tamano_parte]
+            await self._emitir(parte)
+
+    async def consumir_stream(self, lector, chunk=256 * 1024):
+        """Lee un asyncio.StreamReader hasta EOF y lo sube"""
+        while True:
+            data = await lector.read(chunk)
+            if not data:
+                return
+            await self.escribir(data)
+
+    async def _emitir(self, parte):
+        await self._cupos.acquire()               # backpressure: máximo N partes en memoria
+        self._numero += 1
+        tarea = asyncio.create_task(self._subir_parte(self._numero, parte))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+
+    async def _subir_parte(self, numero, parte):
+        try:
+            md5 = hashlib.md5(parte, usedforsecurity=False).hexdigest()
+            previa = self.partes_previas.get(numero)
+            if previa and previa["md5"] == md5:
+                self.partes[numero] = previa["etag"]
+                self._partes_estado[numero] = previa
+                self.reutilizadas += 1
+                return
+
+            respuesta = await self.s3.upload_part(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                PartNumber=numero, Body=parte
+            )
+            self.partes[numero] = respuesta["ETag"]
+            self.partes_previas.pop(numero, None)
+            self._partes_estado[numero] = {"md5": md5, "etag": respuesta["ETag"]}
+            self._guardar_estado()
+        except Exception as e:
+            self._error = self._error or e
+        finally:
+            self._cupos.release()
+
+    async def completar(self):
+        """Sube el resto, cierra el upload y borra el estado local. Retorna bytes subidos."""
+        if self._buffer or self._numero == 0:
+            parte = bytes(self._buffer)
+            self._buffer.clear()
+            await self._emitir(parte)
+        if self._tareas:
+            await asyncio.gather(*list(self._tareas))
+        if self._error:
+            raise self._error
+
+        await self.s3.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": [
+                {"PartNumber": n, "ETag": self.partes[n]} for n in sorted(self.partes)
+            ]}
+        )
+        self._borrar_estado()
+        return self.bytes_totales
+
+    async def abortar(self, conservar_estado=False):
+        """
+        conservar_estado=True (interrupción): deja el upload y el estado para
+        retomarlo. False (fallo definitivo): aborta el upload en S3.
+        """
+        for tarea in list(self._tareas):
+            tarea.cancel()
+        if self._tareas:
+            await asyncio.gather(*list(self._tareas), return_exceptions=True)
+        if conservar_estado or not self.upload_id:
+            return
+        try:
+            await self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        except Exception as e:
+            logger.warning(f"  No se pudo abortar la subida de {self.key}: {e}")
+        self._borrar_estado()
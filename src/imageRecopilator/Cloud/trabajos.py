@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+import traceback
+
+"""
+COLA DE TRABAJOS PERSISTENTE
+============================
+
+Procesamiento pesado (timelapses semanales, renders nocturnos) fuera del
+proceso de captura:
+
+- La captura solo encola: una fila en SQLite local (TRABAJOS_DB) por
+  trabajo, con clave única para que encolar dos veces no duplique.
+- Un proceso aparte (`flujoprt work`, con nice/ionice) toma los trabajos
+  de a uno con lease: si muere a mitad, el lease vence y otro worker lo
+  retoma. Mientras corre, el lease se renueva.
+- Un trabajo que falla se reintenta con backoff hasta `max_intentos`;
+  después queda `fallido` con el error (reintentar() lo reactiva).
+- Un trabajo interrumpido por apagado vuelve a `pendiente` sin gastar
+  intento.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+ESTADOS = ("pendiente", "en_curso", "hecho", "fallido")
+
+
+# =========================
+# Cola (SQLite)
+# =========================
+
+class ColaTrabajos:
+    def __init__(self, ruta, lease=900, max_intentos=3, espera_base=300, reloj=time.time):
+        self.ruta = ruta
+        self.lease = lease
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.reloj = reloj
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        self._crear_tablas()
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _crear_tablas(self):
+        conn = self._conectar()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS trabajos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    clave TEXT UNIQUE,
+                    tipo TEXT NOT NULL,
+                    parametros TEXT NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    disponible REAL NOT NULL,
+                    lease_hasta REAL,
+                    worker TEXT,
+                    error TEXT,
+                    creado REAL NOT NULL,
+                    actualizado REAL NOT NULL
+                )
+            """)
+        finally:
+            conn.close()
+
+    def encolar(self, tipo, parametros, clave=None, cuando=None):
+        """Agrega un trabajo. Con `clave` ya existente no hace nada y devuelve None."""
+        ahora = self.reloj()
+        conn = self._conectar()
+        try:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO trabajos (clave, tipo, parametros, disponible, creado, actualizado) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (clave, tipo, json.dumps(parametros), cuando or ahora, ahora, ahora)
+            )
+            if cursor.rowcount == 0:
+                return None
+            logger.info(f"Trabajo encolado: {tipo} {clave or cursor.lastrowid}")
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def tomar(self, worker):
+        """
+        Reclama el trabajo disponible más antiguo (pendiente o con lease
+        vencido). Un lease vencido que ya agotó sus intentos (el worker murió
+        en cada uno: OOM, ffmpeg matado) queda `fallido`, como en fallar().
+        """
+        ahora = self.reloj()
+        conn = self._conectar()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            agotados = conn.execute(
+                "UPDATE trabajos SET estado = 'fallido', lease_hasta = NULL, actualizado = ?, "
+                "error = 'lease vencido en el último intento (worker caído)' "
+                "WHERE estado = 'en_curso' AND lease_hasta < ? AND intentos >= ?",
+                (ahora, ahora, self.max_intentos)
+            ).rowcount
+            if agotados:
+                logger.error(f"{agotados} trabajo(s) con lease vencido sin más intentos: fallidos")
+            fila = conn.execute(
+                "SELECT * FROM trabajos WHERE (estado = 'pendiente' AND disponible <= ?) "
+                "OR (estado = 'en_curso' AND lease_hasta < ?) ORDER BY disponible, id LIMIT 1",
+                (ahora, ahora)
+            ).fetchone()
+            if fila is None:
+                conn.execute("COMMIT")
+                return None
+            if fila["estado"] == "en_curso":
+                logger.warning(f"Trabajo {fila['id']} ({fila['tipo']}): lease de {fila['worker']} vencido, se retoma")
+            conn.execute(
+                "UPDATE trabajos SET estado = 'en_curso', intentos = intentos + 1, worker = ?, "
+                "lease_hasta = ?, actualizado = ? WHERE id = ?",
+                (worker, ahora + self.lease, ahora, fila["id"])
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        trabajo = dict(fila)
+        trabajo["parametros"] = json.loads(trabajo["parametros"])
+        trabajo["intentos"] += 1
+        return trabajo
+
+    def _actualizar(self, id_trabajo, sql, parametros=()):
+        conn = self._conectar()
+        try:
+            conn.execute(f"UPDATE trabajos SET {sql}, actualizado = ? WHERE id = ?",
+                         (*parametros, self.reloj(), id_trabajo))
+        finally:
+            conn.close()
+
+    def renovar(self, id_trabajo):
+        self._actualizar(id_trabajo, "lease_hasta = ?", (self.reloj() + self.lease,))
+
+    def completar(self, id_trabajo):
+        self._actualizar(id_trabajo, "estado = 'hecho', lease_hasta = NULL, error = NULL")
+
+    def liberar(self, id_trabajo):
+        """Devuelve el trabajo a pendiente sin contar el intento (apagado a mitad)"""
+        self._actualizar(id_trabajo, "estado = 'pendiente', intentos = intentos - 1, lease_hasta = NULL")
+
+    def fallar(self, id_trabajo, intentos, error):
+        """Reintento con backoff exponencial o `fallido` si se agotaron los intentos"""
+        if intentos >= self.max_intentos:
+            self._actualizar(id_trabajo, "estado = 'fallido', lease_hasta = NULL, error = ?", (error,))
+            return False
+        disponible = self.reloj() + self.espera_base * 2 ** (intentos - 1)
+        self._actualizar(id_trabajo, "estado = 'pendiente', lease_hasta = NULL, disponible = ?, error = ?",
+                         (disponible, error))
+        return True
+
+    def reintentar(self, clave):
+        """Reactiva un trabajo hecho o fallido (por clave)"""
+        conn = self._conectar()
+        try:
+            cursor = conn.execute(
+                "UPDATE trabajos SET estado = 'pendiente', intentos = 0, disponible = ?, error = NULL "
+                "WHERE clave = ? AND estado IN ('hecho', 'fallido')",
+                (self.reloj(), clave)
+            )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def pendientes(self):
+        """Trabajos que un worker podría tomar ahora"""
+        ahora = self.reloj()
+        conn = self._conectar()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM trabajos WHERE (estado = 'pendiente' AND disponible <= ?) "
+                "OR (estado = 'en_curso' AND lease_hasta < ?)",
+                (ahora, ahora)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def listar(self, estado=None, limite=50):
+        conn = self._conectar()
+        try:
+            if estado:
+                filas = conn.execute("SELECT * FROM trabajos WHERE estado = ? ORDER BY id DESC LIMIT ?",
+                                     (estado, limite)).fetchall()
+            else:
+                filas = conn.execute("SELECT * FROM trabajos ORDER BY id DESC LIMIT ?", (limite,)).fetchall()
+        finally:
+            conn.close()
+        return [dict(fila, parametros=json.loads(fila["parametros"])) for fila in filas]
+
+    def resumen(self):
+        """{estado: cantidad}"""
+        conn = self._conectar()
+        try:
+            filas = conn.execute("SELECT estado, COUNT(*) FROM trabajos GROUP BY estado").fetchall()
+        finally:
+            conn.close()
+        conteo = dict.fromkeys(ESTADOS, 0)
+        conteo.update({estado: total for estado, total in filas})
+        return conteo
+
+
+# =========================
+# Ejecutor (proceso worker)
+# =========================
+
+class EjecutorTrabajos:
+    """
+    Toma trabajos de la cola y los ejecuta de a uno. `manejadores` es
+    {tipo: async fn(**parametros)}. Pensado para correr en su propio
+    proceso de baja prioridad, no en el de captura.
+    """
+
+    def __init__(self, cola, manejadores, worker=None, espera=30):
+        self.cola = cola
+        self.manejadores = manejadores
+        self.worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        self.espera = espera
+        self.completados = 0
+        self.fallidos = 0
+
+    async def _renovar(self, id_trabajo):
+        while True:
+            await asyncio.sleep(self.cola.lease / 3)
+            await asyncio.to_thread(self.cola.renovar, id_trabajo)
+
+    async def ejecutar_uno(self, continuar=lambda: True):
+        """Ejecuta el siguiente trabajo disponible. False si no había ninguno."""
+        trabajo = await asyncio.to_thread(self.cola.tomar, self.worker)
+        if trabajo is None:
+            return False
+
+        id_trabajo, tipo = trabajo["id"], trabajo["tipo"]
+        descripcion = f"{tipo} {trabajo['clave'] or id_trabajo}"
+        manejador = self.manejadores.get(tipo)
+        if manejador is None:
+            await asyncio.to_thread(self.cola.fallar, id_trabajo, self.cola.max_intentos, f"Tipo desconocido: {tipo}")
+            logger.error(f"Trabajo {descripcion}: tipo desconocido")
+            self.fallidos += 1
+            return True
+
+        logger.info(f"Trabajo {descripcion} iniciado (intento {trabajo['intentos']})")
+        inicio = time.monotonic()
+        renovacion = asyncio.create_task(self._renovar(id_trabajo))
+        try:
+            await manejador(**trabajo["parametros"])
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.cola.liberar, id_trabajo)
+            raise
+        except Exception as e:
+            reintento = await asyncio.to_thread(self.cola.fallar, id_trabajo, trabajo["intentos"], f"{e}")
+            logger.error(f"Trabajo {descripcion} falló: {e} ({'se reintentará' if reintento else 'sin más intentos'})")
+            logger.debug(traceback.format_exc())
+            self.fallidos += 1
+        else:
+            if continuar():
+                await asyncio.to_thread(self.cola.completar, id_trabajo)
+                logger.info(f"Trabajo {descripcion} completado en {time.monotonic() - inicio:.0f}s")
+                self.completados += 1
+            else:
+                # Apagado a mitad: el manejador cortó antes de terminar
+                await asyncio.to_thread(self.cola.liberar, id_trabajo)
+                logger.warning(f"Trabajo {descripcion} interrumpido, queda pendiente")
+        finally:
+            renovacion.cancel()
+        return True
+
+    async def correr(self, continuar=lambda: True, hasta_vaciar=False):
+        """Loop del worker; con `hasta_vaciar` termina cuando no quedan trabajos disponibles"""
+        while continuar():
+            if await self.ejecutar_uno(continuar):
+                continue
+            if hasta_vaciar:
+                break
+            for _ in range(self.espera):
+                if not continuar():
+                    break
+                await asyncio.sleep(1)
+        logger.info(f"Worker de trabajos {self.worker}: {self.completados} completados, {self.fallidos} fallidos")
@@ -9,9 +9,16 @@ import subprocess
 import tempfile
 import shutil
 from pathlib import Path
+import sys
 from collections import defaultdict
 from PIL import Image
 
+# Ejecución directa: agrega src/ al path para los imports del paquete
+if not __package__:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from imageRecopilator.registro import RegistroCamaras
+
 """
 SISTEMA COMPLETO LOCAL: CAPTURA + PROCESAMIENTO DOMINICAL
 ==========================================================
@@ -46,58 +53,11 @@ INTERVALO = 60
 # Minutos antes de la apertura para reactivar (20 minutos)
 MARGEN_PREVIO = 20 * 60  # 20 minutos en segundos
 
-# Diccionario con los nombres de plantas y sus IDs de cámara correspondientes
-camaras = {
-    "Huechuraba": "10.57.6.222_Cam08",
-    "La Florida": "10.57.0.222_Cam03",
-    "La Pintana": "10.57.5.222_Cam09",
-    "Pudahuel": "10.57.4.222_Cam07",
-    "Quilicura": "10.57.2.222_Cam06",
-    "Recoleta": "10.57.7.222_Cam09",
-    "San Joaquin": "10.57.3.222_Cam07",
-    "Temuco": "10.57.32.222_Cam01",
-    "Villarica": "10.57.33.222_Cam04",
-    "Chillan": "10.57.12.70",
-    "Yungay": "10.57.20.70",
-    "Concepcion": "10.57.19.70",
-    "San Pedro de la Paz": "10.57.16.70",
-    "Yumbel": "10.57.17.70"
-}
-
-# Horarios de operación para cada planta
-HORARIOS = {
-    "Huechuraba": {"semana": ("07:10", "16:50"), "sabado": ("07:10", "16:50")},
-    "La Florida": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "La Pintana": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "Pudahuel": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "Quilicura": {"semana": ("07:10", "16:50"), "sabado": ("07:10", "16:50")},
-    "Recoleta": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "San Joaquin": {"semana": ("07:40", "17:20"), "sabado": ("07:10", "16:50")},
-    "Temuco": {"semana": ("08:10", "18:20"), "sabado": ("08:10", "13:50")},
-    "Villarica": {"semana": ("07:10", "17:50"), "sabado": ("07:40", "13:50")},
-    "Chillan": {"semana": ("06:40", "17:20"), "sabado": ("07:10", "13:50")},
-    "Yungay": {"semana": ("07:40", "17:20"), "sabado": ("08:10", "13:50")},
-    "Concepcion": {"semana": ("07:40", "20:20"), "sabado": ("08:10", "16:50")},
-    "San Pedro de la Paz": {"semana": ("07:40", "17:20"), "sabado": ("08:10", "13:50")},
-    "Yumbel": {"semana": ("07:40", "17:20"), "sabado": ("08:10", "13:50")}
-}
-
-DENOMINADORES = {
-    "Huechuraba": "HCH",
-    "La Florida": "LFL",
-    "La Pintana": "LPT",
-    "Pudahuel": "PUD",
-    "Quilicura": "QLC",
-    "Recoleta": "RCL",
-    "San Joaquin": "SJQ",
-    "Temuco": "TMU",
-    "Villarica": "VLL",
-    "Chillan": "CHL",
-    "Yungay": "YGY",
-    "Concepcion": "CCP",
-    "San Pedro de la Paz": "SPP",
-    "Yumbel": "YMB"
-}
+# Plantas, cámaras, horarios y denominadores (compartidos con Cloud en camaras.json)
+registro = RegistroCamaras()
+camaras = registro.camaras
+HORARIOS = registro.horarios
+DENOMINADORES = registro.denominadores
 
 # Configuración SSL
 ssl_context = ssl.create_default_context()
@@ -289,10 +249,10 @@ class SundayWorkerLocal:
         self.procesado_semana = None
     
     def obtener_semana_anterior(self):
-        """Retorna (año, semana) del lunes-sábado pasado"""
+        """Retorna (año, semana) ISO del lunes-sábado pasado (el domingo, la que acaba de cerrar)"""
         hoy = datetime.now()
-        inicio_semana_anterior = hoy - timedelta(days=hoy.weekday() + 1)
-        return inicio_semana_anterior.isocalendar()[:2]
+        sabado = hoy - timedelta(days=(hoy.weekday() - 5) % 7 or 7)
+        return sabado.isocalendar()[:2]
     
     def hash_archivo(self, filepath):
         """Calcula MD5 de un archivo"""
@@ -305,7 +265,7 @@ class SundayWorkerLocal:
     def identificar_conjuntos(self, semana):
         """Identifica todas las imágenes de la semana anterior"""
         año, num_semana = semana
-        inicio = datetime.strptime(f"{año}-W{num_semana:02d}-1", "%Y-W%W-%w")
+        inicio = datetime.fromisocalendar(año, num_semana, 1)
         
         conjuntos = defaultdict(list)
         
@@ -393,7 +353,7 @@ class SundayWorkerLocal:
         año, semana = self.obtener_semana_anterior()
         
         # Calcular rango de fechas
-        inicio = datetime.strptime(f"{año}-W{semana:02d}-1", "%Y-W%W-%w")
+        inicio = datetime.fromisocalendar(año, semana, 1)
         fin = inicio + timedelta(days=5)  # sábado
         nombre_rango = f"{inicio.day:02d}_{inicio.month:02d}-{fin.day:02d}_{fin.month:02d}"
         
@@ -538,6 +498,7 @@ async def main():
             
             # Lunes-Sábado: modo captura normal
             await esperar_hasta_apertura()
+            registro.revisar()
             
             await asyncio.gather(
                 *[capturar_camara(session, planta, cam_id) for planta, cam_id in camaras.items()]
@@ -1,9 +1,5 @@
 from . import ImageRecompilerLocal as imageRecompilerLocal
-from . import ImageRecompilerCloud as imageRecompilerCloud
 
 __all__ = [
-    "ImageRecompilerLocal",
-    "ImageRecompilerCloud",
-    "CloudDecompressor",
-    "DuplicationFilter",
+    "imageRecompilerLocal",
 ]
@@ -0,0 +1,199 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+from datetime import date
+
+"""
+CLI FLUJOPRT
+============
+
+Un subcomando por tipo de trabajo, cada uno en su propio proceso:
+
+    flujoprt capture [--con-domingo]     captura continua (no se detiene el domingo)
+    flujoprt process [--semana 2026-W03] procesamiento de una semana, en primer plano
+    flujoprt work [--hasta-vaciar]       worker de la cola de trabajos (trabajos.py)
+    flujoprt render Temuco --desde ...   timelapse de un rango (ver render.py)
+    flujoprt bench codificador ...       benchmarks (ver benchmarks.py)
+    flujoprt bitacora --desde ...        disponibilidad y latencia (ver bitacora.py)
+    flujoprt simular --dias 7            ciclo semanal en tiempo virtual (ver simulacion.py)
+
+La captura y la codificación no comparten event loop: `process`, `work`
+y `render` corren con menor prioridad de CPU e IO (--nice 10, --ionice 3)
+y se pueden fijar a CPUs (--cpus) o acotar en memoria (--memoria-mb).
+ffmpeg hereda los límites.
+
+La configuración sigue siendo por variables de entorno; los módulos
+pesados se importan recién al elegir el subcomando.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+
+# =========================
+# Límites del proceso
+# =========================
+
+def _cpus(texto):
+    """'0-3,6' -> {0, 1, 2, 3, 6}"""
+    cpus = set()
+    try:
+        for parte in texto.split(","):
+            inicio, _, fin = parte.partition("-")
+            cpus.update(range(int(inicio), int(fin or inicio) + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"CPUs inválidas: {texto!r} (ej: 0-3,6)")
+    return cpus
+
+
+def _semana(texto):
+    """'2026-W03' -> (2026, 3), semana ISO (la misma de semana_anterior)"""
+    try:
+        año, semana = texto.upper().split("-W")
+        date.fromisocalendar(int(año), int(semana), 1)      # la semana 53 solo existe en algunos años
+        return int(año), int(semana)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Semana inválida: {texto!r} (ej: 2026-W03)")
+
+
+def aplicar_limites(nice=0, cpus=None, memoria_mb=None, ionice=None):
+    """Prioridad de CPU e IO, afinidad y tope de memoria del proceso actual (los hijos los heredan)"""
+    if nice:
+        os.nice(nice)
+    if ionice:
+        # Sin binding de ioprio_set en la stdlib: util-linux sobre el propio PID
+        if shutil.which("ionice"):
+            subprocess.run(["ionice", "-c", str(ionice), "-p", str(os.getpid())], check=False)
+        else:
+            logger.warning("ionice no está disponible, se ignora --ionice")
+    if cpus:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+        else:
+            logger.warning("Afinidad de CPU no soportada en esta plataforma, se ignora --cpus")
+    if memoria_mb:
+        try:
+            import resource
+        except ImportError:
+            logger.warning("Límite de memoria no soportado en esta plataforma, se ignora --memoria-mb")
+        else:
+            tope = memoria_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (tope, tope))
+
+
+def _opciones_limites(parser, nice, ionice=None):
+    parser.add_argument("--nice", type=int, default=nice, help=f"incremento de nice (default: {nice})")
+    parser.add_argument("--ionice", type=int, choices=(1, 2, 3), default=ionice,
+                        help="clase de IO: 1 realtime, 2 best-effort, 3 idle" + (f" (default: {ionice})" if ionice else ""))
+    parser.add_argument("--cpus", type=_cpus, help="CPUs permitidas, ej: 0-3,6")
+    parser.add_argument("--memoria-mb", type=int, help="tope de memoria virtual del proceso")
+
+
+# =========================
+# Subcomandos
+# =========================
+
+def capture(args, resto):
+    # Antes de importar: el módulo lee la configuración al cargarse y las particiones la heredan
+    os.environ["PROCESAMIENTO_DOMINGO"] = "1" if args.con_domingo else "0"
+    from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+    cloud.capturar()
+    return 0
+
+
+def process(args, resto):
+    from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+    if args.encolar:
+        cloud.inicializar(captura=False)
+        año, semana = args.semana or cloud.semana_anterior()
+        cloud.cola_trabajos.encolar("semana", {"año": año, "semana": semana}, f"semana:{año}-W{semana:02d}")
+        return 0
+    return 0 if cloud.correr(cloud.procesar_semana(args.semana)) else 1
+
+
+def work(args, resto):
+    from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+    if args.estado:
+        cloud.inicializar(captura=False)
+        print(json.dumps({"resumen": cloud.cola_trabajos.resumen(), "trabajos": cloud.cola_trabajos.listar(limite=20)},
+                         indent=2, ensure_ascii=False))
+        return 0
+    return 0 if cloud.correr(cloud.trabajar(args.hasta_vaciar)) else 1
+
+
+def render(args, resto):
+    from imageRecopilator.Cloud import render as modulo
+    modulo.main(resto)
+    return 0
+
+
+def bench(args, resto):
+    from imageRecopilator.Cloud import benchmarks
+    benchmarks.main(resto)
+    return 0
+
+
+def bitacora(args, resto):
+    from imageRecopilator.Cloud import bitacora as modulo
+    modulo.main(resto)
+    return 0
+
+
+def simular(args, resto):
+    from imageRecopilator.Cloud import simulacion
+    simulacion.main(resto)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="flujoprt", description="Captura y timelapses de cámaras PRT")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p = comandos.add_parser("capture", help="captura continua de las cámaras")
+    p.add_argument("--con-domingo", action="store_true",
+                   help="encolar la semana los domingos y lanzar el worker de trabajos (nice/ionice)")
+    _opciones_limites(p, nice=0)
+    p.set_defaults(funcion=capture)
+
+    p = comandos.add_parser("process", help="procesamiento dominical de una semana")
+    p.add_argument("--semana", type=_semana, help="YYYY-Www (default: la semana anterior)")
+    p.add_argument("--encolar", action="store_true", help="solo encolar el trabajo para `flujoprt work`")
+    _opciones_limites(p, nice=10, ionice=3)
+    p.set_defaults(funcion=process)
+
+    p = comandos.add_parser("work", help="worker de la cola de trabajos")
+    p.add_argument("--hasta-vaciar", action="store_true", help="terminar cuando no queden trabajos disponibles")
+    p.add_argument("--estado", action="store_true", help="mostrar la cola y salir")
+    _opciones_limites(p, nice=10, ionice=3)
+    p.set_defaults(funcion=work)
+
+    # render, bench, bitacora y simular: el resto de los argumentos (incluido --help) va a su propio parser
+    p = comandos.add_parser("render", add_help=False, help="timelapse de un rango de fechas")
+    _opciones_limites(p, nice=10, ionice=3)
+    p.set_defaults(funcion=render)
+
+    p = comandos.add_parser("bench", add_help=False, help="benchmarks")
+    _opciones_limites(p, nice=0)
+    p.set_defaults(funcion=bench)
+
+    p = comandos.add_parser("bitacora", add_help=False, help="consultas sobre la bitácora de capturas")
+    _opciones_limites(p, nice=0)
+    p.set_defaults(funcion=bitacora)
+
+    p = comandos.add_parser("simular", add_help=False, help="semana de captura en tiempo virtual contra cámaras y S3 locales")
+    _opciones_limites(p, nice=0)
+    p.set_defaults(funcion=simular)
+
+    args, resto = parser.parse_known_args(argv)
+    if resto and args.funcion in (capture, process, work):
+        parser.error(f"argumentos no reconocidos: {' '.join(resto)}")
+
+    aplicar_limites(args.nice, args.cpus, args.memoria_mb, args.ionice)
+    return args.funcion(args, resto)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+"""
+REGISTRO DE CÁMARAS
+===================
+
+Plantas, cámaras, horarios y denominadores desde un archivo JSON
+(`camaras.json` o `CAMARAS_CONFIG`), compartido por Cloud y Local.
+
+- Se valida completo una vez por carga; un archivo inválido nunca
+  reemplaza a la configuración vigente.
+- Los dicts `camaras`, `horarios` y `denominadores` se actualizan en el
+  lugar, así los módulos que los referencian ven siempre la versión
+  actual. `horas` guarda los horarios ya convertidos a `time` para el
+  camino caliente (sin strptime por consulta).
+- `revisar()` recarga si cambió el mtime y devuelve qué plantas se
+  agregaron, quitaron o cambiaron de cámara.
+"""
+
+logger = logging.getLogger("flujo-prt")
+
+RUTA_DEFAULT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "camaras.json")
+TIPOS_DIA = ("semana", "sabado")
+TIPOS_OPCIONALES = ("domingo",)   # sin horario "domingo" la planta no captura ese día
+TIPO_DIA = ("semana",) * 5 + ("sabado", "domingo")   # weekday() -> tipo de horario
+
+
+# =========================
+# Validación
+# =========================
+
+def _hora(valor, contexto, errores):
+    try:
+        return datetime.strptime(valor, "%H:%M").time()
+    except (TypeError, ValueError):
+        errores.append(f"{contexto}: hora inválida {valor!r} (formato HH:MM)")
+        return None
+
+
+def validar(config):
+    """Valida el contenido del archivo y lo compila. Lanza ValueError con todos los errores."""
+    errores = []
+    plantas = config.get("plantas") if isinstance(config, dict) else None
+    if not isinstance(plantas, dict) or not plantas:
+        raise ValueError("Configuración de cámaras: falta el objeto 'plantas'")
+
+    camaras, horarios, denominadores, horas = {}, {}, {}, {}
+    vistos = {}
+
+    for planta, datos in plantas.items():
+        if not isinstance(datos, dict):
+            errores.append(f"{planta}: se esperaba un objeto")
+            continue
+
+        camara = datos.get("camara")
+        if not isinstance(camara, str) or not camara.strip():
+            errores.append(f"{planta}: falta 'camara'")
+
+        denominador = datos.get("denominador", planta.replace(" ", "_"))
+        if denominador in vistos:
+            errores.append(f"{planta}: denominador {denominador!r} repetido (ya usado por {vistos[denominador]})")
+        vistos[denominador] = planta
+
+        horarios_planta = {}
+        horas_planta = {}
+        for tipo in TIPOS_DIA + TIPOS_OPCIONALES:
+            rango = (datos.get("horarios") or {}).get(tipo)
+            if rango is None and tipo in TIPOS_OPCIONALES:
+                continue
+            if not isinstance(rango, (list, tuple)) or len(rango) != 2:
+                errores.append(f"{planta}: horario '{tipo}' debe ser [inicio, fin]")
+                continue
+            inicio = _hora(rango[0], f"{planta}/{tipo}", errores)
+            fin = _hora(rango[1], f"{planta}/{tipo}", errores)
+            if inicio and fin and inicio >= fin:
+                errores.append(f"{planta}/{tipo}: inicio {rango[0]} no es anterior al cierre {rango[1]}")
+            horarios_planta[tipo] = (rango[0], rango[1])
+            horas_planta[tipo] = (inicio, fin)
+
+        camaras[planta] = camara
+        horarios[planta] = horarios_planta
+        denominadores[planta] = denominador
+        horas[planta] = horas_planta
+
+    if errores:
+        raise ValueError("Configuración de cámaras inválida:\n  " + "\n  ".join(errores))
+
+    return camaras, horarios, denominadores, horas
+
+
+# =========================
+# Registro
+# =========================
+
+def _reemplazar(destino, origen):
+    for clave in list(destino):
+        if clave not in origen:
+            del destino[clave]
+    destino.update(origen)
+
+
+class RegistroCamaras:
+    def __init__(self, ruta=None):
+        self.ruta = ruta or os.getenv("CAMARAS_CONFIG", RUTA_DEFAULT)
+        self.camaras = {}
+        self.horarios = {}
+        self.denominadores = {}
+        self.horas = {}
+        self.mtime = None
+        self.cargar()
+
+    def cargar(self):
+        """Carga y valida el archivo; si es inválido lanza ValueError sin tocar lo vigente"""
+        mtime = os.stat(self.ruta).st_mtime_ns
+        with open(self.ruta, encoding="utf-8") as f:
+            try:
+                config = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Configuración de cámaras: JSON inválido ({e})") from e
+
+        camaras, horarios, denominadores, horas = validar(config)
+        anteriores = dict(self.camaras)
+
+        _reemplazar(self.camaras, camaras)
+        _reemplazar(self.horarios, horarios)
+        _reemplazar(self.denominadores, denominadores)
+        _reemplazar(self.horas, horas)
+        self.mtime = mtime
+
+        return {
+            "agregadas": set(camaras) - set(anteriores),
+            "quitadas": set(anteriores) - set(camaras),
+            "modificadas": {p for p in camaras if p in anteriores and anteriores[p] != camaras[p]},
+        }
+
+    def revisar(self):
+        """Recarga si el archivo cambió. Devuelve los cambios o None (sin cambios o inválido)."""
+        try:
+            if os.stat(self.ruta).st_mtime_ns == self.mtime:
+                return None
+            cambios = self.cargar()
+        except (OSError, ValueError) as e:
+            logger.error(f"Recarga de {self.ruta} rechazada, se mantiene la configuración vigente: {e}")
+            try:
+                self.mtime = os.stat(self.ruta).st_mtime_ns   # no reintentar hasta el próximo cambio
+            except OSError:
+                pass
+            return None
+
+        logger.info(f"Registro de cámaras recargado: +{sorted(cambios['agregadas'])} "
+                    f"-{sorted(cambios['quitadas'])} ~{sorted(cambios['modificadas'])}")
+        return cambios
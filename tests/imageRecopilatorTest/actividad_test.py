@@ -0,0 +1,64 @@
+import sys
+import os
+import io
+import pytest
+from PIL import Image
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud.actividad import DetectorActividad
+
+
+def jpeg(color, rect=None):
+    img = Image.new("RGB", (640, 360), color)
+    if rect:
+        img.paste((255, 255, 255), rect)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+@pytest.mark.imageRecopilator
+class TestDetectorActividad:
+
+    def test_primer_frame_siempre_activo(self):
+        detector = DetectorActividad(config_default={"modo": "omitir"})
+        subir, puntaje = detector.evaluar("Temuco", jpeg((40, 40, 40)))
+        assert subir is True
+        assert puntaje == 1.0
+
+    def test_omitir_frames_sin_cambios(self):
+        detector = DetectorActividad(config_default={"modo": "omitir", "max_omitidos": 100})
+        vacio = jpeg((40, 40, 40))
+        detector.evaluar("Temuco", vacio)
+
+        subir, puntaje = detector.evaluar("Temuco", vacio)
+        assert subir is False
+        assert puntaje < 0.01
+
+    def test_detecta_vehiculo(self):
+        detector = DetectorActividad(config_default={"modo": "omitir"})
+        detector.evaluar("Temuco", jpeg((40, 40, 40)))
+
+        subir, puntaje = detector.evaluar("Temuco", jpeg((40, 40, 40), (200, 100, 400, 250)))
+        assert subir is True
+        assert puntaje > 0.1
+
+    def test_modo_marcar_sube_todo(self):
+        detector = DetectorActividad(config_por_planta={"Temuco": {"modo": "marcar"}},
+                                     config_default={"modo": "omitir"})
+        vacio = jpeg((40, 40, 40))
+        detector.evaluar("Temuco", vacio)
+        assert detector.evaluar("Temuco", vacio)[0] is True
+        assert detector.modo("Yumbel") == "omitir"
+
+    def test_fondo_independiente_por_planta(self):
+        detector = DetectorActividad(config_default={"modo": "omitir"})
+        detector.evaluar("Temuco", jpeg((40, 40, 40)))
+        # Otra planta sin fondo previo: primer frame activo
+        assert detector.evaluar("Yumbel", jpeg((40, 40, 40)))[1] == 1.0
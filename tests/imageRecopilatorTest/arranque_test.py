@@ -0,0 +1,63 @@
+import sys
+import os
+import subprocess
+import pytest
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+
+
+@pytest.mark.imageRecopilator
+def test_importar_no_carga_dependencias_del_domingo_ni_boto3():
+    codigo = (
+        "import sys, signal\n"
+        "import imageRecopilator.Cloud.ImageRecompilerCloud as m\n"
+        "cargados = [x for x in ('boto3', 'aioboto3', 'imageRecopilator.Cloud.pipeline_domingo',\n"
+        "            'imageRecopilator.Cloud.listado', 'imageRecopilator.Cloud.particiones') if x in sys.modules]\n"
+        "assert not cargados, cargados\n"
+        "assert m.cola_subida is None and m.executor is None\n"
+        "assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL\n"
+    )
+    entorno = dict(os.environ, PYTHONPATH=os.path.join(project_root, "src"), AWS_DEFAULT_REGION="us-east-1")
+    resultado = subprocess.run([sys.executable, "-c", codigo], env=entorno, capture_output=True, text=True)
+    assert resultado.returncode == 0, resultado.stderr
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_inicializar_es_idempotente():
+    cloud.inicializar()
+    cola, executor = cloud.cola_subida, cloud.executor
+    cloud.inicializar()
+    assert cloud.cola_subida is cola and cloud.executor is executor
+    assert cloud.arranque["inicializacion"] is not None
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_verificacion_fallida_detiene_el_proceso(monkeypatch):
+    async def sin_credenciales():
+        return False
+
+    monkeypatch.setattr(cloud, "verificar_credenciales_aws", sin_credenciales)
+    monkeypatch.setattr(cloud, "RUNNING", True)
+    assert await cloud.verificar_aws_en_paralelo() is False
+    assert cloud.RUNNING is False
+
+
+@pytest.mark.imageRecopilator
+def test_primer_frame_se_mide_una_vez(monkeypatch, caplog):
+    monkeypatch.setattr(cloud, "arranque", {"importacion": 0.3, "inicializacion": 0.4, "primer_frame": None})
+    monkeypatch.setattr(cloud, "ARRANQUE_PRESUPUESTO", 0)
+    with caplog.at_level("INFO", logger="flujo-prt"):
+        cloud.marcar_primer_frame("Temuco")
+        cloud.marcar_primer_frame("Osorno")
+    assert cloud.arranque["primer_frame"] is not None
+    mensajes = [r.message for r in caplog.records if "ARRANQUE" in r.message]
+    assert len(mensajes) == 1 and "Temuco" in mensajes[0] and "presupuesto" in mensajes[0]
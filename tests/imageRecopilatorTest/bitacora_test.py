@@ -0,0 +1,135 @@
+import sys
+import os
+import io
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import patch, MagicMock, AsyncMock
+from PIL import Image
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import bitacora as modulo
+from imageRecopilator.Cloud.bitacora import BitacoraCapturas
+from imageRecopilator.Cloud import clientes_s3
+from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+from imageRecopilator.Cloud.carga import PoliticaCarga
+from imageRecopilator.Cloud.frescura import DetectorFrescura
+from imageRecopilator.Cloud.metadatos import IndiceDiario
+
+
+def ts(dia, hora, minuto=0):
+    return datetime(2026, 1, dia, hora, minuto).timestamp()
+
+
+@pytest.mark.imageRecopilator
+class TestBitacora:
+
+    def test_rota_el_dia_cerrado_a_npz(self, tmp_path):
+        bitacora = BitacoraCapturas(str(tmp_path), sufijo="p0")
+        bitacora.registrar("Temuco", ts(12, 10), "subida", 200, 120.0, 150_000)
+        bitacora.registrar("Temuco", ts(13, 10), "subida", 200, 80.0, 150_000)
+        assert bitacora.volcar() == 2
+        assert sorted(os.listdir(tmp_path)) == ["2026-01-12.p0.bin", "2026-01-13.p0.bin"]
+
+        bitacora.registrar("Osorno", ts(12, 23, 59), "error_s3", 200, 90.0, 1)   # subida tardía
+        bitacora.volcar()
+        assert bitacora.rotar(hoy="2026-01-13") == ["2026-01-12"]
+        bitacora.rotar(hoy="2026-01-13")                                          # repetido: sin cambios
+
+        assert sorted(os.listdir(tmp_path)) == ["2026-01-12.p0.npz", "2026-01-13.p0.bin"]
+        filas = modulo.cargar(str(tmp_path), datetime(2026, 1, 12), datetime(2026, 1, 13, 23))
+        assert list(filas["planta"]) == ["Temuco", "Osorno", "Temuco"]
+        assert list(filas["bytes"]) == [150_000, 1, 150_000]
+
+    def test_resumen_disponibilidad_frescura_y_latencia(self, tmp_path):
+        bitacora = BitacoraCapturas(str(tmp_path))
+        for minuto in range(0, 50, 10):
+            bitacora.registrar("Temuco", ts(12, 10, minuto), "subida", 200, 100.0 + minuto, 1000)
+        bitacora.registrar("Temuco", ts(12, 10, 55), "duplicada", 200, 100.0, 1000)
+        bitacora.registrar("Temuco", ts(12, 11, 0), "timeout")
+        bitacora.registrar("Temuco", ts(12, 11, 30), "subida", 200, 100.0, 1000)  # hueco de 50 min
+        bitacora.registrar("Temuco", ts(13, 9, 0), "subida", 200, 100.0, 1000)   # otro día: la noche no cuenta
+        bitacora.registrar("Osorno", ts(12, 10), "error_http", 503, 20.0)
+        bitacora.volcar()
+        bitacora.rotar(hoy="2026-01-13")
+
+        resumen = modulo.resumen(str(tmp_path), datetime(2026, 1, 12), datetime(2026, 1, 13, 23))
+        temuco = resumen["Temuco"]
+        assert temuco["intentos"] == 9
+        assert temuco["disponibilidad"] == round(8 / 9, 4)
+        assert temuco["resultados"] == {"subida": 7, "duplicada": 1, "timeout": 1}
+        assert temuco["frescura_s"]["max"] == 50 * 60
+        assert temuco["ultima_subida"] == "2026-01-13T09:00:00"
+        assert temuco["latencia_ms"]["p50"] == 105.0
+        assert resumen["Osorno"]["disponibilidad"] == 0.0 and resumen["Osorno"]["latencia_ms"] is None
+
+        solo = modulo.resumen(str(tmp_path), datetime(2026, 1, 12), datetime(2026, 1, 12, 23), plantas=["Osorno"])
+        assert list(solo) == ["Osorno"]
+
+
+def jpeg_prueba():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 36), (90, 120, 60)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_captura_y_subida_con_bitacora(tmp_path, monkeypatch):
+    cloud.inicializar()
+    mock_session = MagicMock()
+    mock_resp = AsyncMock()
+    mock_resp.status = 200
+    data = jpeg_prueba()
+
+    async def cuerpo():
+        yield data
+
+    mock_resp.content = MagicMock()
+    mock_resp.content.iter_any = cuerpo
+    mock_session.get.return_value.__aenter__.return_value = mock_resp
+
+    registro = BitacoraCapturas(str(tmp_path))
+    indice = IndiceDiario("bucket")
+    monkeypatch.setattr(cloud, "bitacora", registro)
+    monkeypatch.setattr(cloud, "indice_diario", indice)
+    monkeypatch.setattr(cloud, "cola_subida", asyncio.Queue(maxsize=10))
+    monkeypatch.setattr(cloud, "politica_carga", PoliticaCarga(10))
+    monkeypatch.setattr(cloud, "detector_frescura", DetectorFrescura())
+
+    class BreakLoop(Exception):
+        pass
+
+    # Dos ciclos con la misma imagen: el segundo es duplicado
+    with patch('imageRecopilator.Cloud.ImageRecompilerCloud.dentro_horario', return_value=True), \
+         patch('imageRecopilator.Cloud.ImageRecompilerCloud.metricas.imprimir_si_toca', new_callable=AsyncMock), \
+         patch('asyncio.sleep', side_effect=[None, BreakLoop()]):
+        with pytest.raises(BreakLoop):
+            await cloud.capturar_camara(mock_session, "Temuco", "ID_CAM")
+
+    s3 = AsyncMock()
+    gestor = clientes_s3.GestorClientesS3()
+    gestor.inyectar("s3", s3)
+    anterior = clientes_s3.configurar_gestor(gestor)
+    try:
+        worker = asyncio.create_task(cloud.worker_subida_s3(0))
+        await asyncio.wait_for(cloud.cola_subida.join(), timeout=5)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+    finally:
+        clientes_s3.configurar_gestor(anterior)
+
+    s3.put_object.assert_awaited_once()
+    key = s3.put_object.await_args.kwargs["Key"]
+    assert registro.volcar() == 2
+    filas = modulo.cargar(str(tmp_path), datetime(2000, 1, 1), datetime(2100, 1, 1))
+    assert sorted(modulo.RESULTADOS[r] for r in filas["resultado"]) == ["duplicada", "subida"]
+    assert set(filas["estado"]) == {200} and set(filas["bytes"]) == {len(data)}
+    # El uploader llega al índice lateral tras anotar la subida
+    assert [list(entradas) for entradas in indice.entradas.values()] == [[key]]
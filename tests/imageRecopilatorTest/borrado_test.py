@@ -0,0 +1,116 @@
+import sys
+import os
+import json
+import asyncio
+import pytest
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud.borrado import ServicioBorrado
+
+
+class S3Borrado:
+    """delete_objects en memoria; `rebeldes` falla N veces por key antes de borrarse"""
+
+    def __init__(self, keys, rebeldes=None):
+        self.objetos = set(keys)
+        self.rebeldes = dict(rebeldes or {})
+        self.etiquetas = {}
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.batches = []
+
+    async def delete_objects(self, Bucket, Delete):
+        self.en_vuelo += 1
+        self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        await asyncio.sleep(0.01)
+        self.en_vuelo -= 1
+        keys = [o['Key'] for o in Delete['Objects']]
+        self.batches.append(len(keys))
+        errores = []
+        for key in keys:
+            if self.rebeldes.get(key, 0) > 0:
+                self.rebeldes[key] -= 1
+                errores.append({'Key': key, 'Code': 'SlowDown'})
+            else:
+                self.objetos.discard(key)
+        return {'Errors': errores} if errores else {}
+
+    async def put_object_tagging(self, Bucket, Key, Tagging):
+        self.etiquetas[Key] = Tagging['TagSet']
+
+
+def keys(n):
+    return [f"capturas/2024/01/0{i % 6 + 1}/Temuco/{i:05d}.jpg" for i in range(n)]
+
+
+def auditoria(tmp_path):
+    with open(tmp_path / "auditoria.jsonl") as f:
+        return [json.loads(linea) for linea in f]
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_batches_concurrentes_y_reintento_por_key(tmp_path):
+    todas = keys(3500)
+    s3 = S3Borrado(todas, rebeldes={todas[7]: 2})
+    servicio = ServicioBorrado("b", s3=s3, concurrencia=3, dir_estado=str(tmp_path), espera_base=0.01)
+
+    assert servicio.encolar(todas) == 3500
+    assert await servicio.drenar(timeout=5)
+    await servicio.detener()
+
+    assert not s3.objetos
+    assert max(s3.batches) <= 1000
+    assert s3.max_en_vuelo > 1
+    assert servicio.borradas == 3500 and servicio.fallidas == 0
+    registros = auditoria(tmp_path)
+    assert sum(len(r["keys"]) for r in registros) == 3500
+    assert any(r["intento"] == 2 and r["keys"] == [todas[7]] for r in registros)
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_fallidas_quedan_en_diario_y_se_retoman(tmp_path):
+    todas = keys(10)
+    s3 = S3Borrado(todas, rebeldes={todas[0]: 99})
+    servicio = ServicioBorrado("b", s3=s3, dir_estado=str(tmp_path), reintentos=1, espera_base=0.01)
+    servicio.encolar(todas)
+    await servicio.detener(timeout=5)
+
+    assert s3.objetos == {todas[0]}
+    assert servicio.fallidas == 1
+    assert auditoria(tmp_path)[-1]["resultado"] == "fallido"
+
+    # Próximo inicio: la key huérfana vuelve a la cola sin que nadie la encole
+    s3.rebeldes.clear()
+    segundo = ServicioBorrado("b", s3=s3, dir_estado=str(tmp_path), espera_base=0.01).iniciar()
+    assert segundo.pendientes == {todas[0]}
+    await segundo.detener(timeout=5)
+    assert not s3.objetos
+    assert ServicioBorrado("b", s3=s3, dir_estado=str(tmp_path))._recuperar_pendientes() == set()
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_modo_etiquetar_no_borra(tmp_path):
+    todas = keys(5)
+    s3 = S3Borrado(todas)
+    servicio = ServicioBorrado("b", s3=s3, modo="etiquetar", dir_estado=str(tmp_path))
+    servicio.encolar(todas)
+    await servicio.detener(timeout=5)
+
+    assert s3.objetos == set(todas)
+    assert set(s3.etiquetas) == set(todas)
+    assert auditoria(tmp_path)[0]["accion"] == "etiquetar"
+
+
+@pytest.mark.imageRecopilator
+def test_modo_invalido(tmp_path):
+    with pytest.raises(ValueError):
+        ServicioBorrado("b", modo="archivar", dir_estado=str(tmp_path))
@@ -0,0 +1,91 @@
+import sys
+import os
+import io
+import pytest
+from unittest.mock import MagicMock
+from PIL import Image
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import buffers
+
+
+def jpeg():
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 180), (10, 120, 200)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def respuesta(data, chunk=1000):
+    async def iter_any():
+        for i in range(0, len(data), chunk):
+            yield data[i:i + chunk]
+
+    resp = MagicMock()
+    resp.content.iter_any = iter_any
+    return resp
+
+
+@pytest.mark.imageRecopilator
+class TestBuffers:
+
+    def test_pillow_lee_y_escribe_en_slots(self):
+        entrada = buffers.SlotBuffer(64 * 1024)
+        entrada.write(jpeg())
+
+        img = Image.open(buffers.LectorMemoria(entrada.vista()))
+        salida = buffers.SlotBuffer(64 * 1024)
+        img.save(salida, format="JPEG", quality=50)
+
+        assert Image.open(io.BytesIO(bytes(salida.vista()))).size == (320, 180)
+        assert salida.desborde is None
+
+    def test_desborde_conserva_los_datos(self):
+        slot = buffers.SlotBuffer(10)
+        slot.write(b"0123456789")
+        slot.write(b"abc")
+        assert bytes(slot.vista()) == b"0123456789abc"
+        assert slot.desborde is not None
+
+    def test_lector_memoria_seek(self):
+        lector = buffers.LectorMemoria(memoryview(b"abcdef"))
+        lector.seek(-2, io.SEEK_END)
+        assert lector.read() == b"ef"
+        lector.seek(1)
+        assert lector.read(2) == b"bc"
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_pool_reutiliza_slots():
+    pool = buffers.PoolBuffers(1, 4096)
+    data = jpeg()
+
+    slot = await pool.tomar()
+    assert await slot.leer_respuesta(respuesta(data)) == len(data)
+    assert bytes(slot.vista()) == data
+    assert pool.en_uso() == 1
+
+    pool.liberar(slot)
+    otro = await pool.tomar()
+    assert otro is slot
+    assert otro.largo == 0
+    assert pool.desbordes == 0
+
+
+@pytest.mark.imageRecopilator
+def test_benchmark_mide_cada_camino_en_su_proceso():
+    from imageRecopilator.Cloud import benchmarks
+
+    resultado = benchmarks.bench_buffers(frames=2)
+    for camino in benchmarks.CAMINOS_BUFFERS:
+        medicion = resultado[camino]
+        assert medicion["max_rss_kb"] > 0 and medicion["pico_tracemalloc_kb"] > 0
+    # El pico de RSS se reinicia antes de medir: no arrastra la preparación (frame sintético)
+    if benchmarks.reiniciar_pico_rss():
+        assert all(resultado[c]["rss_incremento_kb"] is not None for c in benchmarks.CAMINOS_BUFFERS)
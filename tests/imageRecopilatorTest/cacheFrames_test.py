@@ -0,0 +1,101 @@
+import sys
+import os
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud.cache_frames import CacheFrames
+from imageRecopilator.Cloud import pipeline_domingo as pipeline
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        self.ahora += 1
+        return self.ahora
+
+
+def frame(i, etag="e1"):
+    return {"key": f"capturas/2026/01/13/Temuco/TMU_{i:04d}.jpg", "etag": f'"{etag}"'}
+
+
+def s3_falso():
+    s3 = MagicMock()
+    s3.gets = []
+
+    async def get_object(Bucket, Key):
+        s3.gets.append(Key)
+        await asyncio.sleep(0)
+        body = AsyncMock()
+        body.read.return_value = Key.encode()
+        return {"Body": body}
+
+    s3.get_object = get_object
+    return s3
+
+
+@pytest.mark.imageRecopilator
+class TestCacheFrames:
+
+    def test_guarda_y_lee_por_key_y_etag(self, tmp_path):
+        cache = CacheFrames(str(tmp_path))
+        assert cache.guardar_varios([(frame(1), b"uno"), (frame(2), b"dos"), ({"key": "sin_etag"}, b"x")]) == 2
+        assert cache.obtener_varios([frame(2), frame(1), frame(3)]) == [b"dos", b"uno", None]
+        assert cache.obtener(frame(1, etag="otro")) is None          # el objeto cambió en S3
+
+        otro = CacheFrames(str(tmp_path))                               # otro proceso, mismo disco
+        assert otro.obtener(frame(1)) == b"uno"
+        resumen = cache.resumen()
+        assert resumen["aciertos"] == 2 and resumen["fallos"] == 2 and resumen["tasa_aciertos"] == 0.5
+
+    def test_expulsa_el_segmento_menos_usado(self, tmp_path):
+        kb = 1 / 1024
+        cache = CacheFrames(str(tmp_path), max_mb=5 * kb, segmento_mb=2 * kb, reloj=Reloj())
+        datos = b"x" * 1024
+        cache.guardar_varios([(frame(1), datos), (frame(2), datos)])   # segmento A
+        cache.guardar_varios([(frame(3), datos), (frame(4), datos)])   # segmento B
+        cache.obtener(frame(1))                                         # A pasa a ser el más reciente
+        cache.guardar_varios([(frame(5), datos), (frame(6), datos)])   # C: 6KB > 5KB, sale B
+
+        assert cache.expulsados == 1 and cache.tamaño() <= 5 * 1024
+        assert cache.obtener_varios([frame(1), frame(3), frame(5)]) == [datos, None, datos]
+        assert len([n for n in os.listdir(tmp_path) if n.endswith(".bin")]) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_segunda_pasada_no_descarga(tmp_path):
+    cache = CacheFrames(str(tmp_path))
+    imagenes = [frame(i) for i in range(6)]
+    s3 = s3_falso()
+
+    primera = [d async for _, d in pipeline.descargar_en_orden(s3, "bucket", imagenes, ventana=2, cache=cache)]
+    segunda = [d async for _, d in pipeline.descargar_en_orden(s3, "bucket", imagenes, ventana=2, cache=cache)]
+
+    assert primera == segunda == [img["key"].encode() for img in imagenes]
+    assert len(s3.gets) == 6
+    assert cache.resumen()["aciertos"] == 6
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_pipeline_cuenta_solo_gets_reales(tmp_path):
+    cache = CacheFrames(str(tmp_path))
+    imagenes = [frame(i) for i in range(6)]
+    s3 = s3_falso()
+    p = pipeline.PipelineDomingo("bucket", cache=cache).registrar(pipeline.Etapa)
+
+    await p.procesar(s3, "Temuco", imagenes, {})
+    assert p.descargas == 6 and p.bytes_descargados == sum(len(img["key"]) for img in imagenes)
+
+    await p.procesar(s3, "Temuco", imagenes, {})                    # todo desde la cache
+    assert p.descargas == 6 and len(s3.gets) == 6
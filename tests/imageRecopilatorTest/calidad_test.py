@@ -0,0 +1,107 @@
+import sys
+import os
+import io
+import pytest
+import numpy as np
+from datetime import datetime, time, timedelta
+from PIL import Image
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud.calidad import ControladorCalidad
+
+LUNES_10 = datetime(2024, 1, 1, 10, 0)
+HORAS = {"Temuco": {"semana": (time(9, 0), time(11, 0)), "sabado": (time(9, 0), time(10, 0))}}
+
+
+def jpeg(semilla, ruido=40, calidad=95):
+    rng = np.random.default_rng(semilla)
+    gradiente = np.linspace(0, 200, 640, dtype=np.float32)[None, :, None]
+    pixeles = np.clip(gradiente + rng.normal(0, ruido, (360, 640, 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixeles).save(buffer, format="JPEG", quality=calidad)
+    return buffer.getvalue()
+
+
+def comprimir(controlador, planta, data):
+    calidad = controlador.calidad(planta, data)
+    buffer = io.BytesIO()
+    Image.open(io.BytesIO(data)).save(buffer, format="JPEG", quality=calidad, optimize=True)
+    controlador.registrar(planta, buffer.tell(), calidad)
+    return calidad, buffer.tell()
+
+
+class Reloj:
+    def __init__(self, ahora):
+        self.ahora = ahora
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.mark.imageRecopilator
+class TestControladorCalidad:
+
+    def test_sin_presupuesto_usa_calidad_fija(self):
+        controlador = ControladorCalidad(0, horas=HORAS, calidad_fija=80)
+        assert controlador.calidad("Temuco", jpeg(0)) == 80
+        assert controlador.sondeos == 0
+
+    def test_escena_simple_recibe_mas_calidad(self):
+        reloj = Reloj(LUNES_10)
+        controlador = ControladorCalidad(2, {"Plana": 2}, horas=dict(HORAS, Plana=HORAS["Temuco"]), reloj=reloj)
+        compleja, _ = comprimir(controlador, "Temuco", jpeg(0, ruido=60))
+        simple, _ = comprimir(controlador, "Plana", jpeg(0, ruido=2))
+        assert simple > compleja
+
+    def test_cache_por_hora_y_resondeo(self):
+        reloj = Reloj(LUNES_10)
+        controlador = ControladorCalidad(3, horas=HORAS, reloj=reloj, resondeo=10, tolerancia=10)
+        for i in range(10):
+            comprimir(controlador, "Temuco", jpeg(i))
+        sondeos = controlador.sondeos
+        assert 0 < sondeos <= 6                      # una búsqueda binaria sobre 40..90
+
+        comprimir(controlador, "Temuco", jpeg(10))   # agotó el cache: busca de nuevo
+        assert controlador.sondeos > sondeos
+
+        reloj.ahora = LUNES_10 + timedelta(hours=1)  # otra hora, otra entrada
+        sondeos = controlador.sondeos
+        comprimir(controlador, "Temuco", jpeg(11))
+        assert controlador.sondeos > sondeos
+
+    def test_cumple_presupuesto_diario(self):
+        reloj = Reloj(datetime(2024, 1, 6, 9, 0))    # sábado: 60 frames esperados
+        frames = [jpeg(i) for i in range(60)]
+        presupuesto = 60 * 55 * 1024
+        controlador = ControladorCalidad(presupuesto / 1024 / 1024, horas=HORAS, reloj=reloj)
+        assert controlador.frames_esperados("Temuco", reloj()) == 60
+
+        total = 0
+        for i, data in enumerate(frames):
+            reloj.ahora = datetime(2024, 1, 6, 9, i)
+            total += comprimir(controlador, "Temuco", data)[1]
+
+        assert 0.7 * presupuesto <= total <= 1.1 * presupuesto
+        assert controlador.resumen()["Temuco"]["frames"] == 60
+
+    def test_domingo_usa_su_horario(self):
+        domingo = datetime(2024, 1, 7, 9, 30)
+        horas = dict(HORAS, Osorno=dict(HORAS["Temuco"], domingo=(time(9, 0), time(10, 0))))
+        controlador = ControladorCalidad(1, horas=horas)
+        assert controlador.frames_esperados("Osorno", domingo) == 60
+        assert controlador.frames_esperados("Temuco", domingo) == 1      # no captura los domingos
+
+    def test_consumo_se_reinicia_cada_dia(self):
+        reloj = Reloj(LUNES_10)
+        controlador = ControladorCalidad(1, horas=HORAS, reloj=reloj)
+        comprimir(controlador, "Temuco", jpeg(0))
+        assert controlador.resumen()["Temuco"]["bytes"] > 0
+        reloj.ahora = LUNES_10 + timedelta(days=1)
+        controlador.objetivo("Temuco")
+        assert controlador.resumen()["Temuco"]["bytes"] == 0
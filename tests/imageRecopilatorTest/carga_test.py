@@ -0,0 +1,148 @@
+import sys
+import os
+import asyncio
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import carga
+from imageRecopilator.Cloud.buffers import PoolBuffers
+from imageRecopilator.Cloud.carga import PoliticaCarga
+from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+
+
+@pytest.mark.imageRecopilator
+class TestPoliticaCarga:
+
+    def test_niveles_por_ocupacion(self):
+        politica = PoliticaCarga(10)
+        assert politica.actualizar(2) == carga.NORMAL
+        assert politica.reduccion_calidad() == 0 and politica.factor_intervalo() == 1.0
+
+        assert politica.actualizar(5) == carga.PRESION
+        assert politica.reduccion_calidad() == 15 and politica.factor_intervalo() == 1.0
+
+        assert politica.actualizar(8) == carga.ALTA
+        assert politica.factor_intervalo() == 2.0
+        assert politica.actualizar(10) == carga.SATURADA
+        assert politica.actualizar(0) == carga.NORMAL
+
+    def test_descarta_por_prioridad(self):
+        politica = PoliticaCarga(10, prioridades={"Temuco": 2, "Yumbel": 0})
+        politica.actualizar(8)                                        # alta: entra prioridad >= 1
+        assert not politica.descartar("Osorno", activo=False)
+        assert not politica.descartar("Yumbel", activo=True)
+        assert politica.descartar("Yumbel", activo=False)
+
+        politica.actualizar(10)                                       # saturada: entra prioridad >= 2
+        assert not politica.descartar("Osorno", activo=True)          # planta por defecto con actividad
+        assert politica.descartar("Osorno", activo=False)
+        assert politica.descartar("Yumbel", activo=True)
+        assert not politica.descartar("Temuco", activo=False)
+
+        politica.registrar_descarte("Osorno", "prioridad")
+        politica.registrar_descarte("Osorno", "cola_llena")
+        assert politica.resumen() == {"Osorno": {"prioridad": 1, "cola_llena": 1}}
+        assert politica.total_descartados() == 2
+
+
+class ColaLlena:
+    """Cola siempre llena que anota cuántos cupos de descarga había libres al intentar encolar"""
+    def __init__(self):
+        self.cupos_libres = []
+
+    def qsize(self):
+        return 1
+
+    async def put(self, item):
+        self.cupos_libres.append(cloud.SEM_DESCARGAS._value)
+        await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+@pytest.mark.parametrize("planta,prioridad,motivo", [("Temuco", 0, "prioridad"), ("Osorno", 1, "cola_llena")])
+async def test_cola_llena_no_retiene_el_cupo_de_descarga(monkeypatch, planta, prioridad, motivo):
+    cloud.inicializar()
+    mock_session = MagicMock()
+    mock_resp = AsyncMock()
+    mock_resp.status = 200
+
+    async def cuerpo():
+        yield b"bytes_de_camara"
+
+    mock_resp.content = MagicMock()
+    mock_resp.content.iter_any = cuerpo
+    mock_session.get.return_value.__aenter__.return_value = mock_resp
+
+    cola = ColaLlena()
+    politica = PoliticaCarga(1, prioridades={planta: prioridad}, config={"espera_cola": 0.05})
+    monkeypatch.setattr(cloud, "cola_subida", cola)
+    monkeypatch.setattr(cloud, "politica_carga", politica)
+    monkeypatch.setattr(cloud, "bitacora", None)
+
+    class BreakLoop(Exception):
+        pass
+
+    with patch('imageRecopilator.Cloud.ImageRecompilerCloud.dentro_horario', return_value=True), \
+         patch('imageRecopilator.Cloud.ImageRecompilerCloud.recomprimir_jpeg', return_value=b"jpeg_nuevo"), \
+         patch('imageRecopilator.Cloud.ImageRecompilerCloud.metricas.imprimir_si_toca', new_callable=AsyncMock), \
+         patch('asyncio.sleep', side_effect=BreakLoop()):
+        with pytest.raises(BreakLoop):
+            await cloud.capturar_camara(mock_session, planta, "ID_CAM")
+
+    assert politica.nivel == carga.SATURADA
+    assert politica.resumen() == {planta: {motivo: 1}}
+    # Al encolar, el cupo de descarga ya estaba devuelto
+    assert cola.cupos_libres == ([cloud.MAX_DESCARGAS_SIMULTANEAS] if motivo == "cola_llena" else [])
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_recompresiones_en_curso_no_frenan_descargas(monkeypatch):
+    cloud.inicializar()
+    assert cloud.pool_entrada.total == cloud.MAX_DESCARGAS_SIMULTANEAS + cloud.HILOS_RECOMPRESION
+
+    # Un cupo de descarga y el pool dimensionado como en inicializar()
+    monkeypatch.setattr(cloud, "SEM_DESCARGAS", asyncio.Semaphore(1))
+    monkeypatch.setattr(cloud, "pool_entrada", PoolBuffers(1 + cloud.HILOS_RECOMPRESION, 1024))
+    monkeypatch.setattr(cloud, "bitacora", None)
+
+    mock_session = MagicMock()
+    mock_resp = AsyncMock()
+    mock_resp.status = 200
+
+    async def cuerpo():
+        yield b"bytes_de_camara"
+
+    mock_resp.content = MagicMock()
+    mock_resp.content.iter_any = cuerpo
+    mock_session.get.return_value.__aenter__.return_value = mock_resp
+
+    liberar = asyncio.Event()
+    recomprimiendo = []
+
+    async def recomprimir_lento(data, destino=None, planta=None):
+        recomprimiendo.append(planta)
+        await liberar.wait()
+        return b"jpeg_nuevo"
+
+    plantas = [f"Planta{i}" for i in range(cloud.HILOS_RECOMPRESION + 1)]
+    with patch('imageRecopilator.Cloud.ImageRecompilerCloud.dentro_horario', return_value=True), \
+         patch('imageRecopilator.Cloud.ImageRecompilerCloud.recomprimir_jpeg', side_effect=recomprimir_lento):
+        tareas = [asyncio.create_task(cloud.capturar_camara(mock_session, p, f"CAM_{p}")) for p in plantas]
+        for _ in range(50):
+            await asyncio.sleep(0)
+        # Con HILOS_RECOMPRESION frames recomprimiéndose, otra cámara todavía descarga
+        assert mock_session.get.call_count == len(plantas)
+        assert sorted(recomprimiendo) == plantas
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+    assert cloud.pool_entrada.en_uso() == 0
@@ -0,0 +1,51 @@
+import sys
+import os
+import argparse
+import pytest
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator import cli
+from imageRecopilator.Cloud import render
+
+
+@pytest.mark.imageRecopilator
+class TestCli:
+
+    def test_cpus_y_semana(self):
+        assert cli._cpus("0-2,5") == {0, 1, 2, 5}
+        assert cli._semana("2026-w03") == (2026, 3)
+        with pytest.raises(argparse.ArgumentTypeError):
+            cli._semana("2026-03")
+        assert cli._semana("2026-W53") == (2026, 53)                  # semanas ISO
+        with pytest.raises(argparse.ArgumentTypeError):
+            cli._semana("2025-W53")
+        with pytest.raises(argparse.ArgumentTypeError):
+            cli._cpus("a-b")
+
+    def test_render_recibe_sus_argumentos(self, monkeypatch):
+        recibidos, limites = [], []
+        monkeypatch.setattr(render, "main", lambda argv: recibidos.append(argv))
+        monkeypatch.setattr(cli, "aplicar_limites", lambda *a: limites.append(a))
+
+        argv = ["render", "--nice", "3", "Temuco", "--desde", "2026-01-05", "--hasta", "2026-01-06"]
+        assert cli.main(argv) == 0
+        assert recibidos == [["Temuco", "--desde", "2026-01-05", "--hasta", "2026-01-06"]]
+        assert limites == [(3, None, None, 3)]
+
+    def test_process_corre_con_menor_prioridad(self, monkeypatch):
+        limites = []
+        monkeypatch.setattr(cli, "aplicar_limites", lambda *a: limites.append(a))
+        monkeypatch.setattr(cli, "process", lambda args, resto: args.semana)
+
+        assert cli.main(["process", "--semana", "2026-W03", "--cpus", "1"]) == (2026, 3)
+        assert limites == [(10, {1}, None, 3)]
+
+    def test_capture_rechaza_argumentos_extra(self):
+        with pytest.raises(SystemExit):
+            cli.main(["capture", "--desconocido"])
@@ -0,0 +1,75 @@
+import sys
+import os
+import pytest
+from unittest.mock import AsyncMock
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import clientes_s3
+
+
+@pytest.fixture(autouse=True)
+def credenciales_falsas(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_un_cliente_por_servicio_y_proceso():
+    gestor = clientes_s3.GestorClientesS3(max_conexiones=32, endpoint_url="http://localhost:9000")
+    try:
+        async with gestor.s3() as primero:
+            pass
+        async with gestor.s3() as segundo:
+            pass
+        assert primero is segundo
+        assert primero.meta.endpoint_url == "http://localhost:9000"
+        assert gestor.config.max_pool_connections == 32
+    finally:
+        await gestor.cerrar()
+    assert not gestor._clientes
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_gestor_inyectable():
+    falso = AsyncMock()
+    gestor = clientes_s3.GestorClientesS3()
+    gestor.inyectar("s3", falso)
+    anterior = clientes_s3.configurar_gestor(gestor)
+    try:
+        async with clientes_s3.gestor_s3().s3() as s3:
+            await s3.put_object(Bucket="b", Key="k", Body=b"x")
+        falso.put_object.assert_awaited_once()
+    finally:
+        clientes_s3.configurar_gestor(anterior)
+
+
+@pytest.mark.imageRecopilator
+def test_cada_event_loop_recibe_su_cliente():
+    # correr() / correr_virtual abren un loop por corrida: el cliente del primero ya no sirve
+    import asyncio
+    gestor = clientes_s3.GestorClientesS3(endpoint_url="http://localhost:9000")
+    falso = AsyncMock()
+    gestor.inyectar("sts", falso)
+
+    async def pedir(cerrar=False):
+        s3 = await gestor.cliente("s3")
+        resultado = s3, await gestor.cliente("s3"), await gestor.cliente("sts")
+        if cerrar:
+            await gestor.cerrar()
+        return resultado
+
+    primero, mismo, sts1 = asyncio.run(pedir())
+    segundo, _, sts2 = asyncio.run(pedir(cerrar=True))
+    assert primero is mismo
+    assert segundo is not primero
+    assert sts1 is sts2 is falso                      # los inyectados no dependen del loop
+    assert not gestor._clientes
@@ -0,0 +1,86 @@
+import sys
+import os
+import io
+import pytest
+from PIL import Image
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import codificador
+from imageRecopilator.Cloud.pipeline_domingo import EtapaTimelapse
+
+
+@pytest.fixture(autouse=True)
+def entorno_limpio(monkeypatch):
+    for variable in ("TIMELAPSE_PERFIL", "TIMELAPSE_FPS", "TIMELAPSE_CODEC", "TIMELAPSE_EXT",
+                     "TIMELAPSE_THREADS", "TIMELAPSE_DECIMAR"):
+        monkeypatch.delenv(variable, raising=False)
+
+
+@pytest.mark.imageRecopilator
+class TestCodificador:
+
+    def test_perfil_default_conserva_parametros_historicos(self):
+        [comando] = codificador.comandos_ffmpeg(codificador.perfil_desde_entorno(), "in/*.jpg", "out.mp4")
+        texto = " ".join(comando)
+        assert "-framerate 30" in texto
+        assert "-c:v libx264 -preset fast" in texto
+        assert "-crf 28" in texto
+        assert "-tune stillimage" in texto
+        assert comando[-1] == "out.mp4"
+
+    def test_stillimage_solo_donde_existe(self, monkeypatch):
+        monkeypatch.setenv("TIMELAPSE_CODEC", "libx265")
+        perfil = dict(codificador.perfil_desde_entorno("rapido"))
+        [comando] = codificador.comandos_ffmpeg(perfil, "in/*.jpg", "out.mp4")
+        assert "-tune" not in comando
+        assert "hvc1" in comando
+
+    def test_dos_pasadas_con_bitrate(self):
+        perfil = dict(codificador.perfil_desde_entorno("tamano"), bitrate="800k")
+        primera, segunda = codificador.comandos_ffmpeg(perfil, "in/*.jpg", "out.mp4")
+        assert "pass=1" in " ".join(primera) and primera[-1] == os.devnull
+        assert "pass=2" in " ".join(segunda) and segunda[-1] == "out.mp4"
+        assert "-crf" not in segunda
+
+    def test_escala(self):
+        perfil = dict(codificador.perfil_desde_entorno(), escala="640:-2")
+        [comando] = codificador.comandos_ffmpeg(perfil, "in/*.jpg", "out.mp4")
+        assert "-vf scale=640:-2" in " ".join(comando)
+
+    def test_overrides_del_entorno(self, monkeypatch):
+        monkeypatch.setenv("TIMELAPSE_PERFIL", "archivo")
+        monkeypatch.setenv("TIMELAPSE_FPS", "24")
+        monkeypatch.setenv("TIMELAPSE_EXT", "mkv")
+        monkeypatch.setenv("TIMELAPSE_DECIMAR", "3")
+        perfil = codificador.perfil_desde_entorno()
+        assert (perfil["codec"], perfil["fps"], perfil["ext"], perfil["decimar"]) == ("libsvtav1", 24, "mkv", 3)
+
+    def test_perfil_desconocido(self, monkeypatch):
+        monkeypatch.setenv("TIMELAPSE_PERFIL", "ultra")
+        with pytest.raises(ValueError):
+            codificador.perfil_desde_entorno()
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_decimacion_en_etapa_timelapse():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 36)).save(buffer, format="JPEG")
+    # Perfil de dos pasadas: los frames van a disco y ffmpeg recién corre al finalizar
+    perfil = dict(codificador.perfil_desde_entorno(), decimar=3, bitrate="500k")
+
+    etapa = EtapaTimelapse("bucket", perfil=perfil)
+    await etapa.iniciar("Temuco", {})
+    try:
+        for i in range(7):
+            await etapa.consumir("Temuco", {"key": f"k{i}", "data": buffer.getvalue(), "ts": i}, {})
+        assert etapa.frames_validos == 3
+        assert len(os.listdir(etapa.tmpdir)) == 3
+    finally:
+        await etapa.abortar("Temuco", {})
@@ -0,0 +1,85 @@
+import sys
+import os
+import io
+import tarfile
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import compactacion
+from imageRecopilator.Cloud import pipeline_domingo as pipeline
+
+
+FRAMES = [
+    (f"capturas/2026/01/13/Temuco/TMU_20260113_10{m:02d}00.jpg", bytes([m]) * (700 + m * 300))
+    for m in range(5)
+]
+
+
+def shard():
+    destino = io.BytesIO()
+    indice = compactacion.construir_shard(FRAMES, destino)
+    return destino.getvalue(), indice
+
+
+@pytest.mark.imageRecopilator
+class TestShards:
+
+    def test_indice_apunta_a_los_bytes_de_cada_frame(self):
+        contenido, indice = shard()
+        for (key, data), entrada in zip(FRAMES, indice):
+            assert entrada["key"] == key
+            assert contenido[entrada["offset"]:entrada["offset"] + entrada["size"]] == data
+
+    def test_shard_es_tar_estandar(self):
+        contenido, _ = shard()
+        with tarfile.open(fileobj=io.BytesIO(contenido)) as tar:
+            assert len(tar.getnames()) == len(FRAMES)
+
+    def test_agrupa_frames_contiguos_en_un_rango(self):
+        _, indice = shard()
+        imagenes = [dict(f, shard="s.tar", indice="s.json") for f in indice]
+        imagenes.insert(2, {"key": "suelto.jpg"})
+
+        peticiones = pipeline.agrupar_peticiones(imagenes)
+        assert [len(grupo) for _, grupo in peticiones] == [2, 1, 3]
+
+        peticiones = pipeline.agrupar_peticiones(imagenes, max_bytes=1500)
+        assert all(len(grupo) == 1 for _, grupo in peticiones)
+
+    def test_keys_borrables_solo_shards_completos(self):
+        _, indice = shard()
+        imagenes = [dict(f, shard="s.tar", indice="s.json") for f in indice] + [{"key": "suelto.jpg"}]
+        todas = [img["key"] for img in imagenes]
+
+        assert set(compactacion.keys_borrables(imagenes, todas)) == {"suelto.jpg", "s.tar", "s.json"}
+        assert compactacion.keys_borrables(imagenes, todas[1:]) == ["suelto.jpg"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_lectura_por_rango_desde_shard():
+    contenido, indice = shard()
+    s3 = MagicMock()
+    s3.peticiones = []
+
+    async def get_object(Bucket, Key, Range=None):
+        s3.peticiones.append((Key, Range))
+        inicio, fin = map(int, Range[len("bytes="):].split("-"))
+        body = AsyncMock()
+        body.read.return_value = contenido[inicio:fin + 1]
+        return {"Body": body}
+
+    s3.get_object = get_object
+    imagenes = [dict(f, shard="s.tar", indice="s.json") for f in indice]
+
+    recibidos = [(k, d) async for k, d in pipeline.descargar_en_orden(s3, "bucket", imagenes)]
+
+    assert recibidos == FRAMES
+    assert len(s3.peticiones) == 1
@@ -0,0 +1,77 @@
+import sys
+import os
+import io
+import pytest
+import numpy as np
+from datetime import datetime
+from PIL import Image
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import conteo
+
+
+def jpeg(autos=0):
+    img = Image.new("RGB", (640, 360), (40, 40, 40))
+    for i in range(autos):
+        img.paste((230, 230, 230), (20 + i * 150, 200, 140 + i * 150, 300))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+@pytest.mark.imageRecopilator
+class TestMotorConteo:
+
+    def test_timestamp_desde_key(self):
+        ts = conteo.timestamp_desde_nombre("capturas/2026/01/17/Temuco/TMU_20260117_093000.jpg")
+        assert ts == int(datetime(2026, 1, 17, 9, 30).timestamp())
+        assert conteo.timestamp_desde_nombre("manifest.json") is None
+
+    def test_mascara_roi(self):
+        mascara = conteo.mascara_roi([(0, 0.5), (1, 0.5), (1, 1), (0, 1)], (100, 50))
+        assert mascara.shape == (50, 100)
+        assert not mascara[0].any()
+        assert mascara[-1].all()
+
+    def test_conteo_por_lotes(self):
+        motor = conteo.MotorConteo(config_default={"tamano_lote": 4, "ocupacion_por_vehiculo": 0.05})
+        base = int(datetime(2026, 1, 13, 10, 0).timestamp())
+
+        # Fondo vacío dominante y luego frames con 2 autos
+        for i in range(8):
+            motor.agregar("Temuco", base + i * 60, jpeg(0))
+        for i in range(3):
+            motor.agregar("Temuco", base + 3600 + i * 60, jpeg(2))
+
+        serie = motor.serie("Temuco")
+        assert len(serie["timestamp"]) == 11
+        assert serie["conteo"][:8].max() == 0
+        assert serie["conteo"][8:].min() >= 1
+
+        resumen = motor.resumen_por_hora(serie)
+        assert len(resumen["hora"]) == 2
+        assert resumen["flujo"][1] >= 1
+
+    def test_exportar_npz_columnar(self):
+        motor = conteo.MotorConteo()
+        base = int(datetime(2026, 1, 13, 10, 0).timestamp())
+        for i in range(3):
+            motor.agregar("Temuco", base + i * 60, jpeg(i % 2))
+
+        with np.load(io.BytesIO(motor.exportar_npz("Temuco"))) as npz:
+            assert set(["timestamp", "ocupacion", "conteo", "hora", "hora_flujo"]) <= set(npz.files)
+            assert len(npz["timestamp"]) == 3
+
+
+    def test_ventana_del_domingo(self):
+        horarios = {"semana": ["07:00", "18:00"], "sabado": ["08:00", "13:00"]}
+        domingo = int(datetime(2026, 1, 18, 10, 0).timestamp())
+        assert not conteo.dentro_de_ventana(domingo, horarios)
+        assert conteo.dentro_de_ventana(domingo, dict(horarios, domingo=["09:00", "13:00"]))
+        assert not conteo.dentro_de_ventana(domingo + 4 * 3600, dict(horarios, domingo=["09:00", "13:00"]))
@@ -0,0 +1,64 @@
+import sys
+import os
+import io
+import pytest
+from PIL import Image, ImageDraw
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud.frescura import DetectorFrescura
+
+
+def jpeg(hora, auto=None):
+    """Escena fija con la hora dibujada arriba (overlay) y opcionalmente un auto"""
+    img = Image.new("RGB", (640, 360), (90, 110, 90))
+    dibujo = ImageDraw.Draw(img)
+    dibujo.rectangle((0, 0, 640, 30), fill=(0, 0, 0))
+    dibujo.text((10, 8), f"2026-01-13 {hora}", fill=(255, 255, 255))
+    if auto is not None:
+        dibujo.rectangle((auto, 200, auto + 120, 280), fill=(200, 30, 30))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+@pytest.mark.imageRecopilator
+class TestDetectorFrescura:
+
+    def test_overlay_redibujado_no_oculta_el_congelamiento(self):
+        detector = DetectorFrescura(config_default={"ventana": 3})
+        resultados = [detector.evaluar("Temuco", jpeg(f"10:0{m}:00")) for m in range(6)]
+        # La ventana (3) se llena con la referencia y 2 iguales; desde el siguiente igual, congelada
+        assert resultados == [False, False, False, True, True, True]
+        assert detector.congelada("Temuco") and detector.resumen() == {"Temuco": 3}
+
+        # Vuelve el movimiento: fresca otra vez y la ventana se reinicia
+        assert detector.evaluar("Temuco", jpeg("10:06:00", auto=100)) is False
+        assert not detector.congelada("Temuco")
+
+    def test_escena_con_movimiento_no_se_congela(self):
+        detector = DetectorFrescura(config_default={"ventana": 2})
+        for i, x in enumerate((0, 150, 300, 450, 150, 0)):
+            assert detector.evaluar("Temuco", jpeg(f"10:0{i}:00", auto=x)) is False
+
+    def test_mismo_md5_cuenta_como_igual(self):
+        detector = DetectorFrescura(config_default={"ventana": 2})
+        assert detector.repetir("Temuco") is False                      # sin referencia
+        detector.evaluar("Temuco", jpeg("10:00:00"))
+        assert [detector.repetir("Temuco") for _ in range(3)] == [False, True, True]
+
+    def test_mascara_por_planta(self):
+        # Osorno enmascara la zona del auto (p. ej. un reloj grande): el movimiento ahí no cuenta
+        detector = DetectorFrescura(config_por_planta={"Osorno": {"mascara": [(0.0, 0.5, 1.0, 0.8)], "ventana": 2}})
+        resultados = [detector.evaluar("Osorno", jpeg("10:00:00", auto=x)) for x in (0, 150, 300, 450)]
+        assert resultados == [False, False, True, True]
+        assert not detector.congelada("Temuco")
+
+    def test_deshabilitado(self):
+        detector = DetectorFrescura(config_default={"habilitado": False, "ventana": 1})
+        assert not any(detector.evaluar("Temuco", jpeg("10:00:00")) for _ in range(4))
@@ -2,6 +2,7 @@ import sys
 import os
 import pytest
 import asyncio
+from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock, AsyncMock
 
 # --- CONFIGURACIÓN DE ENTORNO ---
@@ -11,7 +12,13 @@ project_root = os.path.abspath(os.path.join(current_dir, "../../"))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from imageRecopilator.Local import imageRecompilerCloud as cloud
+from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+
+
+@pytest.fixture(autouse=True)
+def estado_proceso():
+    # Colas, pools y métricas se crean en inicializar(), no al importar
+    cloud.inicializar()
 
 
 @pytest.mark.imageRecopilator
@@ -48,15 +55,22 @@ async def test_capturar_camara_ignora_duplicados():
     mock_resp = AsyncMock()
     mock_resp.status = 200
     mock_resp.read.return_value = b"bytes_estaticos"
+
+    async def cuerpo():
+        yield b"bytes_estaticos"
+
+    # El cuerpo se copia por streaming al slot del pool (buffers.SlotBuffer)
+    mock_resp.content = MagicMock()
+    mock_resp.content.iter_any = cuerpo
     mock_session.get.return_value.__aenter__.return_value = mock_resp
 
     class BreakLoop(Exception):
         pass
 
-    with patch('imageRecopilator.imageRecompilerCloud.dentro_horario', return_value=True), \
-         patch('imageRecopilator.imageRecompilerCloud.recomprimir_jpeg', return_value=b"jpeg_fijo"), \
-         patch('imageRecopilator.imageRecompilerCloud.cola_subida.put', new_callable=AsyncMock) as mock_put, \
-         patch('imageRecopilator.imageRecompilerCloud.metricas.imprimir_si_toca', new_callable=AsyncMock), \
+    with patch('imageRecopilator.Cloud.ImageRecompilerCloud.dentro_horario', return_value=True), \
+         patch('imageRecopilator.Cloud.ImageRecompilerCloud.recomprimir_jpeg', return_value=b"jpeg_fijo"), \
+         patch('imageRecopilator.Cloud.ImageRecompilerCloud.cola_subida.put', new_callable=AsyncMock) as mock_put, \
+         patch('imageRecopilator.Cloud.ImageRecompilerCloud.metricas.imprimir_si_toca', new_callable=AsyncMock), \
          patch('asyncio.sleep', side_effect=[None, BreakLoop()]):
 
         try:
@@ -77,7 +91,7 @@ async def test_worker_s3_procesa_cola():
     )
 
     with patch('aioboto3.Session.client') as mock_s3_client, \
-         patch('imageRecopilator.imageRecompilerCloud.metricas.registrar_subida', new_callable=AsyncMock):
+         patch('imageRecopilator.Cloud.ImageRecompilerCloud.metricas.registrar_subida', new_callable=AsyncMock):
 
         mock_s3 = AsyncMock()
         mock_s3_client.return_value.__aenter__.return_value = mock_s3
@@ -97,3 +111,131 @@ async def test_worker_s3_procesa_cola():
             pass
 
         mock_s3.put_object.assert_called_once()
+
+
+@pytest.mark.imageRecopilator
+class TestDomingoEnLaSemana:
+
+    def test_cada_domingo_cae_en_un_solo_conjunto(self):
+        # Dos domingos seguidos: los conjuntos son contiguos y sin solape
+        previa = cloud.fechas_semana(*cloud.semana_anterior(datetime(2026, 1, 18, 12)))
+        siguiente = cloud.fechas_semana(*cloud.semana_anterior(datetime(2026, 1, 25, 12)))
+
+        assert previa == [datetime(2026, 1, 11) + timedelta(days=d) for d in range(7)]
+        assert siguiente[0] == previa[-1] + timedelta(days=1)
+        assert [f.weekday() for f in siguiente] == [6, 0, 1, 2, 3, 4, 5]
+
+        worker = cloud.SundayWorker()
+        assert "indices/2026/01/11/Temuco.jsonl" in worker.keys_indices("Temuco", *cloud.semana_anterior(datetime(2026, 1, 18, 12)))
+
+    @pytest.mark.asyncio
+    async def test_nombre_del_video_cubre_el_domingo_previo(self, monkeypatch):
+        from imageRecopilator.Cloud import clientes_s3
+        gestor = clientes_s3.GestorClientesS3()
+        gestor.inyectar("s3", AsyncMock())
+        monkeypatch.setattr(clientes_s3, "_gestor", gestor)
+        contextos = []
+
+        class Pipeline:
+            async def procesar(self, s3, planta, imagenes, contexto):
+                contextos.append(contexto)
+                return []
+
+        worker = cloud.SundayWorker()
+        monkeypatch.setattr(worker, "preparar_pipeline", Pipeline)
+        await worker.crear_timelapse("Temuco", [], 2026, 3)
+
+        assert contextos[0]["video_key"] == f"timelapses/2026/semana_03/Temuco_11_01-17_01.{worker.perfil['ext']}"
+
+    def test_compacta_el_domingo_solo_con_horario_domingo(self, monkeypatch):
+        monkeypatch.setattr(cloud, "camaras", {"A": "cam-a", "B": "cam-b"})
+        monkeypatch.setattr(cloud, "HORARIOS", {
+            "A": {"semana": ("07:00", "18:00"), "sabado": ("08:00", "13:00"), "domingo": ("09:00", "13:00")},
+            "B": {"semana": ("07:00", "18:00"), "sabado": ("08:00", "13:00")},
+        })
+        domingo = datetime(2026, 1, 18)
+
+        assert cloud.dias_por_compactar(domingo.replace(hour=12), set()) == []       # antes del cierre
+        assert cloud.dias_por_compactar(domingo.replace(hour=14), set()) == [domingo]
+        assert cloud.dias_por_compactar(domingo.replace(hour=14), {domingo.date()}) == []
+
+        monkeypatch.setattr(cloud, "camaras", {"B": "cam-b"})
+        assert cloud.dias_por_compactar(domingo.replace(hour=14), set()) == []
+
+
+@pytest.mark.imageRecopilator
+@pytest.mark.parametrize("ahora, semana", [
+    (datetime(2024, 1, 14, 12), (2024, 2)),      # domingo: la semana que acaba de cerrar
+    (datetime(2024, 1, 17, 12), (2024, 2)),      # miércoles: el lunes-sábado anterior
+    (datetime(2024, 1, 13, 12), (2024, 1)),      # sábado: la semana en curso aún no cierra
+    (datetime(2027, 1, 3, 12), (2026, 53)),
+])
+def test_semana_anterior_iso(ahora, semana):
+    # En 2024 %W coincide con ISO: el desfase que en 2026 compensaba el domingo no existe
+    assert cloud.semana_anterior(ahora) == semana
+    fechas = cloud.fechas_semana(*semana)
+    assert fechas[-1].weekday() == 5 and timedelta(days=1) <= ahora - fechas[-1] < timedelta(days=8)
+    assert [f.isocalendar()[:2] for f in fechas[1:]] == [semana] * 6
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_conserva_el_indice_de_dias_con_frames_sin_confirmar(monkeypatch):
+    from imageRecopilator.Cloud import clientes_s3
+    gestor = clientes_s3.GestorClientesS3()
+    gestor.inyectar("s3", AsyncMock())
+    monkeypatch.setattr(clientes_s3, "_gestor", gestor)
+    lunes = "capturas/2026/01/12/Temuco/TMU_20260112_100000.jpg"
+    martes = ["capturas/2026/01/13/Temuco/TMU_20260113_100000.jpg",
+              "capturas/2026/01/13/Temuco/TMU_20260113_100100.jpg"]
+
+    class Pipeline:
+        async def procesar(self, s3, planta, imagenes, contexto):
+            contexto["video_subido"] = True
+            return [lunes, martes[0]]                   # el conteo no confirmó un frame del martes
+
+    borradas = []
+    worker = cloud.SundayWorker()
+    monkeypatch.setattr(worker, "preparar_pipeline", Pipeline)
+    monkeypatch.setattr(worker, "borrar_keys", lambda keys, origen="": borradas.extend(keys))
+    await worker.crear_timelapse("Temuco", [{"key": k} for k in [lunes] + martes], 2026, 3)
+
+    assert lunes in borradas and martes[0] in borradas and martes[1] not in borradas
+    assert "indices/2026/01/12/Temuco.jsonl" in borradas
+    assert "indices/2026/01/13/Temuco.jsonl" not in borradas          # el frame que queda conserva su metadata
+    assert "indices/2026/01/11/Temuco.jsonl" in borradas              # días sin frames
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_recarga_del_registro_reinicia_detectores(tmp_path, monkeypatch):
+    import json
+    from imageRecopilator.registro import RegistroCamaras
+
+    def escribir(plantas, mtime):
+        horarios = {"semana": ["07:00", "18:00"], "sabado": ["08:00", "13:00"]}
+        ruta.write_text(json.dumps({"plantas": {p: {"camara": c, "denominador": p.upper() * 3, "horarios": horarios}
+                                                for p, c in plantas.items()}}), encoding="utf-8")
+        os.utime(ruta, ns=(mtime, mtime))
+
+    ruta = tmp_path / "camaras.json"
+    escribir({"a": "cam-a", "b": "cam-b", "c": "cam-c"}, 1_000_000_000)
+    monkeypatch.setattr(cloud, "registro", RegistroCamaras(str(ruta)))
+
+    async def reconciliar(session, tareas, asignadas):
+        pass
+    monkeypatch.setattr(cloud, "reconciliar_capturas", reconciliar)
+    monkeypatch.setattr(cloud, "detector_actividad", type(cloud.detector_actividad)())
+    monkeypatch.setattr(cloud, "detector_frescura", type(cloud.detector_frescura)())
+
+    for planta in ("a", "b", "c"):
+        cloud.detector_actividad.fondos[planta] = object()
+        cloud.detector_frescura.ventanas[planta] = ["firma"]
+        cloud.detector_frescura.congeladas[planta] = 1.0
+
+    escribir({"a": "cam-a2", "c": "cam-c"}, 2_000_000_000)             # a cambia de cámara, b se quita
+    await cloud.aplicar_cambios_registro(None, {})
+
+    assert set(cloud.detector_actividad.fondos) == {"c"}
+    assert set(cloud.detector_frescura.ventanas) == {"c"}
+    assert set(cloud.detector_frescura.congeladas) == {"c"}
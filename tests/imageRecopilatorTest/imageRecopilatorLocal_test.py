@@ -20,40 +20,40 @@ class TestCamarasLocal:
 
     def test_es_domingo_true(self):
         fecha = datetime(2026, 1, 18, 12, 0, 0)  # domingo
-        with patch('imageRecopilator.imageRecompilerLocal.datetime') as mock_date:
+        with patch('imageRecopilator.Local.ImageRecompilerLocal.datetime') as mock_date:
             mock_date.now.return_value = fecha
             assert script.es_domingo() is True
 
     def test_es_domingo_false(self):
         fecha = datetime(2026, 1, 19, 12, 0, 0)  # lunes
-        with patch('imageRecopilator.imageRecompilerLocal.datetime') as mock_date:
+        with patch('imageRecopilator.Local.ImageRecompilerLocal.datetime') as mock_date:
             mock_date.now.return_value = fecha
             assert script.es_domingo() is False
 
     def test_dentro_horario_semana_abierto(self):
         fecha = datetime(2026, 1, 20, 10, 0, 0)  # martes
-        with patch('imageRecopilator.imageRecompilerLocal.datetime') as mock_date:
+        with patch('imageRecopilator.Local.ImageRecompilerLocal.datetime') as mock_date:
             mock_date.now.return_value = fecha
             mock_date.strptime = datetime.strptime
             assert script.dentro_horario("Huechuraba") is True
 
     def test_dentro_horario_semana_cerrado(self):
         fecha = datetime(2026, 1, 20, 23, 0, 0)
-        with patch('imageRecopilator.imageRecompilerLocal.datetime') as mock_date:
+        with patch('imageRecopilator.Local.ImageRecompilerLocal.datetime') as mock_date:
             mock_date.now.return_value = fecha
             mock_date.strptime = datetime.strptime
             assert script.dentro_horario("Huechuraba") is False
 
     def test_dentro_horario_sabado(self):
         fecha = datetime(2026, 1, 17, 9, 0, 0)  # sábado
-        with patch('imageRecopilator.imageRecompilerLocal.datetime') as mock_date:
+        with patch('imageRecopilator.Local.ImageRecompilerLocal.datetime') as mock_date:
             mock_date.now.return_value = fecha
             mock_date.strptime = datetime.strptime
             assert script.dentro_horario("Temuco") is True
 
     def test_segundos_hasta_apertura_madrugada(self):
         fecha = datetime(2026, 1, 20, 2, 0, 0)
-        with patch('imageRecopilator.imageRecompilerLocal.datetime') as mock_date:
+        with patch('imageRecopilator.Local.ImageRecompilerLocal.datetime') as mock_date:
             mock_date.now.return_value = fecha
             mock_date.strptime = datetime.strptime
             mock_date.combine = datetime.combine
@@ -72,8 +72,8 @@ class TestCamarasLocal:
         class BreakLoop(Exception):
             pass
 
-        with patch('imageRecopilator.imageRecompilerLocal.dentro_horario', return_value=True), \
-            patch('imageRecopilator.imageRecompilerLocal.os.makedirs'), \
+        with patch('imageRecopilator.Local.ImageRecompilerLocal.dentro_horario', return_value=True), \
+            patch('imageRecopilator.Local.ImageRecompilerLocal.os.makedirs'), \
             patch('asyncio.sleep', side_effect=BreakLoop):
 
             try:
@@ -0,0 +1,101 @@
+import sys
+import os
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import listado
+
+LUNES = datetime(2024, 1, 1)
+FECHAS = [LUNES + timedelta(days=d) for d in range(6)]
+
+
+class PaginadorFalso:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    async def paginate(self, Bucket, Prefix, Delimiter=None):
+        self.s3.en_vuelo += 1
+        self.s3.max_en_vuelo = max(self.s3.max_en_vuelo, self.s3.en_vuelo)
+        try:
+            keys = sorted(k for k in self.s3.objetos if k.startswith(Prefix))
+            if Delimiter:
+                comunes = sorted({Prefix + k[len(Prefix):].split(Delimiter)[0] + Delimiter
+                                  for k in keys if Delimiter in k[len(Prefix):]})
+                yield {'CommonPrefixes': [{'Prefix': p} for p in comunes]}
+                return
+            for planta, retardo in self.s3.lentas.items():
+                if f"/{planta}/" in Prefix:
+                    await asyncio.sleep(retardo)
+            if any(f"/{planta}/" in Prefix for planta in self.s3.fallan):
+                raise ConnectionError("timeout")
+            for i in range(0, len(keys), 2):
+                await asyncio.sleep(0.001)
+                yield {'Contents': [{'Key': k, 'ETag': '"e"', 'Size': 1} for k in keys[i:i + 2]]}
+        finally:
+            self.s3.en_vuelo -= 1
+
+
+class S3Listado:
+    def __init__(self, plantas, lentas=None, fallan=()):
+        self.objetos = {
+            f"capturas/{f.year}/{f.month:02d}/{f.day:02d}/{planta}/{h:02d}.jpg": 1
+            for f in FECHAS for planta in plantas for h in range(5)
+        }
+        self.lentas = lentas or {}
+        self.fallan = set(fallan)
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    def get_paginator(self, nombre):
+        return PaginadorFalso(self)
+
+
+async def recolectar(listador):
+    return [(planta, dias) async for planta, dias in listador.plantas()]
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_agrupa_por_planta_y_dia():
+    s3 = S3Listado(["Temuco", "Osorno"])
+    listador = listado.ListadorSemana(s3, "b", "capturas", FECHAS, concurrencia=4)
+    resultado = dict(await recolectar(listador))
+
+    assert set(resultado) == {"Temuco", "Osorno"}
+    dias = resultado["Temuco"]
+    assert [fecha for fecha, *_ in dias] == FECHAS
+    assert all(len(objetos) == 5 for _, objetos, _, _ in dias)
+    assert all("/Temuco/" in o['Key'] for _, objetos, _, _ in dias for o in objetos)
+    assert listador.paginas == 2 * 6 * 3
+    assert s3.max_en_vuelo <= 4
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_entrega_plantas_sin_esperar_a_las_lentas():
+    s3 = S3Listado(["Arica", "Temuco"], lentas={"Arica": 0.3})
+    listador = listado.ListadorSemana(s3, "b", "capturas", FECHAS, concurrencia=16)
+
+    inicio = asyncio.get_running_loop().time()
+    async for planta, _ in listador.plantas():
+        primera, demora = planta, asyncio.get_running_loop().time() - inicio
+        break
+
+    assert primera == "Temuco"
+    assert demora < 0.3
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_planta_con_listado_fallido_no_se_entrega():
+    s3 = S3Listado(["Temuco", "Osorno"], fallan={"Osorno"})
+    listador = listado.ListadorSemana(s3, "b", "capturas", FECHAS, concurrencia=4)
+    assert [planta for planta, _ in await recolectar(listador)] == ["Temuco"]
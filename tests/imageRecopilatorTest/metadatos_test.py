@@ -0,0 +1,120 @@
+import sys
+import os
+import io
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from PIL import Image
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import metadatos
+
+
+def jpeg(tamano, **opciones):
+    buffer = io.BytesIO()
+    Image.new("RGB", tamano, (90, 90, 90)).save(buffer, format="JPEG", **opciones)
+    return buffer.getvalue()
+
+
+def frame(key, ancho=None, alto=None, ts=None):
+    meta = None
+    if ancho:
+        meta = {"ancho": ancho, "alto": alto, "ts": ts}
+    return {"key": key, "meta": meta}
+
+
+class S3Memoria:
+    """S3 mínimo en memoria para get/put del índice"""
+
+    def __init__(self):
+        self.objetos = {}
+        self.put_object = AsyncMock(side_effect=self._put)
+        self.get_object = AsyncMock(side_effect=self._get)
+
+    async def _put(self, Bucket, Key, Body, **kwargs):
+        self.objetos[Key] = Body
+
+    async def _get(self, Bucket, Key):
+        from botocore.exceptions import ClientError
+        if Key not in self.objetos:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        body = MagicMock()
+        body.read = AsyncMock(return_value=self.objetos[Key])
+        return {"Body": body}
+
+
+@pytest.mark.imageRecopilator
+class TestMetadatos:
+
+    @pytest.mark.parametrize("opciones", [{}, {"progressive": True}, {"optimize": True}])
+    def test_dimensiones_sin_decodificar(self, opciones):
+        assert metadatos.dimensiones_jpeg(jpeg((704, 576), **opciones)) == (704, 576)
+        assert metadatos.dimensiones_jpeg(memoryview(jpeg((320, 180)))) == (320, 180)
+        assert metadatos.dimensiones_jpeg(b"no es jpeg") is None
+
+    def test_metadatos_frame_son_str(self):
+        data = jpeg((640, 360))
+        meta = metadatos.metadatos_frame(data, 1700000000.7, "abc")
+        assert meta == {"ts": "1700000000", "bytes": str(len(data)), "md5": "abc",
+                        "ancho": "640", "alto": "360"}
+        assert all(isinstance(v, str) for v in meta.values())
+
+    def test_filtra_resolucion_minoritaria_y_ordena_por_ts(self):
+        imagenes = [
+            frame("c/TMU_20240102_080300.jpg", 704, 576, 300),
+            frame("c/TMU_20240102_080100.jpg", 704, 576, 100),
+            frame("c/TMU_20240102_080200.jpg", 1280, 720, 200),
+            frame("c/TMU_20240102_080000.jpg", 704, 576, 50),
+        ]
+        validas, descartadas = metadatos.filtrar_y_ordenar(imagenes)
+        assert [img["meta"]["ts"] for img in validas] == [50, 100, 300]
+        assert [img["key"] for img in descartadas] == ["c/TMU_20240102_080200.jpg"]
+
+    def test_frames_sin_metadata_se_conservan(self):
+        imagenes = [frame("c/TMU_20240102_080000.jpg"), frame("c/TMU_20240102_080100.jpg", 704, 576, 1)]
+        validas, descartadas = metadatos.filtrar_y_ordenar(imagenes)
+        assert len(validas) == 2 and not descartadas
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_indice_se_fusiona_con_lo_existente():
+    s3 = S3Memoria()
+    fecha = datetime(2024, 1, 2, 8, 0)
+    key_indice = metadatos.clave_indice(fecha, "Temuco")
+    s3.objetos[key_indice] = json.dumps({"key": "previa.jpg", "ts": 1}).encode()
+
+    indice = metadatos.IndiceDiario("bucket")
+    indice.agregar(fecha, "Temuco", "nueva.jpg", {"ts": "2", "bytes": "10", "md5": "x", "ancho": "704", "alto": "576"})
+    assert await indice.volcar(s3) == 1
+    assert await indice.volcar(s3) == 0
+
+    entradas = await metadatos.cargar_indice_dia(s3, "bucket", key_indice)
+    assert set(entradas) == {"previa.jpg", "nueva.jpg"}
+    assert entradas["nueva.jpg"]["ancho"] == 704
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_dos_particiones_no_se_pisan_el_indice():
+    # Temuco se reasigna a mitad de día: ambas particiones escriben el mismo planta-día
+    s3 = S3Memoria()
+    fecha = datetime(2024, 1, 2, 8, 0)
+    a, b = metadatos.IndiceDiario("bucket"), metadatos.IndiceDiario("bucket")
+
+    a.agregar(fecha, "Temuco", "a1.jpg", {"ts": "1"})
+    await a.volcar(s3)
+    b.agregar(fecha, "Temuco", "b1.jpg", {"ts": "2"})
+    await b.volcar(s3)
+    a.agregar(fecha, "Temuco", "a2.jpg", {"ts": "3"})
+    await a.volcar(s3)
+
+    entradas = await metadatos.cargar_indice_dia(s3, "bucket", metadatos.clave_indice(fecha, "Temuco"))
+    assert list(entradas) == ["a1.jpg", "b1.jpg", "a2.jpg"]
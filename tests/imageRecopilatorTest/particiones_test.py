@@ -0,0 +1,102 @@
+import sys
+import os
+import pytest
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import particiones
+
+PLANTAS = [f"Planta {i}" for i in range(200)]
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.mark.imageRecopilator
+class TestAnillo:
+
+    def test_particion_completa_y_disjunta(self):
+        vivos = ["p0", "p1", "p2"]
+        grupos = [particiones.camaras_asignadas(PLANTAS, w, vivos) for w in vivos]
+        assert set().union(*grupos) == set(PLANTAS)
+        assert sum(len(g) for g in grupos) == len(PLANTAS)
+        assert all(len(g) > 30 for g in grupos)
+
+    def test_salida_de_worker_solo_mueve_sus_camaras(self):
+        antes = particiones.AnilloConsistente(["p0", "p1", "p2"])
+        despues = particiones.AnilloConsistente(["p0", "p2"])
+        for planta in PLANTAS:
+            if antes.asignar(planta) != "p1":
+                assert despues.asignar(planta) == antes.asignar(planta)
+
+
+@pytest.mark.imageRecopilator
+class TestCoordinador:
+
+    def test_lease_vence_y_rebalancea(self, tmp_path):
+        reloj = Reloj()
+        db = str(tmp_path / "coord.db")
+        p0 = particiones.CoordinadorSQLite(db, "p0", ttl=90, reloj=reloj)
+        p1 = particiones.CoordinadorSQLite(db, "p1", ttl=90, reloj=reloj)
+        p0.latido()
+        p1.latido()
+
+        assert p0.vivos() == ["p0", "p1"]
+        assert p0.es_lider() and not p1.es_lider()
+        assert len(p1.asignacion(PLANTAS)) < len(PLANTAS)
+
+        # p0 deja de latir: vence el lease, p1 toma todo y pasa a ser líder
+        reloj.ahora += 60
+        p1.latido()
+        reloj.ahora += 60
+        assert p1.vivos() == ["p1"]
+        assert p1.es_lider()
+        assert p1.asignacion(PLANTAS) == set(PLANTAS)
+
+    def test_metricas_agregadas_solo_de_vivos(self, tmp_path):
+        reloj = Reloj()
+        db = str(tmp_path / "coord.db")
+        p0 = particiones.CoordinadorSQLite(db, "p0", reloj=reloj)
+        p1 = particiones.CoordinadorSQLite(db, "p1", reloj=reloj)
+        for coord, subidas in ((p0, 10), (p1, 5)):
+            coord.latido()
+            coord.publicar_metricas({"imagenes_subidas": subidas, "nota": "x"})
+
+        total = p0.metricas_agregadas()
+        assert total["imagenes_subidas"] == 15
+        assert total["workers"] == 2
+        assert "nota" not in total
+
+        p1.retirar()
+        assert p0.metricas_agregadas()["imagenes_subidas"] == 10
+
+    def test_cada_operacion_cierra_su_conexion(self, tmp_path, monkeypatch):
+        import sqlite3
+        abiertas = []
+        conectar = sqlite3.connect
+
+        def registrar(*args, **kwargs):
+            abiertas.append(conectar(*args, **kwargs))
+            return abiertas[-1]
+
+        monkeypatch.setattr(particiones.sqlite3, "connect", registrar)
+        coord = particiones.CoordinadorSQLite(str(tmp_path / "coord.db"), "p0", reloj=Reloj())
+        coord.latido()
+        coord.publicar_metricas({"imagenes_subidas": 1})
+        assert coord.metricas_agregadas()["imagenes_subidas"] == 1
+        coord.retirar()
+
+        assert len(abiertas) >= 5
+        for conn in abiertas:
+            with pytest.raises(sqlite3.ProgrammingError):   # cerrada: el latido no deja conexiones colgando
+                conn.execute("SELECT 1")
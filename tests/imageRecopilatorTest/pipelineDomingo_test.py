@@ -0,0 +1,132 @@
+import sys
+import os
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import pipeline_domingo as pipeline
+
+
+def s3_falso(fallar=()):
+    s3 = MagicMock()
+    s3.gets = []
+
+    async def get_object(Bucket, Key):
+        s3.gets.append(Key)
+        await asyncio.sleep(0.01 if Key.endswith("0.jpg") else 0)
+        if Key in fallar:
+            raise RuntimeError("503")
+        body = AsyncMock()
+        body.read.return_value = Key.encode()
+        return {"Body": body}
+
+    s3.get_object = get_object
+    return s3
+
+
+class EtapaRegistro(pipeline.Etapa):
+    def __init__(self, nombre, rechazar=(), resultado=True):
+        self.nombre = nombre
+        self.rechazar = rechazar
+        self.resultado = resultado
+        self.recibidos = []
+
+    async def consumir(self, planta, frame, contexto):
+        if frame["key"] in self.rechazar:
+            raise ValueError("frame corrupto")
+        self.recibidos.append(frame["key"])
+
+    async def finalizar(self, planta, contexto):
+        return self.resultado
+
+
+KEYS = [f"capturas/2026/01/13/Temuco/TMU_20260113_10{m:02d}00.jpg" for m in range(6)]
+IMAGENES = [{"key": k} for k in KEYS]
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_descargar_en_orden_con_ventana():
+    s3 = s3_falso()
+    recibidos = [data async for _, data in pipeline.descargar_en_orden(s3, "bucket", IMAGENES, ventana=2)]
+    assert recibidos == [k.encode() for k in KEYS]
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_una_descarga_para_varias_etapas():
+    s3 = s3_falso()
+    etapas = [EtapaRegistro("a"), EtapaRegistro("b"), EtapaRegistro("c")]
+    p = pipeline.PipelineDomingo("bucket", ventana=3)
+    for etapa in etapas:
+        p.registrar(lambda etapa=etapa: etapa)
+
+    confirmadas = await p.procesar(s3, "Temuco", IMAGENES, {})
+
+    assert s3.gets == KEYS
+    assert confirmadas == KEYS
+    assert all(etapa.recibidos == KEYS for etapa in etapas)
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_no_confirma_frames_rechazados_ni_fallidos():
+    s3 = s3_falso(fallar={KEYS[1]})
+    p = pipeline.PipelineDomingo("bucket")
+    p.registrar(lambda: EtapaRegistro("timelapse"))
+    p.registrar(lambda: EtapaRegistro("conteo", rechazar={KEYS[2]}))
+
+    confirmadas = await p.procesar(s3, "Temuco", IMAGENES, {})
+
+    assert KEYS[1] not in confirmadas
+    assert KEYS[2] not in confirmadas
+    assert len(confirmadas) == 4
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_etapa_fallida_no_borra_nada():
+    s3 = s3_falso()
+    p = pipeline.PipelineDomingo("bucket")
+    p.registrar(lambda: EtapaRegistro("timelapse"))
+    p.registrar(lambda: EtapaRegistro("conteo", resultado=False))
+
+    assert await p.procesar(s3, "Temuco", IMAGENES, {}) == []
+
+
+class EtapaConRecursos(EtapaRegistro):
+    def __init__(self, nombre, fallar_inicio=False):
+        super().__init__(nombre)
+        self.fallar_inicio = fallar_inicio
+        self.estado = "nueva"
+
+    async def iniciar(self, planta, contexto):
+        self.estado = "iniciada"
+        if self.fallar_inicio:
+            raise OSError("ffmpeg no encontrado")
+
+    async def abortar(self, planta, contexto):
+        self.estado = "abortada"
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_fallo_al_iniciar_aborta_las_etapas_iniciadas():
+    s3 = s3_falso()
+    etapas = [EtapaConRecursos("conteo"), EtapaConRecursos("timelapse", fallar_inicio=True), EtapaConRecursos("otra")]
+    p = pipeline.PipelineDomingo("bucket")
+    for etapa in etapas:
+        p.registrar(lambda etapa=etapa: etapa)
+
+    with pytest.raises(OSError):
+        await p.procesar(s3, "Temuco", IMAGENES, {})
+
+    assert [e.estado for e in etapas] == ["abortada", "abortada", "nueva"]
+    assert s3.gets == []
@@ -0,0 +1,56 @@
+import sys
+import os
+import io
+import pytest
+import numpy as np
+from PIL import Image
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import recompresion
+from imageRecopilator.Cloud.buffers import SlotBuffer
+from imageRecopilator.Cloud.benchmarks import jpeg_con_exif
+
+
+def pixeles(data):
+    return np.asarray(Image.open(io.BytesIO(bytes(data))).convert("RGB"))
+
+
+@pytest.mark.imageRecopilator
+class TestRecompresion:
+
+    def test_quita_metadatos_sin_tocar_pixeles(self):
+        original = jpeg_con_exif()
+        assert "exif" in Image.open(io.BytesIO(original)).info
+
+        limpio = recompresion.quitar_metadatos(original)
+        assert len(limpio) < len(original)
+        assert "exif" not in Image.open(io.BytesIO(limpio)).info
+        assert np.array_equal(pixeles(limpio), pixeles(original))
+
+    def test_escribe_en_slot(self):
+        original = jpeg_con_exif()
+        slot = SlotBuffer(1024)                      # desborda: igual debe quedar completo
+        vista = recompresion.quitar_metadatos(memoryview(original), slot)
+        assert bytes(vista) == recompresion.quitar_metadatos(original)
+
+    def test_rechaza_no_jpeg(self):
+        with pytest.raises(ValueError):
+            recompresion.quitar_metadatos(b"\x89PNG\r\n\x1a\n" + b"\x00" * 16)
+
+    def test_sin_jpegtran_solo_quita_metadatos(self, monkeypatch):
+        monkeypatch.setattr(recompresion, "_jpegtran", False)
+        original = jpeg_con_exif()
+        assert recompresion.optimizar_sin_perdida(original) == recompresion.quitar_metadatos(original)
+
+    @pytest.mark.skipif(not recompresion.jpegtran_disponible(), reason="jpegtran no disponible")
+    def test_jpegtran_sin_perdida(self):
+        original = jpeg_con_exif()
+        optimizado = recompresion.optimizar_sin_perdida(original)
+        assert len(optimizado) < len(original)
+        assert np.array_equal(pixeles(optimizado), pixeles(original))
@@ -0,0 +1,80 @@
+import sys
+import os
+import json
+import pytest
+from datetime import time
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator import registro as reg
+
+
+def planta(camara, denominador, semana=("07:40", "17:20"), sabado=("08:10", "13:50")):
+    return {"camara": camara, "denominador": denominador,
+            "horarios": {"semana": list(semana), "sabado": list(sabado)}}
+
+
+def escribir(ruta, plantas, mtime):
+    ruta.write_text(json.dumps({"plantas": plantas}), encoding="utf-8")
+    os.utime(ruta, ns=(mtime, mtime))
+
+
+@pytest.mark.imageRecopilator
+class TestRegistro:
+
+    def test_archivo_del_repo_es_valido(self):
+        registro = reg.RegistroCamaras(reg.RUTA_DEFAULT)
+        assert registro.denominadores["Temuco"] == "TMU"
+        assert registro.horarios["Temuco"]["semana"] == ("08:10", "18:20")
+        assert registro.horas["Temuco"]["semana"] == (time(8, 10), time(18, 20))
+
+    def test_validacion_reune_todos_los_errores(self):
+        with pytest.raises(ValueError) as error:
+            reg.validar({"plantas": {
+                "A": planta("", "X", semana=("18:00", "07:00")),
+                "B": planta("cam-b", "X", sabado=("8h", "13:50")),
+            }})
+        mensaje = str(error.value)
+        assert "A: falta 'camara'" in mensaje
+        assert "no es anterior" in mensaje
+        assert "repetido" in mensaje
+        assert "hora inválida" in mensaje
+
+    def test_recarga_en_el_lugar_y_reporta_cambios(self, tmp_path):
+        ruta = tmp_path / "camaras.json"
+        escribir(ruta, {"A": planta("cam-a", "AAA"), "B": planta("cam-b", "BBB")}, 1_000_000_000)
+        registro = reg.RegistroCamaras(str(ruta))
+        camaras = registro.camaras
+
+        assert registro.revisar() is None
+
+        escribir(ruta, {"A": planta("cam-a2", "AAA"), "C": planta("cam-c", "CCC")}, 2_000_000_000)
+        cambios = registro.revisar()
+        assert cambios == {"agregadas": {"C"}, "quitadas": {"B"}, "modificadas": {"A"}}
+        assert camaras is registro.camaras
+        assert camaras == {"A": "cam-a2", "C": "cam-c"}
+
+    def test_archivo_invalido_no_reemplaza_lo_vigente(self, tmp_path):
+        ruta = tmp_path / "camaras.json"
+        escribir(ruta, {"A": planta("cam-a", "AAA")}, 1_000_000_000)
+        registro = reg.RegistroCamaras(str(ruta))
+
+        escribir(ruta, {"A": planta("cam-a", "AAA", semana=("25:00", "26:00"))}, 2_000_000_000)
+        assert registro.revisar() is None
+        assert registro.horarios["A"]["semana"] == ("07:40", "17:20")
+
+    def test_horario_domingo_opcional(self):
+        con_domingo = dict(planta("cam-a", "AAA"))
+        con_domingo["horarios"] = dict(con_domingo["horarios"], domingo=["09:00", "13:00"])
+        _, _, _, horas = reg.validar({"plantas": {"A": con_domingo, "B": planta("cam-b", "BBB")}})
+        assert horas["A"]["domingo"] == (time(9, 0), time(13, 0))
+        assert "domingo" not in horas["B"]
+
+        con_domingo["horarios"]["domingo"] = ["13:00", "09:00"]
+        with pytest.raises(ValueError):
+            reg.validar({"plantas": {"A": con_domingo}})
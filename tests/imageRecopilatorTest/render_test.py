@@ -0,0 +1,152 @@
+import sys
+import os
+import io
+import hashlib
+import pytest
+from datetime import datetime
+from PIL import Image
+from botocore.exceptions import ClientError
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import render, pipeline_domingo
+
+
+class Cuerpo:
+    def __init__(self, data):
+        self.data = data
+
+    async def read(self):
+        return self.data
+
+
+class Paginador:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    async def paginate(self, Bucket, Prefix, Delimiter=None):
+        keys = sorted(k for k in self.s3.objetos if k.startswith(Prefix))
+        if Delimiter:
+            comunes = sorted({Prefix + k[len(Prefix):].split(Delimiter)[0] + Delimiter
+                              for k in keys if Delimiter in k[len(Prefix):]})
+            yield {'CommonPrefixes': [{'Prefix': p} for p in comunes]}
+            return
+        yield {'Contents': [
+            {'Key': k, 'ETag': f'"{hashlib.md5(self.s3.objetos[k]).hexdigest()}"', 'Size': len(self.s3.objetos[k])}
+            for k in keys
+        ]}
+
+
+class S3Render:
+    """Listado, GET/PUT y multipart en memoria"""
+
+    def __init__(self):
+        self.objetos = {}
+        self.uploads = {}
+        self.gets = 0
+
+    def get_paginator(self, nombre):
+        return Paginador(self)
+
+    async def get_object(self, Bucket, Key, Range=None):
+        if Key not in self.objetos:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        self.gets += 1
+        return {'Body': Cuerpo(self.objetos[Key])}
+
+    async def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objetos[Key] = Body.encode() if isinstance(Body, str) else Body
+
+    async def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = f"u{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self.uploads[UploadId][PartNumber] = (etag, Body)
+        return {"ETag": etag}
+
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        partes = self.uploads.pop(UploadId)
+        self.objetos[Key] = b"".join(partes[p["PartNumber"]][1] for p in MultipartUpload["Parts"])
+
+    async def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+
+def jpeg(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 36), (color, 0, 0)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    # `cat` en lugar de ffmpeg: el "video" es la concatenación de los frames
+    monkeypatch.setattr(pipeline_domingo, "comandos_ffmpeg", lambda *a, **k: [["cat"]])
+    monkeypatch.setenv("SUBIDAS_ESTADO_DIR", str(tmp_path))
+    s3 = S3Render()
+    for dia in (1, 2, 3):
+        for hora in range(8, 20):
+            s3.objetos[f"capturas/2024/01/0{dia}/Temuco/TEM_202401{dia:02d}_{hora:02d}0000.jpg"] = jpeg((dia * 12 + hora) * 4)
+            s3.objetos[f"capturas/2024/01/0{dia}/Osorno/OSO_202401{dia:02d}_{hora:02d}0000.jpg"] = jpeg(hora * 10)
+    return s3
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_rango_arbitrario_y_cache(s3):
+    inicio, fin = datetime(2024, 1, 1, 12), datetime(2024, 1, 2, 9)
+
+    [primero] = await render.render("Temuco", inicio, fin, fps=12, perfil="rapido", s3=s3, bucket="b")
+    assert primero["num_frames"] == 8 + 2         # 12..19 del lunes + 8..9 del martes
+    assert not primero["cache"]
+    assert primero["video_key"].startswith("renders/Temuco/")
+    assert s3.objetos[primero["video_key"]].startswith(
+        s3.objetos["capturas/2024/01/01/Temuco/TEM_20240101_120000.jpg"]
+    )
+
+    gets = s3.gets
+    [segundo] = await render.render("Temuco", inicio, fin, fps=12, perfil="rapido", s3=s3, bucket="b")
+    assert segundo["cache"] and segundo["video_key"] == primero["video_key"]
+    assert s3.gets == gets + 1                    # solo el manifest, ningún frame
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_parametros_distintos_no_comparten_cache(s3):
+    inicio, fin = datetime(2024, 1, 1), datetime(2024, 1, 3, 23)
+    resultado = await render.render(["Osorno", "Temuco"], inicio, fin, fps=24, resolucion="640", s3=s3, bucket="b")
+    otro = await render.render(["Osorno"], inicio, fin, fps=30, s3=s3, bucket="b")
+
+    assert [r["planta"] for r in resultado] == ["Osorno", "Temuco"]
+    # Osorno repite la misma imagen cada día: se deduplica por ETag
+    assert resultado[0]["num_frames"] == 12 and resultado[1]["num_frames"] == 36
+    assert not otro[0]["cache"] and otro[0]["video_key"] != resultado[0]["video_key"]
+
+
+@pytest.mark.imageRecopilator
+def test_parametros():
+    assert render.parsear_resolucion("1280x720") == "1280:720"
+    assert render.parsear_resolucion("1280") == "1280:-2"
+    with pytest.raises(ValueError):
+        render.parsear_resolucion("ancho")
+    assert render._fecha("2024-01-03", fin=True) == datetime(2024, 1, 3, 23, 59, 59)
+    perfil = render.perfil_render(fps=12, resolucion="640x360", perfil="tamano")
+    assert (perfil["fps"], perfil["escala"], perfil["codec"]) == (12, "640:360", "libx265")
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_manifest_fechado_con_el_reloj_inyectado(s3):
+    import json
+    [resultado] = await render.render("Temuco", datetime(2024, 1, 1), datetime(2024, 1, 1, 23), perfil="rapido",
+                                      s3=s3, bucket="b", reloj=lambda: datetime(2030, 6, 2, 3, 0))
+    manifest = json.loads(s3.objetos[resultado["video_key"].rsplit(".", 1)[0] + ".manifest"])
+    assert manifest["timestamp"] == "2030-06-02T03:00:00"
@@ -0,0 +1,93 @@
+import sys
+import os
+import pytest
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import salud as modulo
+
+
+class RelojFalso:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def camara(**config):
+    reloj = RelojFalso()
+    return modulo.SaludCamara("Temuco", config, reloj), reloj
+
+
+@pytest.mark.imageRecopilator
+class TestSaludCamara:
+
+    def test_abre_circuito_tras_fallos_consecutivos(self):
+        salud, _ = camara(fallos_para_abrir=3, backoff_inicial=120)
+        for _ in range(3):
+            assert salud.permite_intento()
+            salud.registrar_fallo()
+
+        assert salud.estado == modulo.ABIERTO
+        assert not salud.permite_intento()
+        assert salud.segundos_hasta_sondeo() == 120
+
+    def test_semiabierto_un_sondeo_y_backoff_exponencial(self):
+        salud, reloj = camara(fallos_para_abrir=1, backoff_inicial=100, backoff_max=300)
+        salud.registrar_fallo()
+
+        reloj.t += 100
+        assert salud.permite_intento()
+        assert salud.estado == modulo.SEMIABIERTO
+        assert salud.intentos_permitidos() == 1
+        assert salud.timeout() == salud.config["timeout_sondeo"]
+
+        salud.registrar_fallo()
+        assert salud.segundos_hasta_sondeo() == 200
+
+        reloj.t += 200
+        salud.permite_intento()
+        salud.registrar_fallo()
+        assert salud.segundos_hasta_sondeo() == 300   # tope backoff_max
+
+    def test_sondeo_exitoso_cierra_circuito(self):
+        salud, reloj = camara(fallos_para_abrir=1, backoff_inicial=60)
+        salud.registrar_fallo()
+        reloj.t += 60
+        salud.permite_intento()
+        salud.registrar_exito()
+
+        assert salud.estado == modulo.CERRADO
+        assert salud.backoff == 60
+        assert salud.intentos_permitidos() == salud.config["intentos"]
+
+    def test_intervalo_adaptativo(self):
+        salud, _ = camara(intervalo_min=60, intervalo_max=300, alpha=0.5)
+        for _ in range(10):
+            salud.registrar_exito(cambio=False)
+        assert salud.intervalo(hora=10) > 250
+
+        # Hora con actividad observada vuelve al mínimo
+        salud.registrar_exito(cambio=True, actividad=0.3, hora=10)
+        assert salud.intervalo(hora=10) == 60
+        assert salud.intervalo(hora=15) > 60
+
+    def test_registro_por_planta(self):
+        registro = modulo.RegistroSalud(config_por_planta={"Yumbel": {"intentos": 1}})
+        assert registro.de("Yumbel").intentos_permitidos() == 1
+        assert registro.de("Temuco") is registro.de("Temuco")
+        assert registro.no_sanas() == {}
+
+    def test_imagen_congelada_alarga_el_sondeo(self):
+        salud, _ = camara(intervalo_min=60, intervalo_max=300, intervalo_congelada=900)
+        salud.registrar_exito(cambio=True, actividad=0.3, hora=10)
+        salud.marcar_congelada(True)
+        assert salud.intervalo(hora=10) == 900 and salud.resumen()["congelada"]
+        salud.marcar_congelada(False)
+        assert salud.intervalo(hora=10) == 60
@@ -0,0 +1,62 @@
+import sys
+import os
+import time
+import asyncio
+import pytest
+from datetime import datetime
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import bitacora
+from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+from imageRecopilator.Cloud.reloj import RelojSistema, RelojVirtual, correr_virtual
+from imageRecopilator.Cloud.simulacion import simular_semana
+
+
+@pytest.mark.imageRecopilator
+class TestRelojVirtual:
+
+    def test_sleeps_en_tiempo_virtual_e_hilos_en_tiempo_real(self):
+        reloj = RelojVirtual(datetime(2026, 1, 5))
+
+        async def corrutina():
+            await asyncio.sleep(3600)
+            # El hilo tarda de verdad, pero el reloj no avanza mientras corre
+            durante = await asyncio.to_thread(lambda: time.sleep(0.05) or reloj.monotonic())
+            await asyncio.wait_for(asyncio.sleep(10), timeout=20)
+            return durante
+
+        inicio = time.perf_counter()
+        assert correr_virtual(corrutina(), reloj) == 3600
+        assert time.perf_counter() - inicio < 2
+        assert reloj.ahora() == datetime(2026, 1, 5, 1, 0, 10)
+        assert reloj.time() == datetime(2026, 1, 5, 1, 0, 10).timestamp()
+
+
+@pytest.mark.imageRecopilator
+def test_domingo_a_lunes_simulado(tmp_path):
+    # Domingo 05:00 -> lunes 08:00: se encola la semana y la captura sigue el lunes
+    inicio = datetime(2026, 1, 11, 5)
+    running = cloud.RUNNING
+    reporte = simular_semana(inicio, dias=27 / 24, plantas=["Huechuraba", "La Florida"],
+                             directorio=str(tmp_path), congeladas=["La Florida"])
+
+    assert reporte["fin"].startswith("2026-01-12T08:0")
+    assert [(t["tipo"], t["estado"]) for t in reporte["trabajos"]] == [("semana", "pendiente")]
+    assert reporte["frames"]["errores_descarga"] == 0 and reporte["frames"]["errores_s3"] == 0
+
+    resumen = bitacora.resumen(str(tmp_path / "bitacora"), inicio, datetime(2026, 1, 12, 9))
+    huechuraba, florida = resumen["Huechuraba"], resumen["La Florida"]
+    assert set(huechuraba["resultados"]) == {"subida"}                 # lunes desde las 07:10
+    assert huechuraba["ultima_subida"].startswith("2026-01-12T0")
+    assert florida["resultados"].get("duplicada", 0) > 0              # cámara congelada: sondeo espaciado
+    assert florida["intentos"] < huechuraba["intentos"]
+
+    # El módulo de captura queda como estaba
+    assert isinstance(cloud.reloj, RelojSistema)
+    assert cloud.RUNNING == running
@@ -0,0 +1,169 @@
+import sys
+import os
+import io
+import hashlib
+import asyncio
+import pytest
+from PIL import Image
+from botocore.exceptions import ClientError
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud import subida_multiparte, pipeline_domingo, codificador
+
+MB = 1024 * 1024
+
+
+class S3Multiparte:
+    """Multipart upload en memoria con la semántica de S3 que usa la subida"""
+
+    def __init__(self):
+        self.uploads = {}
+        self.objetos = {}
+        self.subidas_de_partes = 0
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    async def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = f"u{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.en_vuelo += 1
+        self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        await asyncio.sleep(0.01)
+        self.en_vuelo -= 1
+        self.subidas_de_partes += 1
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self.uploads[UploadId][PartNumber] = (etag, Body)
+        return {"ETag": etag}
+
+    async def list_parts(self, Bucket, Key, UploadId, **kwargs):
+        if UploadId not in self.uploads:
+            raise ClientError({"Error": {"Code": "NoSuchUpload"}}, "ListParts")
+        return {"Parts": [{"PartNumber": n, "ETag": e} for n, (e, _) in self.uploads[UploadId].items()]}
+
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        partes = self.uploads.pop(UploadId)
+        self.objetos[Key] = b"".join(partes[p["PartNumber"]][1] for p in MultipartUpload["Parts"])
+
+    async def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+
+def contenido(n_mb):
+    return bytes(range(256)) * (n_mb * MB // 256)
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_partes_en_paralelo_y_completa(tmp_path):
+    s3 = S3Multiparte()
+    data = contenido(23)
+    subida = await subida_multiparte.SubidaMultiparte(
+        s3, "b", "video.mp4", tamano_parte=5 * MB, concurrencia=3, dir_estado=str(tmp_path)
+    ).iniciar()
+    for i in range(0, len(data), MB):
+        await subida.escribir(data[i:i + MB])
+    assert await subida.completar() == len(data)
+
+    assert s3.objetos["video.mp4"] == data
+    assert len(subida.partes) == 5
+    assert 1 < s3.max_en_vuelo <= 3
+    assert not os.listdir(tmp_path)          # estado borrado al completar
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_retoma_sin_resubir_partes_iguales(tmp_path):
+    s3 = S3Multiparte()
+    data = contenido(16)
+
+    # Primera ejecución: se interrumpe tras subir las partes completas
+    primera = await subida_multiparte.SubidaMultiparte(
+        s3, "b", "video.mp4", tamano_parte=5 * MB, dir_estado=str(tmp_path)
+    ).iniciar()
+    await primera.escribir(data)
+    await asyncio.sleep(0.1)                 # partes en vuelo alcanzan a terminar
+    await primera.abortar(conservar_estado=True)
+    assert s3.subidas_de_partes == 3
+
+    # Segunda ejecución con la misma salida: solo falta la última parte
+    segunda = await subida_multiparte.SubidaMultiparte(
+        s3, "b", "video.mp4", tamano_parte=5 * MB, dir_estado=str(tmp_path)
+    ).iniciar()
+    await segunda.escribir(data)
+    await segunda.completar()
+
+    assert segunda.reutilizadas == 3
+    assert s3.subidas_de_partes == 4
+    assert s3.objetos["video.mp4"] == data
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_etapa_timelapse_sube_mientras_codifica(tmp_path, monkeypatch):
+    # `cat` en lugar de ffmpeg: stdin -> stdout, para verificar el flujo sin el encoder
+    monkeypatch.setattr(pipeline_domingo, "comandos_ffmpeg", lambda *a, **k: [["cat"]])
+    monkeypatch.setenv("SUBIDAS_ESTADO_DIR", str(tmp_path))
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 36)).save(buffer, format="JPEG")
+    frame = buffer.getvalue()
+
+    s3 = S3Multiparte()
+    contexto = {"s3": s3, "video_key": "timelapses/2024/semana_01/Temuco.mp4"}
+    etapa = pipeline_domingo.EtapaTimelapse("b", min_frames=2, perfil=codificador.perfil_desde_entorno("rapido"))
+    await etapa.iniciar("Temuco", contexto)
+    for i in range(3):
+        await etapa.consumir("Temuco", {"key": f"k{i}", "data": frame, "ts": i}, contexto)
+
+    assert await etapa.finalizar("Temuco", contexto)
+    assert contexto["video_subido"] and contexto["num_frames"] == 3
+    assert s3.objetos[contexto["video_key"]] == frame * 3
+
+
+class S3PartesFallan(S3Multiparte):
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        await asyncio.sleep(0.01)
+        raise ClientError({"Error": {"Code": "SlowDown"}}, "UploadPart")
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_parte_fallida_aborta_la_planta_sin_colgarse(tmp_path, monkeypatch):
+    # El lector deja de leer stdout de `cat`, que deja de leer stdin: drain() no debe colgar
+    monkeypatch.setattr(pipeline_domingo, "comandos_ffmpeg", lambda *a, **k: [["cat"]])
+    monkeypatch.setenv("SUBIDAS_ESTADO_DIR", str(tmp_path))
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 36)).save(buffer, format="JPEG")
+    frame = buffer.getvalue() + bytes(3 * MB)                       # relleno tras el JPEG
+
+    s3 = S3PartesFallan()
+    etapa = pipeline_domingo.EtapaTimelapse("b", min_frames=2, perfil=codificador.perfil_desde_entorno("rapido"))
+    p = pipeline_domingo.PipelineDomingo("b", ventana=2).registrar(lambda: etapa)
+
+    class S3Frames(S3PartesFallan):
+        async def get_object(self, Bucket, Key):
+            class Cuerpo:
+                async def read(self):
+                    return frame
+            return {"Body": Cuerpo()}
+
+    s3 = S3Frames()
+    contexto = {"video_key": "timelapses/2024/semana_01/Temuco.mp4"}
+    imagenes = [{"key": f"k{i}.jpg"} for i in range(40)]
+
+    with pytest.raises(pipeline_domingo.EtapaFallida, match="SlowDown"):
+        await asyncio.wait_for(p.procesar(s3, "Temuco", imagenes, contexto), timeout=20)
+
+    assert etapa.proceso.returncode is not None                     # ffmpeg detenido
+    assert not contexto.get("video_subido")
+    assert p.descargas < len(imagenes)                              # no siguió descargando la semana
@@ -0,0 +1,218 @@
+import sys
+import os
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+# --- CONFIGURACIÓN DE ENTORNO ---
+sys.dont_write_bytecode = True
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from imageRecopilator.Cloud.trabajos import ColaTrabajos, EjecutorTrabajos
+from imageRecopilator.Cloud import ImageRecompilerCloud as cloud
+from imageRecopilator.Cloud import clientes_s3
+from imageRecopilator.Cloud.reloj import RelojVirtual
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.mark.imageRecopilator
+class TestColaTrabajos:
+
+    def test_clave_no_duplica_y_persiste(self, tmp_path):
+        db = str(tmp_path / "trabajos.db")
+        cola = ColaTrabajos(db)
+        assert cola.encolar("semana", {"año": 2026, "semana": 3}, "semana:2026-W03")
+        assert cola.encolar("semana", {"año": 2026, "semana": 3}, "semana:2026-W03") is None
+
+        otra = ColaTrabajos(db)                                  # reinicio del proceso
+        trabajo = otra.tomar("w1")
+        assert trabajo["parametros"] == {"año": 2026, "semana": 3}
+        assert otra.tomar("w2") is None                          # ya reclamado
+        otra.completar(trabajo["id"])
+        assert otra.resumen()["hecho"] == 1
+
+    def test_lease_vencido_se_retoma(self, tmp_path):
+        reloj = Reloj()
+        cola = ColaTrabajos(str(tmp_path / "t.db"), lease=60, reloj=reloj)
+        cola.encolar("semana", {}, "a")
+        assert cola.tomar("w1")
+        assert cola.tomar("w2") is None
+
+        reloj.ahora += 61                                        # w1 murió sin renovar
+        trabajo = cola.tomar("w2")
+        assert trabajo["intentos"] == 2
+
+    def test_fallos_con_backoff_hasta_agotar(self, tmp_path):
+        reloj = Reloj()
+        cola = ColaTrabajos(str(tmp_path / "t.db"), max_intentos=2, espera_base=100, reloj=reloj)
+        cola.encolar("render", {}, "r")
+
+        trabajo = cola.tomar("w")
+        assert cola.fallar(trabajo["id"], trabajo["intentos"], "boom") is True
+        assert cola.tomar("w") is None and cola.pendientes() == 0
+        reloj.ahora += 100
+        trabajo = cola.tomar("w")
+        assert cola.fallar(trabajo["id"], trabajo["intentos"], "boom") is False
+        assert cola.resumen()["fallido"] == 1
+
+        assert cola.reintentar("r") and cola.pendientes() == 1
+
+
+@pytest.mark.imageRecopilator
+class TestEjecutorTrabajos:
+
+    @pytest.mark.asyncio
+    async def test_ejecuta_hasta_vaciar(self, tmp_path):
+        cola = ColaTrabajos(str(tmp_path / "t.db"))
+        hechos = []
+
+        async def semana(año, semana):
+            hechos.append((año, semana))
+
+        async def roto():
+            raise RuntimeError("sin ffmpeg")
+
+        cola.encolar("semana", {"año": 2026, "semana": 2}, "s2")
+        cola.encolar("roto", {}, "x")
+        cola.encolar("desconocido", {}, "d")
+
+        ejecutor = EjecutorTrabajos(cola, {"semana": semana, "roto": roto})
+        await ejecutor.correr(hasta_vaciar=True)
+
+        assert hechos == [(2026, 2)]
+        assert ejecutor.completados == 1 and ejecutor.fallidos == 2
+        resumen = cola.resumen()
+        assert resumen["hecho"] == 1 and resumen["fallido"] == 1 and resumen["pendiente"] == 1
+
+    @pytest.mark.asyncio
+    async def test_apagado_devuelve_el_trabajo(self, tmp_path):
+        cola = ColaTrabajos(str(tmp_path / "t.db"))
+        estado = {"corriendo": True}
+
+        async def largo():
+            estado["corriendo"] = False                         # SIGTERM a mitad
+            await asyncio.sleep(0)
+
+        cola.encolar("largo", {}, "l")
+        ejecutor = EjecutorTrabajos(cola, {"largo": largo})
+        await ejecutor.ejecutar_uno(continuar=lambda: estado["corriendo"])
+
+        trabajo = cola.tomar("otro")
+        assert trabajo["clave"] == "l" and trabajo["intentos"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_captura_encola_la_semana_el_domingo(tmp_path, monkeypatch):
+    cloud.inicializar()
+    monkeypatch.setattr(cloud, "cola_trabajos", ColaTrabajos(str(tmp_path / "t.db")))
+    monkeypatch.setattr(cloud, "PROCESAMIENTO_DOMINGO", True)
+
+    await cloud.programar_trabajos(datetime(2026, 1, 17, 12, 0))    # sábado: nada
+    assert cloud.cola_trabajos.pendientes() == 0
+
+    domingo = datetime(2026, 1, 18, 12, 0)
+    await cloud.programar_trabajos(domingo)
+    await cloud.programar_trabajos(domingo)                         # cada minuto: sin duplicar
+    trabajos = cloud.cola_trabajos.listar()
+    assert [t["clave"] for t in trabajos] == ["semana:%d-W%02d" % cloud.semana_anterior(domingo)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_solo_el_lider_lanza_el_worker(tmp_path, monkeypatch):
+    cloud.inicializar()
+    monkeypatch.setattr(cloud, "cola_trabajos", ColaTrabajos(str(tmp_path / "t.db")))
+    monkeypatch.setattr(cloud, "RUNNING", True)
+    cloud.cola_trabajos.encolar("semana", {"año": 2026, "semana": 3}, "semana:2026-W03")
+    lanzados = []
+
+    class Proceso:
+        pid = 1
+        returncode = 0
+
+    async def lanzar(*comando, **opciones):
+        lanzados.append(comando)
+        return Proceso()
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", lanzar)
+
+    async def correr(lider):
+        async def es_lider():
+            return lider
+        monkeypatch.setattr(cloud, "es_lider", es_lider)
+        tarea = asyncio.create_task(cloud.tarea_ejecutor_trabajos())
+        await asyncio.sleep(0.05)
+        tarea.cancel()
+        await asyncio.gather(tarea, return_exceptions=True)
+
+    await correr(False)
+    assert lanzados == []
+    await correr(True)
+    assert len(lanzados) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.imageRecopilator
+async def test_semana_con_planta_fallida_se_reintenta(tmp_path, monkeypatch):
+    cloud.inicializar()
+    cola = ColaTrabajos(str(tmp_path / "t.db"))
+    s3 = AsyncMock()
+    s3.get_object.side_effect = KeyError("NoSuchKey")              # sin manifest previo
+    gestor = clientes_s3.GestorClientesS3()
+    gestor.inyectar("s3", s3)
+    monkeypatch.setattr(clientes_s3, "_gestor", gestor)
+    monkeypatch.setattr(cloud, "reloj", RelojVirtual(datetime(2026, 1, 18, 3, 0)))
+
+    async def conjuntos(self, semana):
+        for planta in ("Temuco", "Osorno"):
+            yield planta, [{"key": f"{planta}.jpg", "size": 1}]
+
+    async def crear_timelapse(self, planta, imagenes, año, semana, descartadas=()):
+        # Osorno: el video no se subió (ffmpeg falló, pocos frames...)
+        return None if planta == "Osorno" else f"timelapses/{planta}.mp4"
+
+    monkeypatch.setattr(cloud.SundayWorker, "conjuntos_por_planta", conjuntos)
+    monkeypatch.setattr(cloud.SundayWorker, "crear_timelapse", crear_timelapse)
+
+    cola.encolar("semana", {"año": 2026, "semana": 3}, "semana:2026-W03")
+    ejecutor = EjecutorTrabajos(cola, {"semana": cloud.trabajo_semana})
+    await ejecutor.ejecutar_uno()
+
+    manifests = [c.kwargs["Key"] for c in s3.put_object.call_args_list]
+    assert manifests == ["timelapses/2026/semana_03/Temuco.manifest"]   # la otra planta no se corta
+    manifest = json.loads(s3.put_object.call_args.kwargs["Body"])
+    assert manifest["timestamp"] == "2026-01-18T03:00:00"              # reloj del proceso, no datetime.now()
+    assert ejecutor.fallidos == 1 and ejecutor.completados == 0
+    trabajo = cola.listar()[0]
+    assert trabajo["estado"] == "pendiente" and "Osorno" in trabajo["error"]
+
+
+@pytest.mark.imageRecopilator
+def test_lease_vencido_sin_intentos_queda_fallido(tmp_path):
+    # El worker muere en cada intento (OOM): el trabajo no se retoma para siempre
+    reloj = Reloj()
+    cola = ColaTrabajos(str(tmp_path / "t.db"), lease=60, max_intentos=2, reloj=reloj)
+    cola.encolar("semana", {}, "s")
+
+    assert cola.tomar("w1")["intentos"] == 1
+    reloj.ahora += 61
+    assert cola.tomar("w2")["intentos"] == 2
+    reloj.ahora += 61
+    assert cola.tomar("w3") is None
+
+    trabajo = cola.listar()[0]
+    assert trabajo["estado"] == "fallido" and "lease vencido" in trabajo["error"]
+    assert cola.reintentar("s") and cola.tomar("w4")["intentos"] == 1